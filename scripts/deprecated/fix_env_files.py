@@ -6,6 +6,9 @@ This script finds and fixes .env files in all sessions to:
 1. Resolve template variables like ${TEAM_NAME}
 2. Remove variables that don't belong to the specific role
 
+Superseded by `python tools/team_cli.py reconcile-env [--project NAME]`, which
+does the same in one pass per file and processes sessions concurrently.
+
 Usage:
     python fix_env_files.py [project]
 
@@ -18,6 +21,9 @@ import sys
 from pathlib import Path
 import json
 
+sys.path.insert(0, str(Path(__file__).resolve().parents[2] / "tools"))
+from env_file import read_env_file  # noqa: E402
+
 
 def fix_env_files(project=None):
     """Fix .env files in session payloads"""
@@ -47,13 +53,7 @@ def fix_env_files(project=None):
             continue
 
         # Parse the main env file to get all variables
-        all_vars = {}
-        with open(env_file, "r") as f:
-            for line in f:
-                line = line.strip()
-                if line and not line.strip().startswith("#") and "=" in line:
-                    key, value = line.split("=", 1)
-                    all_vars[key.strip()] = value.strip()
+        all_vars = read_env_file(env_file)
 
         # Process each session
         sessions_dir = project_dir / "sessions"
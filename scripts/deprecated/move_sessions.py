@@ -5,6 +5,10 @@ move_sessions.py - Move session directories to new directory structure
 This script moves all existing sessions/{project}/{agent} directories to
 teams/{project}/sessions/{agent} as part of the repository reorganization.
 
+Superseded by `python tools/team_cli.py migrate-sessions [--execute]`, which
+moves sessions by rename instead of copying them, journals every step and
+supports --rollback.
+
 Usage:
     python move_sessions.py --dry-run     # Show what would be done without making changes
     python move_sessions.py --execute     # Actually move the directories
@@ -17,6 +17,9 @@ The script performs the following reorganization steps:
 5. Update path references in code files
 
 IMPORTANT: Make a backup of your repository before running with --execute!
+
+Step 2 is superseded by `python tools/team_cli.py migrate-sessions`, which
+moves sessions by rename with a reversible journal (--rollback).
 """
 import argparse
 import os
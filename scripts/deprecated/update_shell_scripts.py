@@ -5,6 +5,9 @@ update_shell_scripts.py - Update path references in shell scripts
 This script scans shell scripts in the repository and updates path references
 to match the new directory structure after reorganization.
 
+Superseded by `python tools/team_cli.py migrate-paths [--execute]`, which
+applies the same rules in one pass per file, in parallel and atomically.
+
 Usage:
     python update_shell_scripts.py --dry-run    # Show changes without making them
     python update_shell_scripts.py --execute    # Update the shell scripts
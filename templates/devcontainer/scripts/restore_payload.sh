@@ -8,53 +8,78 @@ log() {
 
 log "Starting payload restoration..."
 
-# Move SSH key to root
-if [ -d "/workspaces/project/payload/.ssh" ]; then
-    log "Found SSH directory, copying keys..."
-    mkdir -p /root/.ssh
-    cp -r /workspaces/project/payload/.ssh/* /root/.ssh/
-    chmod 600 /root/.ssh/id_rsa
-    log "SSH keys copied and permissions set"
-else
-    log "WARNING: No SSH directory found at /workspaces/project/payload/.ssh"
+# Where to restore from. A packed payload (team_cli.py pack) is unpacked to
+# container-local disk in one streaming pass and verified, so the copies below
+# do not read hundreds of small files over the bind mount.
+PAYLOAD_DIR="${PAYLOAD_DIR:-/workspaces/project/payload}"
+PAYLOAD_ARCHIVE="${PAYLOAD_ARCHIVE:-$(ls /workspaces/project/payload.tar* 2>/dev/null | head -n 1)}"
+PAYLOAD_UNPACKER=/workspaces/project/.devcontainer/scripts/payload_restore.py
+if [ -n "$PAYLOAD_ARCHIVE" ] && [ -f "$PAYLOAD_UNPACKER" ]; then
+    log "Found packed payload $PAYLOAD_ARCHIVE, unpacking..."
+    if python3 "$PAYLOAD_UNPACKER" unpack "$PAYLOAD_ARCHIVE" /tmp/payload; then
+        PAYLOAD_DIR=/tmp/payload
+        log "Packed payload unpacked and verified"
+    else
+        log "WARNING: Could not unpack $PAYLOAD_ARCHIVE, restoring from $PAYLOAD_DIR"
+    fi
 fi
 
-# Move environment file
-if [ -f "/workspaces/project/payload/.env" ]; then
-    log "Found .env file, copying..."
-    cp /workspaces/project/payload/.env /workspaces/project/.env
-    log ".env file copied successfully"
+# Copy only what changed since the last restore (payload_restore.py compares
+# the payload manifest with the stamp it left in the container); without it,
+# copy the whole payload
+if [ -f "$PAYLOAD_UNPACKER" ] && python3 "$PAYLOAD_UNPACKER" sync "$PAYLOAD_DIR"; then
+    log "Payload synced"
 else
-    log "WARNING: No .env file found at /workspaces/project/payload/.env"
-fi
+    [ -f "$PAYLOAD_UNPACKER" ] && log "WARNING: Payload sync failed, copying the whole payload"
 
-# Move MCP config
-if [ -f "/workspaces/project/payload/mcp_config.json" ]; then
-    log "Found MCP config, copying..."
-    mkdir -p /root/.codeium/windsurf
-    cp /workspaces/project/payload/mcp_config.json /root/.codeium/windsurf/mcp_config.json
-    log "MCP config copied successfully"
-else
-    log "WARNING: No MCP config found at /workspaces/project/payload/mcp_config.json"
-fi
+    # Move SSH key to root
+    if [ -d "$PAYLOAD_DIR/.ssh" ]; then
+        log "Found SSH directory, copying keys..."
+        mkdir -p /root/.ssh
+        cp -r $PAYLOAD_DIR/.ssh/* /root/.ssh/
+        chmod 600 /root/.ssh/id_rsa
+        log "SSH keys copied and permissions set"
+    else
+        log "WARNING: No SSH directory found at $PAYLOAD_DIR/.ssh"
+    fi
 
-# Move docs directory if it exists
-if [ -d "/workspaces/project/payload/docs" ]; then
-    log "Found docs directory, copying contents..."
-    mkdir -p /workspaces/project/docs
-    cp -r /workspaces/project/payload/docs/* /workspaces/project/docs/
-    log "Documentation copied successfully"
-else
-    log "WARNING: No docs directory found at /workspaces/project/payload/docs"
-fi
+    # Move environment file
+    if [ -f "$PAYLOAD_DIR/.env" ]; then
+        log "Found .env file, copying..."
+        cp $PAYLOAD_DIR/.env /workspaces/project/.env
+        log ".env file copied successfully"
+    else
+        log "WARNING: No .env file found at $PAYLOAD_DIR/.env"
+    fi
 
-# Move global rules if they exist (legacy support)
-if [ -f "/workspaces/project/payload/global_rules.md" ]; then
-    log "Found legacy global rules, copying..."
-    cp /workspaces/project/payload/global_rules.md /workspaces/project/docs/global_rules.md
-    log "Legacy global rules copied successfully"
-else
-    log "INFO: No legacy global rules found (this is normal for new setups)"
+    # Move MCP config
+    if [ -f "$PAYLOAD_DIR/mcp_config.json" ]; then
+        log "Found MCP config, copying..."
+        mkdir -p /root/.codeium/windsurf
+        cp $PAYLOAD_DIR/mcp_config.json /root/.codeium/windsurf/mcp_config.json
+        log "MCP config copied successfully"
+    else
+        log "WARNING: No MCP config found at $PAYLOAD_DIR/mcp_config.json"
+    fi
+
+    # Move docs directory if it exists
+    if [ -d "$PAYLOAD_DIR/docs" ]; then
+        log "Found docs directory, copying contents..."
+        mkdir -p /workspaces/project/docs
+        cp -r $PAYLOAD_DIR/docs/* /workspaces/project/docs/
+        log "Documentation copied successfully"
+    else
+        log "WARNING: No docs directory found at $PAYLOAD_DIR/docs"
+    fi
+
+    # Move global rules if they exist (legacy support)
+    if [ -f "$PAYLOAD_DIR/global_rules.md" ]; then
+        log "Found legacy global rules, copying..."
+        cp $PAYLOAD_DIR/global_rules.md /workspaces/project/docs/global_rules.md
+        log "Legacy global rules copied successfully"
+    else
+        log "INFO: No legacy global rules found (this is normal for new setups)"
+    fi
 fi
 
 # Copy Cursor user rule for easy installation
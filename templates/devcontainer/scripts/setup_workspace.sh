@@ -9,6 +9,30 @@ fi
 
 # --- Robust DevContainer Setup Script ---
 
+# Team git mirrors (team_cli.py git-cache), mounted read-only. The mount point
+# is /.git-cache so that a clone's relative alternates path reaches the mirror
+# both here and on the host, where this workspace is
+# teams/<project>/sessions/<session> and the mirrors are teams/<project>/.git-cache
+GIT_CACHE=/.git-cache
+
+# Clone URL ($1) into DEST ($2), borrowing objects from the team mirror if any
+clone_repo() {
+  local mirror=""
+  if [ -f "$GIT_CACHE/mirrors.tsv" ]; then
+    mirror=$(awk -F'\t' -v url="$1" '$1 == url { print $2; exit }' "$GIT_CACHE/mirrors.tsv")
+  fi
+  if [ -n "$mirror" ] && [ -d "$GIT_CACHE/$mirror" ]; then
+    echo "[setup] Cloning $1 with objects from the team mirror $mirror..."
+    git clone --reference-if-able "$GIT_CACHE/$mirror" "$1" "$2"
+    local relative="../../../../..$GIT_CACHE/$mirror/objects"
+    if [ -f "$2/.git/objects/info/alternates" ] && [ -d "$2/.git/objects/$relative" ]; then
+      echo "$relative" > "$2/.git/objects/info/alternates"
+    fi
+  else
+    git clone "$1" "$2"
+  fi
+}
+
 # 1. Ensure .venv exists (use uv if available, fallback to python)
 if [ ! -d "/workspaces/project/.venv" ]; then
   echo "[setup] Creating Python venv in /workspaces/project/.venv..."
@@ -34,7 +58,10 @@ else
 fi
 
 # 3. Check required env vars
-if [ -z "$MCP_DISCORD_REPO_URL" ]; then
+# The team wheelhouse (team_cli.py wheelhouse), mounted read-only, replaces the
+# mcp-discord clone and build
+WHEELHOUSE="${WHEELHOUSE:-/opt/wheelhouse}"
+if [ -z "$MCP_DISCORD_REPO_URL" ] && [ ! -f "$WHEELHOUSE/requirements.txt" ]; then
   echo "[setup] ERROR: MCP_DISCORD_REPO_URL is not set."
   exit 1
 fi
@@ -43,23 +70,30 @@ if [ -z "$PROJECT_REPO_URL" ]; then
   exit 1
 fi
 
-# 4. Clone MCP Discord repo if not present
-if [ ! -d "/workspaces/project/mcp-discord" ]; then
-  echo "[setup] Cloning mcp-discord repo..."
-  git clone "$MCP_DISCORD_REPO_URL" /workspaces/project/mcp-discord
-fi
+if [ -f "$WHEELHOUSE/requirements.txt" ]; then
+  # 4-5. Install mcp-discord and the other team tooling offline from the wheelhouse
+  echo "[setup] Installing from the team wheelhouse at $WHEELHOUSE..."
+  /workspaces/project/.venv/bin/python -m pip install --no-index --find-links "$WHEELHOUSE" \
+    -r "$WHEELHOUSE/requirements.txt"
+else
+  # 4. Clone MCP Discord repo if not present
+  if [ ! -d "/workspaces/project/mcp-discord" ]; then
+    echo "[setup] Cloning mcp-discord repo..."
+    clone_repo "$MCP_DISCORD_REPO_URL" /workspaces/project/mcp-discord
+  fi
 
-# 5. Install mcp-discord in the container venv
-cd /workspaces/project/mcp-discord
-# Try editable install, fall back to standard if not supported
-/workspaces/project/.venv/bin/python -m pip install -e . || /workspaces/project/.venv/bin/python -m pip install .
-cd /workspaces/project
+  # 5. Install mcp-discord in the container venv
+  cd /workspaces/project/mcp-discord
+  # Try editable install, fall back to standard if not supported
+  /workspaces/project/.venv/bin/python -m pip install -e . || /workspaces/project/.venv/bin/python -m pip install .
+  cd /workspaces/project
+fi
 
 # 6. Clone main project repo if not present
 REPO_NAME=$(basename -s .git "$PROJECT_REPO_URL")
 if [ ! -d "/workspaces/project/$REPO_NAME" ]; then
   echo "[setup] Cloning main project repo..."
-  git clone "$PROJECT_REPO_URL" "/workspaces/project/$REPO_NAME"
+  clone_repo "$PROJECT_REPO_URL" "/workspaces/project/$REPO_NAME"
 fi
 
 # 7. Run restore script from scripts directory if it exists (final step)
@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+base_image.py - One content-hash-tagged base image per team
+
+Sessions used to get their own copy of templates/devcontainer/Dockerfile, so
+every session container built the same image from scratch (apt-get update,
+Node.js, npm, docker.io, jq, ...). Instead, the image's build context (the
+top-level files of templates/devcontainer: Dockerfile and entrypoint.sh) is
+written once per team to teams/<project>/image and tagged with a hash of its
+contents:
+
+    windsurf-<project>-base:<first 12 hex digits of the sha256>
+
+Each session's devcontainer.json refers to that tag with "image" instead of
+"build". A session keeps only what is its own: devcontainer.json (name,
+container name, mounts) and .devcontainer/scripts, which run from the
+workspace when the container starts.
+
+`team_cli.py base-image --build` builds the image. The tag changes only when
+the build context does, so the build is skipped when an image with the tag
+already exists. Sessions do not depend on that step: their initializeCommand,
+which runs on the host before the container is created, builds the image
+from teams/<project>/image when it is missing.
+"""
+import hashlib
+import os
+import re
+import shutil
+import subprocess
+import threading
+from pathlib import Path
+from typing import Iterable, List, Tuple
+
+from doc_store import file_digest
+from payload_sync import remove_orphans, sync_file, write_if_changed
+
+IMAGE_DIR = "image"
+TAG_FILE = "tag"
+# The build context as seen from a session directory (teams/<project>/sessions/<name>)
+SESSION_CONTEXT = "${localWorkspaceFolder}/../../" + IMAGE_DIR
+
+# Crew builds write the same team image directory from several threads
+_write_lock = threading.Lock()
+
+
+def image_files(devcontainer_files: Iterable[str]) -> List[str]:
+    """The build context: template files outside scripts/, except devcontainer.json."""
+    return sorted(rel for rel in devcontainer_files if "/" not in rel and rel != "devcontainer.json")
+
+
+def image_tag(project: str, devcontainer_dir: Path, files: Iterable[str]) -> str:
+    """Tag for the team image, derived from the contents and modes of its build context."""
+    h = hashlib.sha256()
+    for rel in sorted(files):
+        path = Path(devcontainer_dir) / rel
+        mode = os.stat(path).st_mode & 0o777
+        h.update(f"{rel}\0{mode:o}\0{file_digest(path)}\0".encode())
+    name = re.sub(r"[^a-z0-9_.-]+", "-", project.lower()).strip("-.") or "team"
+    return f"windsurf-{name}-base:{h.hexdigest()[:12]}"
+
+
+def write_image_context(
+    project: str,
+    devcontainer_dir: Path,
+    files: Iterable[str],
+    teams_dir: Path = Path("teams"),
+    stats=None,
+) -> Tuple[Path, str]:
+    """Write the team's image build context to teams/<project>/image.
+
+    Returns:
+        tuple: (context directory, image tag)
+    """
+    files = list(files)
+    tag = image_tag(project, devcontainer_dir, files)
+    context = Path(teams_dir) / project / IMAGE_DIR
+    with _write_lock:
+        context.mkdir(parents=True, exist_ok=True)
+        for rel in files:
+            sync_file(Path(devcontainer_dir) / rel, context / rel, stats)
+        write_if_changed(context / TAG_FILE, tag + "\n", stats)
+        remove_orphans(context, set(files) | {TAG_FILE}, stats)
+    return context, tag
+
+
+def use_image(config: dict, tag: str) -> dict:
+    """Point a devcontainer.json config at tag instead of a Dockerfile build.
+
+    The image only exists once it has been built, so an initializeCommand
+    builds it from the team's build context if the Docker daemon lacks it.
+    """
+    config.pop("build", None)
+    config["image"] = tag
+    command = (
+        f"docker image inspect {tag} >/dev/null 2>&1 || "
+        f'docker build --tag {tag} "{SESSION_CONTEXT}"'
+    )
+    existing = config.get("initializeCommand")
+    if isinstance(existing, str) and existing:
+        command = f"{{ {command}; }} && {existing}"
+    config["initializeCommand"] = command
+    return config
+
+
+def image_exists(tag: str) -> bool:
+    """Whether the local Docker daemon already has an image with this tag."""
+    result = subprocess.run(
+        ["docker", "image", "inspect", tag],
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    return result.returncode == 0
+
+
+def build_image(context: Path, tag: str, force: bool = False) -> bool:
+    """Build the team image unless an image with its tag exists.
+
+    Returns:
+        bool: True if the image was built
+
+    Raises:
+        FileNotFoundError: If docker is not installed
+        subprocess.CalledProcessError: If the build fails
+    """
+    if shutil.which("docker") is None:
+        raise FileNotFoundError("docker is not installed")
+    if not force and image_exists(tag):
+        return False
+    subprocess.run(["docker", "build", "--tag", tag, str(context)], check=True)
+    return True
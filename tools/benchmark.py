@@ -0,0 +1,478 @@
+#!/usr/bin/env python3
+"""
+benchmark.py - Synthetic large-team benchmark for the session build path
+
+Generates a synthetic team (N roles x M docs x K bytes per doc) in a
+temporary directory, then runs the real entry points in-process against it:
+
+    startup        import team_cli and run `list-roles` in fresh interpreters
+    scaffold       scaffold_team.py --project bench ...
+    crew-cold      team_cli.py create-crew (fresh sessions)
+    crew-warm      team_cli.py create-crew --overwrite (nothing changed)
+    propagate      propagate_cline_docs_shared() over every role
+    session        team_cli.py create-session for one extra session
+    env-grouping   RoleIndex grouping of a synthetic env file with
+                   ENV_INDEX_ROLES roles x ENV_INDEX_KEYS_PER_ROLE keys
+
+Each build case records wall time, write/read syscalls, bytes written and
+peak RSS. Results are emitted as JSON and can be compared against a stored
+baseline; any metric that regresses by more than the threshold fails. The
+startup check fails if importing team_cli exceeds --startup-budget-ms or
+pulls in any of DEFERRED_MODULES.
+
+Usage:
+    python tools/team_cli.py benchmark --roles 16 --docs 50 --output bench.json
+    python tools/team_cli.py benchmark --baseline benchmarks/baseline.json
+    python tools/team_cli.py benchmark --baseline benchmarks/baseline.json --update-baseline
+    python tools/team_cli.py benchmark --startup-only
+"""
+import contextlib
+import io
+import json
+import os
+import platform
+import re
+import resource
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+TOOLS_DIR = Path(__file__).resolve().parent
+REPO_ROOT = TOOLS_DIR.parent
+PROJECT = "bench"
+
+# Modules team_cli must not import at startup; commands import them on demand
+DEFERRED_MODULES = (
+    "yaml",
+    "json",
+    "scaffold_team",
+    "crew_context",
+    "doc_store",
+    "payload_sync",
+    "key_registry",
+    "ssh_keys",
+    "mcp_template",
+    "role_index",
+    "benchmark",
+    "concurrent.futures",
+)
+
+_STARTUP_PROBE = """
+import sys, time
+sys.path.insert(0, {tools!r})
+start = time.perf_counter()
+import team_cli
+elapsed = time.perf_counter() - start
+print(elapsed * 1000, *[m for m in {deferred!r} if m in sys.modules])
+"""
+
+# Metrics compared against the baseline; the rest are informational
+COMPARED_METRICS = ("wall_seconds", "write_syscalls", "bytes_written")
+# Wall-time differences below this are timer noise, whatever the ratio
+MIN_WALL_DELTA = 0.005
+
+# Scale of the env-grouping case; role names share their first word
+# (guardian_r000, guardian_r004, ...) so cross-role leaks show up as wrong
+# assignments
+ENV_INDEX_ROLES = 500
+ENV_INDEX_KEYS_PER_ROLE = 10
+_ROLE_WORDS = ("guardian", "coder", "reviewer", "dev")
+
+
+def role_name(i: int) -> str:
+    return f"bench_{i:03d}"
+
+
+def env_role_name(i: int) -> str:
+    return f"{_ROLE_WORDS[i % len(_ROLE_WORDS)]}_r{i:03d}"
+
+
+def synthetic_team_env(roles: int, keys_per_role: int) -> dict:
+    """A team env with roles x keys_per_role role keys plus a few shared keys."""
+    suffixes = ["EMAIL", "SLACK_TOKEN", "GITHUB_TOKEN", "DISCORD_TOKEN", "BOT"]
+    suffixes += [f"SETTING_{i}" for i in range(max(0, keys_per_role - len(suffixes)))]
+    env = {"PROJECT_NAME": PROJECT, "SLACK_WORKSPACE_ID": "T0", "GITHUB_ORG": "bench"}
+    for i in range(roles):
+        role = env_role_name(i).upper()
+        for suffix in suffixes[:keys_per_role]:
+            env[f"{role}_{suffix}"] = f"{role.lower()}-{suffix.lower()}"
+    return env
+
+
+def measure_env_grouping(
+    roles: int = ENV_INDEX_ROLES, keys_per_role: int = ENV_INDEX_KEYS_PER_ROLE
+):
+    """Measure grouping a large synthetic env by role and check every assignment."""
+    from role_index import RoleIndex
+
+    env = synthetic_team_env(roles, keys_per_role)
+    names = [env_role_name(i) for i in range(roles)]
+    groups = {}
+    result = measure(lambda: groups.update(RoleIndex(names).group(env)))
+    wrong = [
+        key
+        for role, keys in groups.items()
+        for key, value in keys.items()
+        if not value.startswith(f"{role}-")
+    ]
+    if wrong or len(groups) != roles:
+        raise RuntimeError(f"env-grouping assigned {len(wrong)} key(s) to the wrong role")
+    return result
+
+
+def _doc_text(label: str, size: int) -> str:
+    line = f"{label}: synthetic benchmark content for the session build path.\n"
+    return (f"# {label}\n\n" + line * (size // len(line) + 1))[:size]
+
+
+def build_synthetic_team(root: Path, roles: int, docs: int, doc_bytes: int):
+    """Lay out a minimal repository with synthetic roles and docs under root.
+
+    The shared templates (roles/_templates, templates/devcontainer, the
+    python_coder MCP template and the restore script) are copied from this repository so the real
+    templates are exercised.
+    """
+    root = Path(root)
+    shutil.copytree(REPO_ROOT / "roles" / "_templates", root / "roles" / "_templates")
+    shutil.copytree(
+        REPO_ROOT / "templates" / "devcontainer", root / "templates" / "devcontainer"
+    )
+    mcp_template = REPO_ROOT / "roles" / "python_coder" / "mcp_config.template.json"
+    for i in range(roles):
+        role_dir = root / "roles" / role_name(i)
+        (role_dir / "docs").mkdir(parents=True)
+        shutil.copyfile(mcp_template, role_dir / "mcp_config.template.json")
+        for j in range(docs):
+            (role_dir / "docs" / f"role_doc_{j:03d}.md").write_text(
+                _doc_text(f"{role_name(i)} doc {j}", doc_bytes)
+            )
+    for docs_dir in (root / "docs" / "global", root / "docs" / "projects" / PROJECT):
+        docs_dir.mkdir(parents=True)
+        for j in range(docs):
+            (docs_dir / f"doc_{j:03d}.md").write_text(
+                _doc_text(f"{docs_dir.name} doc {j}", doc_bytes)
+            )
+    (root / "teams" / "_shared").mkdir(parents=True)
+    shutil.copyfile(
+        REPO_ROOT / "sessions" / "_shared" / "restore_payload.sh",
+        root / "teams" / "_shared" / "restore_payload.sh",
+    )
+    (root / ".gitignore").write_text("payload/.ssh/\n")
+
+
+def fill_env_tokens(env_file: Path):
+    """Give every role placeholder tokens so create-crew accepts the env file."""
+    text = Path(env_file).read_text()
+    text = re.sub(r"(?m)^SLACK_TEAM_ID=.*$", "SLACK_TEAM_ID=TBENCH", text)
+    text = re.sub(r"(?m)^(\w+_SLACK_TOKEN)=.*$", r"\1=xoxb-bench", text)
+    text = re.sub(r"(?m)^(\w+_GITHUB_TOKEN)=.*$", r"\1=ghp_bench", text)
+    Path(env_file).write_text(text)
+
+
+# --- Measurement ---
+def _read_proc_io() -> dict:
+    try:
+        with open("/proc/self/io") as f:
+            return {k: int(v) for k, v in (line.split(":") for line in f)}
+    except OSError:
+        return {}
+
+
+def _reset_peak_rss() -> bool:
+    # Writing 5 to clear_refs resets VmHWM (Linux >= 4.0)
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
+
+
+def _peak_rss_kb(reset: bool) -> int:
+    if reset:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1])
+    # Process-wide high-water mark (bytes on macOS, KiB on Linux)
+    maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return maxrss // 1024 if sys.platform == "darwin" else maxrss
+
+
+@contextlib.contextmanager
+def _argv(argv):
+    saved = sys.argv
+    sys.argv = argv
+    try:
+        yield
+    finally:
+        sys.argv = saved
+
+
+def measure(func) -> dict:
+    """Run func with its output discarded and return its resource usage."""
+    reset = _reset_peak_rss()
+    io_before = _read_proc_io()
+    output = io.StringIO()
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(output), contextlib.redirect_stderr(output):
+        try:
+            func()
+        except SystemExit as e:
+            if e.code not in (None, 0):
+                raise RuntimeError(
+                    f"exited with status {e.code}:\n{output.getvalue()[-2000:]}"
+                ) from e
+    wall = time.perf_counter() - start
+    io_after = _read_proc_io()
+
+    def delta(key):
+        return io_after[key] - io_before[key] if key in io_after else None
+
+    return {
+        "wall_seconds": round(wall, 6),
+        "write_syscalls": delta("syscw"),
+        "read_syscalls": delta("syscr"),
+        "bytes_written": delta("wchar"),
+        "peak_rss_kb": _peak_rss_kb(reset),
+    }
+
+
+def run_once(roles: int, docs: int, doc_bytes: int, jobs: int, keep: bool = False) -> dict:
+    """Build one synthetic team and measure every case against it."""
+    import scaffold_team
+    import team_cli
+
+    role_names = [role_name(i) for i in range(roles)]
+    env_file = f"teams/{PROJECT}/config/env"
+    crew_argv = ["team_cli.py", "create-crew", "--env-file", env_file, "--jobs", str(jobs)]
+    cases = [
+        (
+            "scaffold",
+            lambda: scaffold_team.main(),
+            [
+                "scaffold_team.py",
+                "--project", PROJECT,
+                "--prefix", "bench",
+                "--domain", "example.com",
+                "--roles", ",".join(role_names),
+            ],
+        ),
+        ("crew-cold", team_cli.main, crew_argv + ["--overwrite"]),
+        ("crew-warm", team_cli.main, crew_argv + ["--overwrite"]),
+        (
+            "propagate",
+            lambda: team_cli.propagate_cline_docs_shared(PROJECT, role_names),
+            None,
+        ),
+        (
+            "session",
+            team_cli.main,
+            [
+                "team_cli.py",
+                "create-session",
+                "--name", "bench_extra",
+                "--role", role_names[0],
+                "--project", PROJECT,
+                "--generate-ssh-key",
+            ],
+        ),
+    ]
+
+    workdir = Path(tempfile.mkdtemp(prefix="team-bench-"))
+    cwd = os.getcwd()
+    results = {}
+    try:
+        build_synthetic_team(workdir, roles, docs, doc_bytes)
+        os.chdir(workdir)
+        for name, func, argv in cases:
+            with _argv(argv) if argv else contextlib.nullcontext():
+                results[name] = measure(func)
+            if name == "scaffold":
+                fill_env_tokens(Path(env_file))
+        results["env-grouping"] = measure_env_grouping()
+    finally:
+        os.chdir(cwd)
+        if keep:
+            print(f"[BENCH] Kept synthetic team at {workdir}")
+        else:
+            shutil.rmtree(workdir, ignore_errors=True)
+    return results
+
+
+def measure_startup(runs: int = 5) -> dict:
+    """Time CLI startup in fresh interpreters (best of `runs`).
+
+    Returns:
+        dict: import_ms (import team_cli), list_roles_ms (whole `list-roles`
+        command) and deferred_loaded (DEFERRED_MODULES imported at startup)
+    """
+    import subprocess
+
+    probe = _STARTUP_PROBE.format(tools=str(TOOLS_DIR), deferred=DEFERRED_MODULES)
+    import_ms, list_roles_ms, loaded = [], [], set()
+    for _ in range(runs):
+        out = subprocess.run(
+            [sys.executable, "-c", probe], capture_output=True, text=True, check=True
+        ).stdout.split()
+        import_ms.append(float(out[0]))
+        loaded.update(out[1:])
+        start = time.perf_counter()
+        subprocess.run(
+            [sys.executable, str(TOOLS_DIR / "team_cli.py"), "list-roles"],
+            capture_output=True,
+            check=True,
+            cwd=REPO_ROOT,
+        )
+        list_roles_ms.append((time.perf_counter() - start) * 1000)
+    return {
+        "import_ms": round(min(import_ms), 3),
+        "list_roles_ms": round(min(list_roles_ms), 3),
+        "deferred_loaded": sorted(loaded),
+    }
+
+
+def check_startup(startup: dict, budget_ms: float) -> list:
+    """Return a description of every way startup breaks its budget."""
+    problems = []
+    if startup["import_ms"] > budget_ms:
+        problems.append(
+            f"import team_cli took {startup['import_ms']:.1f}ms (budget {budget_ms:.1f}ms)"
+        )
+    if startup["deferred_loaded"]:
+        problems.append(
+            f"team_cli imports {', '.join(startup['deferred_loaded'])} at startup"
+        )
+    return problems
+
+
+def run_benchmark(roles=8, docs=20, doc_bytes=4096, jobs=1, repeat=3, keep=False) -> dict:
+    """Run the suite `repeat` times and report the median of each metric."""
+    runs = [run_once(roles, docs, doc_bytes, jobs, keep) for _ in range(repeat)]
+    cases = {}
+    for name in runs[0]:
+        cases[name] = {}
+        for metric in runs[0][name]:
+            values = [run[name][metric] for run in runs]
+            cases[name][metric] = (
+                None if None in values else statistics.median(values)
+            )
+    return {
+        "params": {
+            "roles": roles,
+            "docs": docs,
+            "doc_bytes": doc_bytes,
+            "jobs": jobs,
+            "repeat": repeat,
+        },
+        "host": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+        },
+        "cases": cases,
+    }
+
+
+def compare(results: dict, baseline: dict, threshold: float) -> list:
+    """Return (case, metric, baseline, current, ratio) for every regression."""
+    regressions = []
+    for case, metrics in results["cases"].items():
+        for metric in COMPARED_METRICS:
+            base = baseline.get("cases", {}).get(case, {}).get(metric)
+            current = metrics.get(metric)
+            if not base or current is None:
+                continue
+            if metric == "wall_seconds" and current - base < MIN_WALL_DELTA:
+                continue
+            ratio = current / base
+            if ratio > 1 + threshold:
+                regressions.append((case, metric, base, current, ratio))
+    return regressions
+
+
+def print_results(results: dict, baseline: dict = None):
+    print(
+        f"\n{'case':<12} {'wall (s)':>10} {'writes':>9} {'written':>12} {'peak RSS':>10}"
+    )
+    for case, m in results["cases"].items():
+        line = (
+            f"{case:<12} {m['wall_seconds']:>10.3f} {m['write_syscalls'] or 0:>9} "
+            f"{m['bytes_written'] or 0:>12} {m['peak_rss_kb']:>8}kB"
+        )
+        base = (baseline or {}).get("cases", {}).get(case, {}).get("wall_seconds")
+        if base:
+            line += f"  ({m['wall_seconds'] / base - 1:+.0%} vs baseline)"
+        print(line)
+
+
+def benchmark(args):
+    """Entry point for `team_cli.py benchmark`."""
+    if args.startup_only:
+        results = {"params": {"startup_only": True}, "cases": {}}
+    else:
+        results = run_benchmark(
+            roles=args.roles,
+            docs=args.docs,
+            doc_bytes=args.doc_bytes,
+            jobs=args.jobs,
+            repeat=args.repeat,
+            keep=args.keep,
+        )
+    results["startup"] = measure_startup()
+
+    baseline = None
+    if args.baseline and Path(args.baseline).exists() and not args.update_baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if baseline.get("params") != results["params"]:
+            print(
+                f"[WARNING] Baseline parameters {baseline.get('params')} differ from this run's {results['params']}"
+            )
+
+    if results["cases"]:
+        print_results(results, baseline)
+    startup = results["startup"]
+    print(
+        f"\nStartup: import team_cli {startup['import_ms']:.1f}ms "
+        f"(budget {args.startup_budget_ms:.1f}ms), list-roles {startup['list_roles_ms']:.1f}ms"
+    )
+
+    text = json.dumps(results, indent=2) + "\n"
+    if args.output:
+        Path(args.output).write_text(text)
+        print(f"\nWrote results to {args.output}")
+    elif not args.baseline:
+        print(text)
+
+    failed = False
+    startup_problems = check_startup(startup, args.startup_budget_ms)
+    if startup_problems:
+        print("\n[REGRESSION] CLI startup:")
+        for problem in startup_problems:
+            print(f"  {problem}")
+        failed = True
+
+    if args.update_baseline:
+        if not args.baseline:
+            print("ERROR: --update-baseline requires --baseline FILE.")
+            sys.exit(1)
+        Path(args.baseline).parent.mkdir(parents=True, exist_ok=True)
+        Path(args.baseline).write_text(text)
+        print(f"Updated baseline {args.baseline}")
+    elif baseline is not None:
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print(f"\n[REGRESSION] Worse than baseline by more than {args.threshold:.0%}:")
+            for case, metric, base, current, ratio in regressions:
+                print(f"  {case} {metric}: {base} -> {current} ({ratio - 1:+.0%})")
+            failed = True
+        else:
+            print(f"\nNo regressions beyond {args.threshold:.0%} of baseline {args.baseline}")
+    elif args.baseline:
+        print(f"[WARNING] Baseline {args.baseline} not found; nothing to compare against")
+
+    if failed:
+        sys.exit(1)
@@ -0,0 +1,256 @@
+#!/usr/bin/env python3
+"""
+build_graph.py - Per-target input fingerprints for incremental session builds
+
+Every artifact of a session is a pure function of a few inputs, so a session
+is split into targets, each with the inputs it is built from:
+
+    session-files    role template files + templates/devcontainer
+    docs             global, project and role doc trees (+ include flags)
+    ssh-key          the session's registered identity
+    env              the session's variables (from the team env file, env.template
+                     and session env values: its own role's keys and the shared ones)
+    mcp              role MCP template + the session's variables
+    cline-templates  roles/_templates Cline docs, .windsurfrules and .windsurf/rules
+
+`team_cli.py build` fingerprints the inputs of every target and compares them
+with the fingerprints recorded in the session's .build-state.json by the last
+successful build. Only targets whose fingerprint changed (or whose output is
+missing) are rebuilt; `--plan` prints that list without touching disk.
+
+Fingerprints hash file contents (via the memoized doc_store.file_digest), so
+touching a file without changing it does not trigger a rebuild.
+"""
+import hashlib
+import json
+import time
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+from doc_store import file_digest
+from payload_sync import list_tree, write_if_changed
+
+BUILD_STATE_FILE = ".build-state.json"
+# Bump when a target's build logic changes so every session rebuilds it once
+STATE_VERSION = 3
+
+TARGETS = ("session-files", "docs", "ssh-key", "env", "mcp", "cline-templates")
+
+# Session-relative outputs; a target is rebuilt when one of them is missing
+TARGET_OUTPUTS = {
+    "session-files": (".devcontainer",),
+    "docs": ("payload/docs",),
+    "ssh-key": ("payload/.ssh/id_rsa", "payload/.ssh/id_rsa.pub"),
+    "env": ("payload/.env",),
+    "mcp": ("payload/mcp_config.json",),
+    "cline-templates": ("payload/cline_docs", "payload/.windsurfrules", "payload/.windsurf/rules"),
+}
+
+# Inputs of the cline-templates target (see scaffold_team.copy_cline_role_templates)
+CLINE_TEMPLATE_DIR = Path("roles/_templates")
+CLINE_TEMPLATE_TREES = ("cline_docs", "cline_docs_shared", ".windsurf/rules")
+CLINE_TEMPLATE_FILES = (".windsurfrules", "restore_payload.sh")
+
+
+class Fingerprint:
+    """Incremental sha256 over labelled values and file contents."""
+
+    def __init__(self, target: str):
+        self._hash = hashlib.sha256(f"{STATE_VERSION}:{target}".encode())
+
+    def value(self, label: str, value):
+        self._hash.update(f"\0{label}={json.dumps(value, sort_keys=True)}".encode())
+
+    def file(self, label: str, path: Path):
+        path = Path(path)
+        self.value(label, file_digest(path) if path.is_file() else None)
+
+    def tree(self, label: str, root: Path, files=None):
+        root = Path(root)
+        if files is None:
+            files = list_tree(root) if root.is_dir() else ()
+        for rel in files:
+            self.file(f"{label}/{rel}", root / rel)
+        self.value(f"{label}/", list(files))
+
+    def hexdigest(self) -> str:
+        return self._hash.hexdigest()
+
+
+def session_fingerprints(session_args, ctx, key_fingerprint: str = None) -> Dict[str, str]:
+    """Fingerprint the inputs of every target of one crew session.
+
+    Args:
+        session_args: The create_session Namespace create_crew prepared,
+            including the rendered session_env variables
+        ctx: The crew's CrewContext
+        key_fingerprint: Fingerprint of the session's registered SSH identity
+    """
+    role = session_args.role
+    role_dir = ctx.roles_dir / role
+    prints = {target: Fingerprint(target) for target in TARGETS}
+
+    fp = prints["session-files"]
+    fp.value("session", [ctx.project, session_args.name, role])
+    fp.tree("role", role_dir, ctx.role_files[role])
+    fp.value("devcontainer.json", ctx.devcontainer_json)
+    fp.value("base-image", getattr(session_args, "base_image", True))
+    fp.tree("devcontainer", ctx.devcontainer_dir, ctx.devcontainer_files)
+
+    fp = prints["docs"]
+    fp.value(
+        "include",
+        [
+            session_args.include_global_docs,
+            session_args.include_project_docs,
+            session_args.include_role_docs,
+            getattr(session_args, "doc_store", True),
+        ],
+    )
+    fp.tree("global", ctx.global_docs_dir, ctx.global_docs)
+    fp.tree("project", ctx.project_docs_dir, ctx.project_docs or ())
+    fp.tree("role", role_dir / "docs", ctx.role_docs(role))
+
+    prints["ssh-key"].value("identity", key_fingerprint)
+
+    # Only the variables the session is rendered from: the team env file holds
+    # every role's keys, and editing another role's must not rebuild this one
+    for target in ("env", "mcp"):
+        fp = prints[target]
+        fp.value("role", role)
+        fp.value("session-env", dict(session_args.session_env))
+    prints["mcp"].file("mcp-template", role_dir / "mcp_config.template.json")
+
+    fp = prints["cline-templates"]
+    for tree in CLINE_TEMPLATE_TREES:
+        fp.tree(tree, CLINE_TEMPLATE_DIR / tree)
+    for name in CLINE_TEMPLATE_FILES:
+        fp.file(name, CLINE_TEMPLATE_DIR / name)
+
+    return {target: fp.hexdigest() for target, fp in prints.items()}
+
+
+def _read_state(session_path: Path) -> dict:
+    try:
+        with open(Path(session_path) / BUILD_STATE_FILE) as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return {}
+
+
+def load_state(session_path: Path) -> dict:
+    """Return the recorded target fingerprints of a session ({} if never built)."""
+    return _read_state(session_path).get("targets", {})
+
+
+def save_state(session_path: Path, fingerprints: Dict[str, str]):
+    """Record the fingerprints of a successful build."""
+    state = _read_state(session_path)
+    state.update(
+        version=STATE_VERSION,
+        built=time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        targets=fingerprints,
+    )
+    write_if_changed(Path(session_path) / BUILD_STATE_FILE, json.dumps(state, indent=2) + "\n")
+
+
+def load_managed(session_path: Path) -> set:
+    """Session-relative paths of the files the last build wrote outside payload/.
+
+    The session directory is also the container's workspace (repository
+    clones, .venv, ...), so these are the only files a rebuild may delete.
+    Empty if the session was never built or predates this record.
+    """
+    return set(_read_state(session_path).get("managed", ()))
+
+
+def save_managed(session_path: Path, files):
+    """Record the files a build wrote outside payload/ (see load_managed)."""
+    state = _read_state(session_path)
+    state["managed"] = sorted(files)
+    write_if_changed(Path(session_path) / BUILD_STATE_FILE, json.dumps(state, indent=2) + "\n")
+
+
+def plan_session(
+    session_path: Path, fingerprints: Dict[str, str], force: bool = False, rotate: bool = False
+) -> Dict[str, str]:
+    """Return {target: reason} for every target of a session that must be rebuilt."""
+    session_path = Path(session_path)
+    if not session_path.exists():
+        return {target: "new session" for target in TARGETS}
+    recorded = load_state(session_path)
+    plan = {}
+    for target in TARGETS:
+        if force:
+            plan[target] = "forced"
+        elif target == "ssh-key" and rotate:
+            plan[target] = "rotating key"
+        elif target not in recorded:
+            plan[target] = "never built"
+        elif recorded[target] != fingerprints[target]:
+            plan[target] = "inputs changed"
+        elif not all((session_path / out).exists() for out in TARGET_OUTPUTS[target]):
+            plan[target] = "output missing"
+    return plan
+
+
+def print_plan(plans: Dict[str, Dict[str, str]], prefix: str = "[PLAN]"):
+    """Print what would be rebuilt, one line per session."""
+    for name, plan in plans.items():
+        if plan:
+            reasons = ", ".join(f"{target} ({reason})" for target, reason in plan.items())
+            print(f"{prefix} {name}: {reasons}")
+        else:
+            print(f"{prefix} {name}: up to date")
+    dirty = sum(len(plan) for plan in plans.values())
+    sessions = sum(1 for plan in plans.values() if plan)
+    print(
+        f"{prefix} {dirty} of {len(plans) * len(TARGETS)} targets in "
+        f"{sessions} of {len(plans)} sessions need rebuilding"
+    )
+
+
+def plan_crew(
+    session_tasks: List[Tuple[str, object]], ctx, sessions_dir: Path, force=False, rotate=False
+) -> Tuple[Dict[str, Dict[str, str]], Dict[str, Dict[str, str]]]:
+    """Plan a crew build.
+
+    Returns:
+        tuple: ({session: {target: reason}}, {session: fingerprints})
+    """
+    from key_registry import KeyRegistry
+
+    sessions_root = Path(sessions_dir) / ctx.project / "sessions"
+    identities = KeyRegistry(Path(sessions_dir) / ctx.project / ".keys").entries()
+    plans, fingerprints = {}, {}
+    for name, session_args in session_tasks:
+        identity = identities.get(name, {}).get("fingerprint")
+        fingerprints[name] = session_fingerprints(session_args, ctx, identity)
+        plans[name] = plan_session(sessions_root / name, fingerprints[name], force, rotate)
+    return plans, fingerprints
+
+
+def record_builds(session_tasks: List[Tuple[str, object]], ctx, sessions_dir: Path):
+    """Save fresh fingerprints for sessions that were built successfully.
+
+    Fingerprints are recomputed rather than reused from the plan because the
+    build itself can change an input (a newly registered SSH identity).
+    """
+    _, fingerprints = plan_crew(session_tasks, ctx, sessions_dir)
+    sessions_root = Path(sessions_dir) / ctx.project / "sessions"
+    for name, _ in session_tasks:
+        save_state(sessions_root / name, fingerprints[name])
+
+
+def session_fingerprint(session_args, ctx, sessions_dir: Path) -> str:
+    """One fingerprint over every target of a session (used by the crew journal)."""
+    from key_registry import KeyRegistry
+
+    identity = (
+        KeyRegistry(Path(sessions_dir) / ctx.project / ".keys")
+        .entries()
+        .get(session_args.name, {})
+        .get("fingerprint")
+    )
+    prints = session_fingerprints(session_args, ctx, identity)
+    return hashlib.sha256(json.dumps(prints, sort_keys=True).encode()).hexdigest()
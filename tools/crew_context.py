@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+crew_context.py - Shared inputs for a crew build, loaded once per invocation
+
+Every session in a crew is built from the same team env file, env template,
+devcontainer template, doc trees and role catalog. CrewContext reads and
+lists all of them up front so a session build only does session-specific
+work. The context is immutable (mappings are read-only views and listings are
+tuples), so it can be shared safely by the --jobs worker pool.
+"""
+from dataclasses import dataclass
+from pathlib import Path
+from types import MappingProxyType
+from typing import Mapping, Optional, Tuple
+
+from env_file import read_env_file
+from mcp_template import McpTemplate, McpTemplateError, load_template
+from payload_sync import list_tree
+
+
+@dataclass(frozen=True)
+class CrewContext:
+    """Precomputed, read-only inputs shared by every session of a crew build."""
+
+    project: str
+    env_file: Path
+    env_file_exists: bool
+    team_env: Mapping[str, str]
+    env_template_path: Path
+    env_template_vars: Optional[Mapping[str, str]]
+    devcontainer_dir: Path
+    devcontainer_json: Optional[str]
+    devcontainer_files: Tuple[str, ...]
+    global_docs_dir: Path
+    global_docs: Tuple[str, ...]
+    project_docs_dir: Path
+    project_docs: Optional[Tuple[str, ...]]
+    roles_dir: Path
+    roles: Tuple[str, ...]
+    role_files: Mapping[str, Tuple[str, ...]]
+    mcp_templates: Mapping[str, McpTemplate]
+    mcp_template_errors: Mapping[str, str]
+    root_gitignore_has_ssh: bool
+
+    def role_docs(self, role: str) -> Tuple[str, ...]:
+        """Files under roles/<role>/docs, relative to that directory."""
+        prefix = "docs/"
+        return tuple(
+            rel[len(prefix) :]
+            for rel in self.role_files.get(role, ())
+            if rel.startswith(prefix)
+        )
+
+
+def load_crew_context(
+    env_file: Path,
+    project: str,
+    sessions_dir: Path = Path("teams"),
+    roles_dir: Path = Path("roles"),
+    devcontainer_dir: Path = Path("templates/devcontainer"),
+    role_ignore=("payload",),
+    team_env: dict = None,
+) -> CrewContext:
+    """Read and list every input shared by the sessions of one project.
+
+    Args:
+        env_file: Team env file (teams/<project>/config/env)
+        project: Project name; selects the env template and project docs
+        sessions_dir: Root of the teams/ tree
+        roles_dir: Role catalog directory
+        devcontainer_dir: Devcontainer template directory
+        role_ignore: Top-level role template names that are not copied into sessions
+        team_env: Already-parsed contents of env_file, if the caller has them
+
+    Returns:
+        CrewContext: Immutable context to pass to create_session
+    """
+    env_file = Path(env_file)
+    env_file_exists = env_file.exists()
+    if team_env is None:
+        team_env = read_env_file(env_file) if env_file_exists else {}
+
+    env_template_path = sessions_dir / project / "config" / "env.template"
+    env_template_vars = (
+        MappingProxyType(read_env_file(env_template_path))
+        if env_template_path.exists()
+        else None
+    )
+
+    devcontainer_json_path = devcontainer_dir / "devcontainer.json"
+    devcontainer_json = (
+        devcontainer_json_path.read_text() if devcontainer_json_path.exists() else None
+    )
+
+    global_docs_dir = Path("docs/global")
+    project_docs_dir = Path(f"docs/projects/{project}")
+
+    roles = (
+        tuple(sorted(d.name for d in roles_dir.iterdir() if d.is_dir()))
+        if roles_dir.exists()
+        else ()
+    )
+    role_files = {role: list_tree(roles_dir / role, role_ignore) for role in roles}
+
+    # Compile each role's MCP template once; errors are kept per role so a
+    # broken template only blocks the sessions that actually use it
+    mcp_templates, mcp_template_errors = {}, {}
+    for role in roles:
+        template_path = roles_dir / role / "mcp_config.template.json"
+        if template_path.exists():
+            try:
+                mcp_templates[role] = load_template(template_path)
+            except McpTemplateError as e:
+                mcp_template_errors[role] = str(e)
+
+    root_gitignore = Path(".gitignore")
+    root_gitignore_has_ssh = root_gitignore.exists() and any(
+        ".ssh" in line for line in root_gitignore.read_text().splitlines()
+    )
+
+    return CrewContext(
+        project=project,
+        env_file=env_file,
+        env_file_exists=env_file_exists,
+        team_env=MappingProxyType(dict(team_env)),
+        env_template_path=env_template_path,
+        env_template_vars=env_template_vars,
+        devcontainer_dir=devcontainer_dir,
+        devcontainer_json=devcontainer_json,
+        devcontainer_files=(
+            list_tree(devcontainer_dir, ("devcontainer.json",))
+            if devcontainer_dir.exists()
+            else ()
+        ),
+        global_docs_dir=global_docs_dir,
+        global_docs=list_tree(global_docs_dir),
+        project_docs_dir=project_docs_dir,
+        project_docs=list_tree(project_docs_dir) if project_docs_dir.exists() else None,
+        roles_dir=roles_dir,
+        roles=roles,
+        role_files=MappingProxyType(role_files),
+        mcp_templates=MappingProxyType(mcp_templates),
+        mcp_template_errors=MappingProxyType(mcp_template_errors),
+        root_gitignore_has_ssh=root_gitignore_has_ssh,
+    )
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+crew_journal.py - Append-only progress journal for crew builds
+
+create_crew appends one JSON line per event to teams/<project>/.crew-journal.jsonl:
+
+    {"event": "run", "run": "...", "time": "...", "sessions": [...], "resume": false}
+    {"event": "done", "run": "...", "session": "reviewer", "fingerprint": "...", "seconds": 0.4}
+    {"event": "failed", "run": "...", "session": "pm_guardian", "error": "...", "attempt": 1}
+
+Each event is written with a single O_APPEND write as soon as it happens, so
+the journal survives a crew run that dies part-way. `create-crew --resume`
+skips sessions whose most recent event is "done" with the fingerprint their
+inputs still have (see build_graph.session_fingerprint); everything else is
+built again. Sessions are committed only once their build has succeeded
+(session_stage.py), so a "done" session is always complete on disk.
+"""
+import json
+import os
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import Dict
+
+JOURNAL_FILE = ".crew-journal.jsonl"
+
+
+class CrewJournal:
+    """The progress journal of one project's crew builds.
+
+    Args:
+        path: Journal file, normally teams/<project>/.crew-journal.jsonl
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.run_id = uuid.uuid4().hex[:12]
+        self._lock = threading.Lock()
+
+    def append(self, event: str, **fields):
+        """Append one event of the current run."""
+        record = {"event": event, "run": self.run_id, "time": time.strftime("%Y-%m-%dT%H:%M:%S%z")}
+        record.update(fields)
+        line = (json.dumps(record, sort_keys=True) + "\n").encode()
+        with self._lock:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            fd = os.open(self.path, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o644)
+            try:
+                os.write(fd, line)
+            finally:
+                os.close(fd)
+
+    def completed(self) -> Dict[str, str]:
+        """Return {session: fingerprint} for sessions whose last event is "done"."""
+        last = {}
+        try:
+            with open(self.path) as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        continue  # a line torn by a crash mid-write
+                    if "session" in record:
+                        last[record["session"]] = record
+        except FileNotFoundError:
+            return {}
+        return {
+            session: record.get("fingerprint")
+            for session, record in last.items()
+            if record.get("event") == "done"
+        }
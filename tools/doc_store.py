@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+"""
+doc_store.py - Content-addressed document store for session payloads
+
+Every session inherits the same global and project docs, so instead of
+copying them into each payload they are stored once per team under
+teams/<project>/.objects/<aa>/<sha256> and materialized into payloads as:
+
+1. a reflink (copy-on-write clone) where the filesystem supports it,
+2. a hardlink to the stored object otherwise,
+3. a plain copy when the payload lives on a different device.
+
+A hardlinked payload file is the stored object itself, so editing it in
+place would silently change every other session's copy. Stored objects are
+made read-only (0444), but that only guards against accidental edits by the
+host user: root in a container ignores file modes. Sessions therefore mount
+payload/docs read-only (see team_cli.setup_devcontainer), and writers on the
+host replace payload files rather than writing into them (payload_sync breaks
+links instead of changing a shared inode). Where hardlinks are still a
+concern, use a filesystem with reflinks or build with --no-doc-store, which
+copies.
+"""
+import errno
+import hashlib
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+
+# Linux FICLONE ioctl (_IOW(0x94, 9, int)), supported by btrfs, xfs, bcachefs, ...
+FICLONE = 0x40049409
+
+_digest_cache = {}
+_digest_lock = threading.Lock()
+
+
+def file_digest(path: Path) -> str:
+    """Return the sha256 hex digest of a file, memoized by path, size and mtime.
+
+    The cache holds one entry per path, replaced when the file changes, so a
+    long-running `team_cli.py serve` does not keep every version it hashed.
+    """
+    st = os.stat(path)
+    key = str(path)
+    with _digest_lock:
+        entry = _digest_cache.get(key)
+    if entry is not None and entry[:2] == (st.st_size, st.st_mtime_ns):
+        return entry[2]
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    digest = h.hexdigest()
+    with _digest_lock:
+        _digest_cache[key] = (st.st_size, st.st_mtime_ns, digest)
+    return digest
+
+
+def _reflink(src: Path, dst: Path):
+    """Clone src to dst with FICLONE. Raises OSError if unsupported."""
+    import fcntl
+
+    with open(src, "rb") as fsrc:
+        fd = os.open(dst, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o644)
+        try:
+            fcntl.ioctl(fd, FICLONE, fsrc.fileno())
+        except OSError:
+            os.close(fd)
+            os.unlink(dst)
+            raise
+        os.close(fd)
+
+
+class DocStore:
+    """Team-level content-addressed object store.
+
+    Args:
+        root: Object directory, normally teams/<project>/.objects
+    """
+
+    def __init__(self, root: Path):
+        self.root = Path(root)
+        self.stats = Counter()
+        self._can_reflink = sys.platform.startswith("linux")
+        self._can_hardlink = True
+
+    def object_path(self, digest: str) -> Path:
+        return self.root / digest[:2] / digest
+
+    def put(self, src: Path) -> Path:
+        """Add a file to the store (if not already present) and return its object path."""
+        obj = self.object_path(file_digest(src))
+        if not obj.exists():
+            obj.parent.mkdir(parents=True, exist_ok=True)
+            fd, tmp = tempfile.mkstemp(dir=obj.parent, prefix=".tmp-")
+            os.close(fd)
+            try:
+                shutil.copyfile(src, tmp)
+                os.chmod(tmp, 0o444)
+                os.replace(tmp, obj)
+            except BaseException:
+                if os.path.exists(tmp):
+                    os.unlink(tmp)
+                raise
+        return obj
+
+    def materialize(self, src: Path, target: Path) -> str:
+        """Place the contents of src at target, sharing storage where possible.
+
+        Returns:
+            str: How the file was materialized: "reflink", "hardlink", "copy",
+            or "unchanged" if target already points at the stored object.
+        """
+        obj = self.put(src)
+        target = Path(target)
+        if target.exists():
+            if os.path.samefile(target, obj) or file_digest(target) == obj.name:
+                return self._count("unchanged")
+            target.unlink()
+
+        if self._can_reflink:
+            try:
+                _reflink(obj, target)
+                os.chmod(target, 0o644)
+                return self._count("reflink")
+            except OSError:
+                self._can_reflink = False
+
+        if self._can_hardlink:
+            try:
+                os.link(obj, target)
+                return self._count("hardlink")
+            except OSError as e:
+                if e.errno not in (errno.EXDEV, errno.EPERM, errno.EMLINK, errno.ENOTSUP):
+                    raise
+                self._can_hardlink = False
+
+        shutil.copyfile(obj, target)
+        os.chmod(target, 0o644)
+        return self._count("copy")
+
+    def collect(self, keep, min_age: float = 3600.0, dry_run: bool = False) -> Counter:
+        """Delete stored objects whose digest is not in keep.
+
+        Link counts cannot tell which objects are still used (reflinked and
+        copied docs do not share the inode), so the caller passes the digests
+        the sessions' payloads list. Objects younger than min_age seconds are
+        kept: a build running concurrently may have stored them but not yet
+        written its manifest. Deleting an object never affects a payload; a
+        hardlinked doc keeps its data, it is only no longer shared.
+
+        Returns:
+            Counter: "removed", "kept" and "bytes" (freed)
+        """
+        keep = set(keep)
+        stats = Counter()
+        if not self.root.is_dir():
+            return stats
+        cutoff = time.time() - min_age
+        for bucket in sorted(self.root.iterdir()):
+            if not bucket.is_dir():
+                continue
+            for obj in sorted(bucket.iterdir()):
+                if obj.name.startswith(".") or obj.name in keep:
+                    stats["kept"] += 1
+                    continue
+                st = obj.lstat()
+                if st.st_mtime > cutoff:
+                    stats["kept"] += 1
+                    continue
+                if not dry_run:
+                    obj.unlink()
+                stats["removed"] += 1
+                stats["bytes"] += st.st_size
+            if not dry_run and not any(bucket.iterdir()):
+                bucket.rmdir()
+        return stats
+
+    def _count(self, method: str) -> str:
+        self.stats[method] += 1
+        return method
+
+    def summary(self) -> str:
+        """Short human-readable summary of materialization methods used."""
+        if not self.stats:
+            return "no docs materialized"
+        return ", ".join(f"{n} {method}" for method, n in sorted(self.stats.items()))
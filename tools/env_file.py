@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+"""
+env_file.py - The one parser for team env files, env templates and .env files
+
+Syntax (a compatible subset of what docker compose and python-dotenv accept):
+
+    # full-line comment
+    KEY=value                  # inline comment (needs whitespace before '#')
+    export KEY=value           # the "export" prefix is ignored
+    KEY="double quoted"        # \\n, \\t, \\" and \\\\ escapes; ${VAR} is expanded
+    KEY='single quoted'        # taken literally, no escapes or expansion
+    KEY=${OTHER}-suffix        # ${VAR} refers to any key in the same file
+
+References to keys that are not defined in the file, and a key's reference
+to itself (TEAM_NAME=${TEAM_NAME}), are left as written: env templates use
+them as placeholders that are filled in later. Longer reference cycles
+(A=${B}, B=${A}) raise EnvFileError.
+
+read_env_file() memoizes the parsed result by path, size and mtime, so a crew
+build parses each env file exactly once however many sessions read it.
+"""
+import os
+import re
+import threading
+from pathlib import Path
+from typing import Dict, Iterable, Optional, Tuple
+
+_KEY = re.compile(r"[A-Za-z_][A-Za-z0-9_.-]*")
+_REFERENCE = re.compile(r"\$\{([A-Za-z_][A-Za-z0-9_]*)\}")
+_ESCAPES = {"n": "\n", "t": "\t", "r": "\r", '"': '"', "\\": "\\"}
+
+_cache = {}
+_cache_lock = threading.Lock()
+
+
+class EnvFileError(ValueError):
+    """An env file could not be parsed or interpolated."""
+
+
+def _unquote_double(body: str) -> str:
+    out, i = [], 0
+    while i < len(body):
+        c = body[i]
+        if c == "\\" and i + 1 < len(body):
+            out.append(_ESCAPES.get(body[i + 1], "\\" + body[i + 1]))
+            i += 2
+        else:
+            out.append(c)
+            i += 1
+    return "".join(out)
+
+
+def parse_value(raw: str) -> Tuple[str, bool]:
+    """Parse the text after '=' of one line.
+
+    Returns:
+        tuple: (value, expand) where expand says whether ${VAR} references in
+        value should be interpolated (False for single-quoted values)
+    """
+    raw = raw.strip()
+    if raw[:1] in ('"', "'"):
+        quote = raw[0]
+        i = 1
+        while i < len(raw):
+            if raw[i] == "\\" and quote == '"':
+                i += 2
+                continue
+            if raw[i] == quote:
+                break
+            i += 1
+        if i < len(raw):
+            rest = raw[i + 1 :].strip()
+            if not rest or rest.startswith("#"):
+                body = raw[1:i]
+                if quote == "'":
+                    return body, False
+                return _unquote_double(body), True
+        # Unterminated or followed by more text: treat as unquoted
+    # Unquoted: an inline comment starts at a '#' preceded by whitespace
+    match = re.search(r"\s#", raw)
+    if match:
+        raw = raw[: match.start()]
+    elif raw.startswith("#"):
+        raw = ""
+    return raw.strip(), True
+
+
+def parse_line(line: str) -> Optional[Tuple[str, str, bool]]:
+    """Parse one line into (key, value, expand), or None for blanks, comments
+    and lines that are not assignments."""
+    line = line.strip()
+    if not line or line.startswith("#"):
+        return None
+    if line.startswith("export ") or line.startswith("export\t"):
+        line = line[len("export") :].lstrip()
+    key, sep, raw = line.partition("=")
+    key = key.strip()
+    if not sep or not _KEY.fullmatch(key):
+        return None
+    value, expand = parse_value(raw)
+    return key, value, expand
+
+
+def interpolate(values: Dict[str, str], expand: Iterable[str] = None) -> Dict[str, str]:
+    """Expand ${VAR} references between the values of one file.
+
+    Args:
+        values: Raw parsed values
+        expand: Keys whose values may be expanded (default: all)
+
+    Raises:
+        EnvFileError: On a reference cycle
+    """
+    expand = set(values if expand is None else expand)
+    resolved = {}
+
+    def resolve(key, stack):
+        if key in resolved:
+            return resolved[key]
+        if key in stack:
+            cycle = " -> ".join(stack[stack.index(key) :] + [key])
+            raise EnvFileError(f"Variable reference cycle: {cycle}")
+        value = values[key]
+        if key in expand:
+            stack.append(key)
+
+            def substitute(match):
+                name = match.group(1)
+                if name not in values or name == key:
+                    return match.group(0)
+                return resolve(name, stack)
+
+            value = _REFERENCE.sub(substitute, value)
+            stack.pop()
+        resolved[key] = value
+        return value
+
+    return {key: resolve(key, []) for key in values}
+
+
+def parse_env(text: str, source: str = "<string>") -> Dict[str, str]:
+    """Parse env file text into an ordered dict (later assignments win).
+
+    Raises:
+        EnvFileError: On a reference cycle (the message names source)
+    """
+    values, expand = {}, set()
+    for line in text.splitlines():
+        parsed = parse_line(line)
+        if parsed is None:
+            continue
+        key, value, expandable = parsed
+        values.pop(key, None)  # keep the position of the last assignment
+        values[key] = value
+        if expandable:
+            expand.add(key)
+        else:
+            expand.discard(key)
+    try:
+        return interpolate(values, expand)
+    except EnvFileError as e:
+        raise EnvFileError(f"{source}: {e}") from None
+
+
+def read_env_file(path: Path) -> Dict[str, str]:
+    """Parse an env file, memoized by path, size and mtime.
+
+    Returns a new dict on every call, so callers may modify it.
+
+    Raises:
+        FileNotFoundError: If path does not exist
+        EnvFileError: On a reference cycle
+    """
+    path = Path(path)
+    st = os.stat(path)
+    key = (str(path), st.st_size, st.st_mtime_ns)
+    with _cache_lock:
+        cached = _cache.get(str(path))
+    if cached is None or cached[0] != key:
+        cached = (key, parse_env(path.read_text(), str(path)))
+        with _cache_lock:
+            _cache[str(path)] = cached
+    return dict(cached[1])
+
+
+def parse_assignments(items: Iterable[str]) -> Dict[str, str]:
+    """Parse KEY=VALUE strings (e.g. from --all-env) with the file syntax, without interpolation."""
+    values = {}
+    for item in items or ():
+        parsed = parse_line(item)
+        if parsed is not None:
+            values[parsed[0]] = parsed[1]
+    return values
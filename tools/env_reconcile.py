@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+env_reconcile.py - Resolve placeholders in existing session payloads in one pass
+
+Sessions built from an older template, or before a team env value was filled
+in, can carry unresolved ${VAR} placeholders in payload/.env and
+payload/mcp_config.json, values of other roles, and inline comments in MCP
+env values. `team_cli.py reconcile-env` repairs them in place:
+
+- every ${VAR} is resolved in a single regex pass over the file with a
+  dictionary lookup (placeholders with no value are left as written)
+- assignments belonging to another role are dropped, using a RoleIndex over
+  the role catalog and the project's sessions
+- MCP env values are parsed like .env values, which strips inline comments
+
+Files are only rewritten when their content changes. This replaces
+scripts/deprecated/fix_env_files.py.
+"""
+import json
+import re
+from collections import Counter
+from pathlib import Path
+from typing import Dict, Iterable, Mapping
+
+from env_file import parse_line, parse_value
+from payload_pack import remove_archives
+from payload_sync import write_if_changed
+from role_index import RoleIndex
+
+PLACEHOLDER = re.compile(r"\$\{([A-Za-z_][A-Za-z0-9_]*)\}")
+
+
+def placeholder_values(team_env: Mapping[str, str]) -> Dict[str, str]:
+    """Values for placeholders: the team env plus the derived variables the
+    templates use (team env values win)."""
+    values = {
+        "DOMAIN": "example.com",
+        "TEAM_NAME_CAP": team_env.get("TEAM_NAME", "").replace("-", " ").title(),
+        "LEDGERFLOW_EMAIL_PREFIX": "test",
+    }
+    values.update(team_env)
+    return values
+
+
+def resolve_placeholders(text: str, values: Mapping[str, str]) -> str:
+    """Replace every ${VAR} in text with values[VAR] in one pass."""
+    return PLACEHOLDER.sub(lambda m: values.get(m.group(1), m.group(0)), text)
+
+
+def reconcile_env_text(text: str, values: Mapping[str, str], session: str, index: RoleIndex) -> str:
+    """Resolve placeholders in a .env file and drop other roles' assignments."""
+    lines = []
+    for line in resolve_placeholders(text, values).splitlines():
+        parsed = parse_line(line)
+        if parsed is not None:
+            owner = index.role_of(parsed[0])
+            if owner is not None and owner != session:
+                continue
+        lines.append(line)
+    return "\n".join(lines) + ("\n" if text.endswith("\n") else "")
+
+
+def reconcile_mcp_config(config: dict, values: Mapping[str, str]) -> dict:
+    """Resolve placeholders and strip inline comments in MCP server env values."""
+    for server in config.get("mcpServers", {}).values():
+        env = server.get("env")
+        if not isinstance(env, dict):
+            continue
+        for key, value in env.items():
+            if isinstance(value, str):
+                env[key] = parse_value(resolve_placeholders(value, values))[0]
+    return config
+
+
+def reconcile_session(session_path: Path, values: Mapping[str, str], index: RoleIndex) -> Counter:
+    """Reconcile one session's payload/.env and payload/mcp_config.json.
+
+    A packed payload (team_cli.py pack) no longer matches once a file is
+    rewritten, so the session's payload archives are then deleted.
+
+    Returns:
+        Counter: "written" / "unchanged" per file, "missing" if there is no .env,
+        "archives" for each payload archive deleted
+    """
+    session_path = Path(session_path)
+    stats = Counter()
+    env_path = session_path / "payload" / ".env"
+    if env_path.is_file():
+        text = env_path.read_text()
+        write_if_changed(
+            env_path, reconcile_env_text(text, values, session_path.name, index), stats
+        )
+    else:
+        stats["missing"] += 1
+    mcp_path = session_path / "payload" / "mcp_config.json"
+    if mcp_path.is_file():
+        config = reconcile_mcp_config(json.loads(mcp_path.read_text()), values)
+        write_if_changed(mcp_path, json.dumps(config, indent=4), stats)
+    if stats["written"]:
+        stats["archives"] += remove_archives(session_path)
+    return stats
+
+
+def project_sessions(sessions_dir: Path, project: str) -> list:
+    """Session directories of a project (hidden staging entries excluded)."""
+    root = Path(sessions_dir) / project / "sessions"
+    if not root.is_dir():
+        return []
+    return sorted(d for d in root.iterdir() if d.is_dir() and not d.name.startswith("."))
+
+
+def role_index(roles: Iterable[str], sessions: Iterable[Path]) -> RoleIndex:
+    """Index over the role catalog and a project's session names."""
+    return RoleIndex(set(roles) | {s.name for s in sessions})
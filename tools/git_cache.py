@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+git_cache.py - Per-team bare mirrors that session clones borrow objects from
+
+setup_workspace.sh cloned PROJECT_REPO_URL and MCP_DISCORD_REPO_URL from
+scratch in every session container, so a team of N agents downloaded the
+same history N times. `team_cli.py git-cache` keeps one bare mirror per
+repository under teams/<project>/.git-cache instead, created with
+`git clone --mirror` and refreshed with a single `git fetch --prune`:
+
+    <repo>-<hash of the URL>.git    the mirrors
+    mirrors.tsv                     "<url>\t<mirror>" lines, for the shell
+
+Sessions mount the directory read-only at /.git-cache. setup_workspace.sh
+clones with `--reference-if-able` to the repository's mirror, so only objects
+missing from the mirror are fetched and the clone's history stays in the
+mirror (alternates) instead of being copied. Its alternates path is then made
+relative (../../../../../.git-cache/...), which resolves to the mirror both
+in the container (/workspaces/project/<repo>) and on the host
+(teams/<project>/sessions/<session>/<repo>), since the workspace is a bind
+mount.
+
+Clones depend on the mirror's objects, so mirrors are configured never to
+prune unreachable objects (gc.pruneExpire=never); a force-pushed branch
+cannot take objects away from an existing clone.
+"""
+import hashlib
+import os
+import re
+import shutil
+import subprocess
+import tempfile
+from pathlib import Path
+from typing import Dict, Tuple
+
+from payload_sync import write_if_changed
+
+GIT_CACHE_DIR = ".git-cache"
+# Where sessions mount the cache; see setup_workspace.sh for why it is at /
+GIT_CACHE_MOUNT = "/.git-cache"
+INDEX_FILE = "mirrors.tsv"
+
+
+def mirror_name(url: str) -> str:
+    """Directory name of url's mirror: the repository name plus a hash of the URL."""
+    base = re.sub(r"\.git$", "", url.rstrip("/").rsplit("/", 1)[-1].rsplit(":", 1)[-1])
+    base = re.sub(r"[^A-Za-z0-9_.-]+", "-", base).strip("-.") or "repo"
+    return f"{base}-{hashlib.sha256(url.encode()).hexdigest()[:8]}.git"
+
+
+def _git(*args):
+    subprocess.run(["git", *args], check=True)
+
+
+def update_mirror(url: str, cache_dir: Path) -> Tuple[Path, str]:
+    """Create url's mirror in cache_dir, or fetch into the existing one.
+
+    Returns:
+        tuple: (mirror path, "cloned" or "fetched")
+
+    Raises:
+        subprocess.CalledProcessError: If git fails
+    """
+    cache_dir = Path(cache_dir)
+    mirror = cache_dir / mirror_name(url)
+    if mirror.is_dir():
+        _git("-C", str(mirror), "fetch", "--prune", "--quiet", "origin")
+        return mirror, "fetched"
+
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    tmp = Path(tempfile.mkdtemp(dir=cache_dir, prefix=f".{mirror.name}."))
+    try:
+        _git("clone", "--mirror", "--quiet", url, str(tmp))
+        _git("-C", str(tmp), "config", "gc.pruneExpire", "never")
+        os.chmod(tmp, 0o755)
+        os.rename(tmp, mirror)
+    except BaseException:
+        shutil.rmtree(tmp, ignore_errors=True)
+        raise
+    return mirror, "cloned"
+
+
+def read_index(cache_dir: Path) -> Dict[str, str]:
+    """url -> mirror directory name, from cache_dir/mirrors.tsv."""
+    index = {}
+    try:
+        with open(Path(cache_dir) / INDEX_FILE) as f:
+            for line in f:
+                url, sep, name = line.rstrip("\n").partition("\t")
+                if sep:
+                    index[url] = name
+    except FileNotFoundError:
+        pass
+    return index
+
+
+def write_index(cache_dir: Path, urls) -> Dict[str, str]:
+    """Add urls to mirrors.tsv, dropping entries whose mirror no longer exists."""
+    cache_dir = Path(cache_dir)
+    index = read_index(cache_dir)
+    index.update((url, mirror_name(url)) for url in urls)
+    index = {url: name for url, name in index.items() if (cache_dir / name).is_dir()}
+    write_if_changed(
+        cache_dir / INDEX_FILE, "".join(f"{url}\t{name}\n" for url, name in sorted(index.items()))
+    )
+    return index
@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""
+key_registry.py - Team-level registry of session SSH identities
+
+Each session's SSH identity is kept outside the session directory, so
+rebuilding or cleaning a session does not replace a key that is already
+registered as a deploy key on GitHub:
+
+    teams/<project>/.keys/
+        registry.json            # session -> fingerprint, origin, updated
+        <session>/id_ed25519     # private key (0600)
+        <session>/id_ed25519.pub
+
+Rebuilds reuse the registered identity; a new one is only generated when a
+session has none yet or is explicitly rotated. Keys found in an existing
+session payload are adopted into the registry on first use.
+"""
+import json
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+from payload_sync import write_if_changed
+from ssh_keys import (
+    KeyPair,
+    fingerprint,
+    generate_keypair,
+    generate_with_ssh_keygen,
+    read_keypair,
+    write_keypair,
+)
+
+_registry_lock = threading.Lock()
+
+
+class KeyRegistry:
+    """SSH identities of one project's sessions.
+
+    Args:
+        root: Registry directory, normally teams/<project>/.keys
+    """
+
+    def __init__(self, root: Path):
+        self.root = Path(root)
+        self.index_path = self.root / "registry.json"
+
+    def key_paths(self, session: str) -> Tuple[Path, Path]:
+        private_path = self.root / session / "id_ed25519"
+        return private_path, Path(f"{private_path}.pub")
+
+    def entries(self) -> Dict[str, dict]:
+        """Return the registry index (session -> metadata)."""
+        if not self.index_path.exists():
+            return {}
+        with open(self.index_path) as f:
+            return json.load(f)
+
+    def get(self, session: str) -> Optional[KeyPair]:
+        """Return the registered keypair for a session, or None."""
+        private_path, public_path = self.key_paths(session)
+        if not (private_path.exists() and public_path.exists()):
+            return None
+        return read_keypair(private_path, public_path)
+
+    def put(self, session: str, keypair: KeyPair, origin: str):
+        """Register keypair as the identity of session, replacing any previous one."""
+        private_path, public_path = self.key_paths(session)
+        self.root.mkdir(parents=True, exist_ok=True)
+        # Private keys never belong in git, whatever the repo's .gitignore says
+        write_if_changed(self.root / ".gitignore", "*\n")
+        private_path.parent.mkdir(mode=0o700, exist_ok=True)
+        write_keypair(keypair, private_path, public_path)
+        with _registry_lock:
+            entries = self.entries()
+            entries[session] = {
+                "fingerprint": fingerprint(keypair.public_key),
+                "origin": origin,
+                "updated": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            }
+            write_if_changed(
+                self.index_path, json.dumps(entries, indent=2, sort_keys=True) + "\n"
+            )
+
+    def adopt(self, session: str, private_path: Path, public_path: Path) -> Optional[KeyPair]:
+        """Register an existing keypair (e.g. from a session payload) if the
+        session has no identity yet.
+
+        Returns:
+            KeyPair: The adopted keypair, or None if nothing was adopted
+        """
+        if self.get(session) is not None:
+            return None
+        if not (Path(private_path).exists() and Path(public_path).exists()):
+            return None
+        keypair = read_keypair(private_path, public_path)
+        self.put(session, keypair, "adopted")
+        return keypair
+
+    def needs_key(self, session: str, adopt_from: Tuple[Path, Path] = None) -> bool:
+        """True if resolve() would have to generate a key for session."""
+        if self.get(session) is not None:
+            return False
+        return not (adopt_from and all(Path(p).exists() for p in adopt_from))
+
+    def resolve(
+        self,
+        session: str,
+        comment: str = "",
+        rotate: bool = False,
+        keypair: KeyPair = None,
+        backend: str = "python",
+        adopt_from: Tuple[Path, Path] = None,
+    ) -> Tuple[KeyPair, str]:
+        """Return the identity to use for session, creating one if needed.
+
+        Args:
+            session: Session name
+            comment: Comment for a newly generated key
+            rotate: Replace the registered identity with a new one
+            keypair: Pre-generated keypair to use if a new key is needed
+            backend: "python" or "ssh-keygen", used if a new key is needed
+                and no keypair was given
+            adopt_from: (private, public) paths of a key to adopt if the
+                session has no registered identity
+
+        Returns:
+            tuple: (KeyPair, status) where status is "reused", "adopted",
+            "generated" or "rotated"
+        """
+        if not rotate:
+            existing = self.get(session)
+            if existing is not None:
+                return existing, "reused"
+            if adopt_from:
+                adopted = self.adopt(session, *adopt_from)
+                if adopted is not None:
+                    return adopted, "adopted"
+        status = "rotated" if rotate and self.get(session) is not None else "generated"
+        if keypair is None:
+            keypair = new_keypair(comment, backend)
+        self.put(session, keypair, status)
+        return keypair, status
+
+
+def new_keypair(comment: str = "", backend: str = "python") -> KeyPair:
+    """Generate a keypair in-process or, with backend "ssh-keygen", via ssh-keygen."""
+    if backend != "ssh-keygen":
+        return generate_keypair(comment)
+    with tempfile.TemporaryDirectory() as tmp:
+        private_path = Path(tmp) / "id_ed25519"
+        generate_with_ssh_keygen(private_path, comment)
+        return read_keypair(private_path, Path(f"{private_path}.pub"))
@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+"""
+mcp_template.py - Compiled renderer for roles/<role>/mcp_config.template.json
+
+A template is parsed once into its JSON tree. Every string containing
+${VAR} placeholders is replaced by a Slot that knows its literal and variable
+parts, so rendering a session's config is a walk over the tree that fills
+slots from a dict; there is no regex pass over the raw text per session and a
+value containing quotes or backslashes can no longer corrupt the JSON.
+
+Invalid JSON or malformed placeholders raise McpTemplateError when the
+template is loaded, instead of silently producing an empty config.
+"""
+import json
+import os
+import re
+import threading
+from pathlib import Path
+
+PLACEHOLDER = re.compile(r"\$\{([^}]*)\}")
+VAR_NAME = re.compile(r"[A-Za-z_][A-Za-z0-9_]*\Z")
+
+
+class McpTemplateError(ValueError):
+    """Raised when an MCP config template cannot be compiled."""
+
+
+class Slot:
+    """A template string split into literal text and ${VAR} references."""
+
+    __slots__ = ("parts",)
+
+    def __init__(self, parts):
+        # parts: tuple of (is_var, text) pairs
+        self.parts = parts
+
+    @property
+    def variables(self):
+        return {text for is_var, text in self.parts if is_var}
+
+    def fill(self, env_vars) -> str:
+        return "".join(
+            clean_value(env_vars.get(text, "")) if is_var else text
+            for is_var, text in self.parts
+        )
+
+
+def clean_value(value) -> str:
+    """Strip trailing '# comment' text that leaked into an env value."""
+    if isinstance(value, str) and "#" in value:
+        value = value.split("#")[0].strip()
+    return value
+
+
+def _compile_string(text: str, source: str):
+    parts = []
+    pos = 0
+    for match in PLACEHOLDER.finditer(text):
+        name = match.group(1)
+        if not VAR_NAME.match(name):
+            raise McpTemplateError(
+                f"{source}: invalid placeholder '${{{name}}}' in {text!r}"
+            )
+        if match.start() > pos:
+            parts.append((False, text[pos : match.start()]))
+        parts.append((True, name))
+        pos = match.end()
+    if not parts:
+        return text
+    if pos < len(text):
+        parts.append((False, text[pos:]))
+    return Slot(tuple(parts))
+
+
+def _compile_node(node, source: str):
+    if isinstance(node, str):
+        return _compile_string(node, source)
+    if isinstance(node, list):
+        return [_compile_node(item, source) for item in node]
+    if isinstance(node, dict):
+        return {
+            _compile_string(k, source): _compile_node(v, source)
+            for k, v in node.items()
+        }
+    return node
+
+
+def _render_node(node, env_vars):
+    if isinstance(node, Slot):
+        return node.fill(env_vars)
+    if isinstance(node, list):
+        return [_render_node(item, env_vars) for item in node]
+    if isinstance(node, dict):
+        return {
+            _render_node(k, env_vars): _render_node(v, env_vars)
+            for k, v in node.items()
+        }
+    return node
+
+
+def _collect_variables(node, found: set):
+    if isinstance(node, Slot):
+        found |= node.variables
+    elif isinstance(node, list):
+        for item in node:
+            _collect_variables(item, found)
+    elif isinstance(node, dict):
+        for k, v in node.items():
+            _collect_variables(k, found)
+            _collect_variables(v, found)
+    return found
+
+
+class McpTemplate:
+    """A compiled MCP config template.
+
+    Attributes:
+        source: Where the template came from (for error messages)
+        variables: Names of all ${VAR} placeholders used by the template
+    """
+
+    def __init__(self, text: str, source: str = "<template>"):
+        self.source = source
+        try:
+            tree = json.loads(text)
+        except json.JSONDecodeError as e:
+            raise McpTemplateError(f"{source}: invalid JSON: {e}") from e
+        self._tree = _compile_node(tree, source)
+        self.variables = frozenset(_collect_variables(self._tree, set()))
+
+    def render(self, env_vars) -> dict:
+        """Return a new config tree with every slot filled from env_vars.
+
+        Missing variables render as empty strings.
+        """
+        return _render_node(self._tree, env_vars)
+
+    def missing(self, env_vars) -> list:
+        """Return the sorted placeholder names with no (or an empty) value."""
+        return sorted(
+            name for name in self.variables if not clean_value(env_vars.get(name, ""))
+        )
+
+
+_cache = {}
+_cache_lock = threading.Lock()
+
+
+def load_template(path: Path) -> McpTemplate:
+    """Load and compile a template file, cached by path and mtime.
+
+    Raises:
+        McpTemplateError: If the template is not valid
+    """
+    path = Path(path)
+    st = os.stat(path)
+    key = (str(path), st.st_mtime_ns, st.st_size)
+    with _cache_lock:
+        template = _cache.get(key)
+    if template is None:
+        template = McpTemplate(path.read_text(), source=str(path))
+        with _cache_lock:
+            _cache[key] = template
+    return template
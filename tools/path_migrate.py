@@ -0,0 +1,259 @@
+#!/usr/bin/env python3
+"""
+path_migrate.py - Compiled multi-pattern codemod for path migrations
+
+`team_cli.py migrate-paths` rewrites path references in scripts after a
+layout change. A rule set is a list of regex rules, each with the literal
+anchors that any of its matches must contain. Per file:
+
+1. a literal prefilter checks which anchors occur; a file containing none is
+   skipped without running a regex
+2. the rules whose anchors occur are compiled (once per combination) into
+   a single alternation, so the file is scanned in one pass; at each position
+   the first rule in the list that matches wins, and replaced text is not
+   rescanned
+3. changed files are written atomically (temp file + rename, mode kept), or
+   shown as a unified diff in a dry run
+
+Files are processed by a process pool (regex matching holds the GIL), and
+results are streamed in path order.
+
+The built-in "reorg" rule set is the reorganization that
+scripts/deprecated/update_shell_scripts.py applied (sessions/<project> ->
+teams/<project>/sessions, .env.<project> -> teams/<project>/config/env, ...).
+Other rule sets can be loaded from a JSON file:
+
+    [{"pattern": "...", "replacement": "...", "anchors": ["..."]}, ...]
+"""
+import difflib
+import fnmatch
+import functools
+import json
+import os
+import re
+import shutil
+import tempfile
+from pathlib import Path
+from typing import Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+# Directories never descended into: VCS metadata, virtualenvs and the
+# content-addressed doc stores (teams/<project>/.objects)
+SKIP_DIRS = {".git", ".venv", "venv", "node_modules", "__pycache__", ".objects"}
+DEFAULT_GLOBS = ("*.sh",)
+
+_CMD = r"(cd|cp|mkdir|rm|source|mv|find|ls)(\s+)"
+_NAME = r"([a-zA-Z0-9_-]+)"
+_VAR = r"(\$\{?[A-Za-z0-9_]+\}?)"
+
+
+class Rule(NamedTuple):
+    """One rewrite: a regex, its re.sub-style replacement, and the literals
+    every match contains (used to prefilter files)."""
+
+    pattern: str
+    replacement: str
+    anchors: Tuple[str, ...]
+
+
+RULE_SETS = {
+    "reorg": (
+        # Session paths
+        Rule(_CMD + r"sessions/" + _NAME, r"\1\2teams/\3/sessions", ("sessions/",)),
+        Rule(
+            r"(/workspace/|/home/\w+/)sessions/" + _VAR,
+            r"\1teams/\2/sessions",
+            ("sessions/",),
+        ),
+        Rule(
+            r"(=|\s+)(\"|')(/workspace/|/home/\w+/)sessions/" + _NAME,
+            r"\1\2\3teams/\4/sessions",
+            ("sessions/",),
+        ),
+        Rule(r"sessions/" + _VAR + "/", r"teams/\1/sessions/", ("sessions/",)),
+        Rule(
+            r"(=|\"|'|\s+)sessions/" + _NAME + r"(?=/|\s|\"|'|$)",
+            r"\1teams/\2/sessions",
+            ("sessions/",),
+        ),
+        # Project env files
+        Rule(r"--env-file(\s+)\.env\." + _NAME, r"--env-file\1teams/\2/config/env", (".env.",)),
+        Rule(r"(source|cat|cp|mv)(\s+)\.env\." + _NAME, r"\1\2teams/\3/config/env", (".env.",)),
+        Rule(r"\.env\." + _VAR, r"teams/\1/config/env", (".env.",)),
+        Rule(
+            r"(=|\"|'|\s+)\.env\." + _NAME + r"(?=\s|\"|'|$)",
+            r"\1teams/\2/config/env",
+            (".env.",),
+        ),
+        # Team config files
+        Rule(
+            _CMD + r"teams/" + _NAME + r"/(checklist\.md|env\.template)",
+            r"\1\2teams/\3/config/\4",
+            ("checklist.md", "env.template"),
+        ),
+        Rule(
+            r"(=|\"|'|\s+)teams/" + _NAME + r"/(checklist\.md|env\.template)(?=\s|\"|'|$)",
+            r"\1teams/\2/config/\3",
+            ("checklist.md", "env.template"),
+        ),
+        # Tool paths
+        Rule(r"(python\s+|\./)scaffold_team\.py", r"\1tools/scaffold_team.py", ("scaffold_team.py",)),
+        Rule(r"(python\s+|\./)team-cli/team_cli\.py", r"\1tools/team_cli.py", ("team_cli.py",)),
+        Rule(r"team-cli\.py", r"tools/team_cli.py", ("team-cli.py",)),
+    ),
+}
+
+
+def load_rules(spec: str) -> Tuple[Rule, ...]:
+    """Return a built-in rule set by name, or load one from a JSON file."""
+    if spec in RULE_SETS:
+        return RULE_SETS[spec]
+    with open(spec) as f:
+        return tuple(
+            Rule(r["pattern"], r["replacement"], tuple(r["anchors"])) for r in json.load(f)
+        )
+
+
+@functools.lru_cache(maxsize=None)
+def _compile(rules: Tuple[Rule, ...]):
+    """Compile rules into one alternation plus the per-rule regexes used to expand matches."""
+    combined = re.compile("|".join(f"(?P<r{i}>{rule.pattern})" for i, rule in enumerate(rules)))
+    return combined, [re.compile(rule.pattern) for rule in rules]
+
+
+def rewrite(text: str, rules: Tuple[Rule, ...]) -> Tuple[str, int]:
+    """Apply rules to text in one pass.
+
+    Returns:
+        tuple: (new text, number of replacements)
+    """
+    active = tuple(rule for rule in rules if any(a in text for a in rule.anchors))
+    if not active:
+        return text, 0
+    combined, regexes = _compile(active)
+    count = 0
+
+    def replace(match):
+        nonlocal count
+        i = int(match.lastgroup[1:])
+        # Re-match with the rule's own regex so its group numbers apply
+        own = regexes[i].match(text, match.start())
+        count += 1
+        return own.expand(active[i].replacement)
+
+    return combined.sub(replace, text), count
+
+
+def write_atomic(path: Path, content: str):
+    """Replace path with content via a temp file and rename, keeping its mode."""
+    path = Path(path)
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.")
+    try:
+        with os.fdopen(fd, "w") as f:
+            f.write(content)
+        shutil.copymode(path, tmp)
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.unlink(tmp)
+        raise
+
+
+def diff_label(path: str, roots: Iterable[str] = ()) -> str:
+    """Relative posix path for diff headers: relative to the current directory
+    if path is inside it, else to the root it was found under."""
+    rel = os.path.relpath(path)
+    if rel.split(os.sep)[0] == "..":
+        path = os.path.abspath(path)
+        for root in map(os.path.abspath, roots):
+            if os.path.isdir(root) and os.path.commonpath([root, path]) == root:
+                rel = os.path.relpath(path, root)
+                break
+        else:
+            rel = os.path.basename(path)
+    return Path(rel).as_posix()
+
+
+def migrate_file(path: str, rules: Tuple[Rule, ...], execute: bool = False, label: str = None):
+    """Rewrite one file.
+
+    Args:
+        path: File to rewrite
+        rules: Rule set
+        execute: Write the file instead of producing a diff
+        label: Relative path used in the diff headers (default: diff_label(path))
+
+    Returns:
+        tuple: (path, replacements, diff or None, error or None); diff is only
+        produced for dry runs
+    """
+    try:
+        with open(path, encoding="utf-8") as f:
+            text = f.read()
+        new, count = rewrite(text, rules)
+        if not count or new == text:
+            return path, 0, None, None
+        label = label or diff_label(path)
+        if execute:
+            write_atomic(path, new)
+            return path, count, None, None
+        diff = "".join(
+            difflib.unified_diff(
+                text.splitlines(keepends=True),
+                new.splitlines(keepends=True),
+                fromfile=f"a/{label}",
+                tofile=f"b/{label}",
+            )
+        )
+        return path, count, diff, None
+    except (OSError, UnicodeDecodeError) as e:
+        return path, 0, None, str(e)
+
+
+def find_files(roots: Iterable[str], globs: Iterable[str] = DEFAULT_GLOBS) -> List[str]:
+    """Files under roots (or the roots themselves, if files) matching any glob, sorted."""
+    globs = tuple(globs)
+    files = []
+    for root in roots:
+        if os.path.isfile(root):
+            files.append(root)
+            continue
+        for dirpath, dirnames, filenames in os.walk(root):
+            dirnames[:] = [d for d in dirnames if d not in SKIP_DIRS]
+            files.extend(
+                os.path.join(dirpath, name)
+                for name in filenames
+                if any(fnmatch.fnmatch(name, g) for g in globs)
+            )
+    return sorted(files)
+
+
+def _migrate_labelled(item, rules, execute):
+    path, label = item
+    return migrate_file(path, rules, execute, label)
+
+
+def migrate(
+    files: List[str],
+    rules: Tuple[Rule, ...],
+    execute: bool = False,
+    jobs: Optional[int] = None,
+    roots: Iterable[str] = (),
+) -> Iterator[tuple]:
+    """Yield migrate_file results in file order, using a process pool for jobs > 1.
+
+    roots are the directories files were found under, for the diff headers.
+    """
+    jobs = jobs or os.cpu_count() or 1
+    roots = tuple(roots)
+    labels = [diff_label(path, roots) for path in files]
+    if jobs <= 1 or len(files) < 2:
+        for path, label in zip(files, labels):
+            yield migrate_file(path, rules, execute, label)
+        return
+
+    from concurrent.futures import ProcessPoolExecutor
+
+    work = functools.partial(_migrate_labelled, rules=rules, execute=execute)
+    chunksize = max(1, min(256, len(files) // (jobs * 4)))
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        yield from pool.map(work, zip(files, labels), chunksize=chunksize)
@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+"""
+payload_pack.py - Pack a session payload into one verified archive
+
+`team_cli.py pack` writes teams/<project>/sessions/<name>/payload.tar.zst:
+a tar stream whose first member is a manifest (.payload-manifest.json)
+listing every file's path, size, mode and sha256, followed by the payload in
+path order. restore_payload.sh unpacks it inside the container with
+payload_restore.py in a single streaming pass, checking each file against the
+manifest, instead of running cp -r over hundreds of small files on a bind
+mount. Moving a session to another host is a copy of one file.
+
+Compression uses the zstd binary (multi-threaded) when it is installed and
+falls back to gzip. The archive is written to a temporary file and renamed
+into place, so a container never sees a partial archive. Everything that
+changes a payload deletes the archive, since it would no longer match: a
+rebuild (create-session, create-crew, build), rotate-keys, reconcile-env and
+watch.
+
+Every build also writes the manifest into the payload itself
+(write_manifest), so that `payload_restore.py sync` can skip unchanged files
+on container restarts without hashing them.
+"""
+import io
+import json
+import os
+import shutil
+import subprocess
+import tarfile
+import tempfile
+import time
+from pathlib import Path
+from typing import Optional
+
+from doc_store import file_digest
+from payload_restore import MANIFEST_NAME, scan_payload
+from payload_sync import sync_file, write_if_changed
+
+ARCHIVE_STEM = "payload.tar"
+COMPRESSIONS = ("auto", "zstd", "gzip", "none")
+SUFFIXES = {"zstd": ".zst", "gzip": ".gz", "none": ""}
+# Container-side unpacker, installed with the archive
+RESTORE_SCRIPT = Path(__file__).resolve().parent / "payload_restore.py"
+RESTORE_SCRIPT_DEST = Path(".devcontainer/scripts/payload_restore.py")
+
+
+def resolve_compression(compression: str = "auto") -> str:
+    """Map "auto" to zstd if the zstd binary is installed, else gzip."""
+    if compression == "auto":
+        return "zstd" if shutil.which("zstd") else "gzip"
+    return compression
+
+
+def archive_paths(session_path: Path):
+    """Every payload archive a session may have, whatever its compression."""
+    return [Path(session_path) / (ARCHIVE_STEM + suffix) for suffix in SUFFIXES.values()]
+
+
+def remove_archives(session_path: Path) -> int:
+    """Delete a session's payload archives. Returns how many were deleted."""
+    removed = 0
+    for path in archive_paths(session_path):
+        if path.exists():
+            path.unlink()
+            removed += 1
+    return removed
+
+
+def _root_owned(info: tarfile.TarInfo) -> tarfile.TarInfo:
+    info.uid = info.gid = 0
+    info.uname = info.gname = "root"
+    return info
+
+
+def _write_tar(fileobj, payload_dir: Path, manifest: dict):
+    data = json.dumps(manifest, indent=1, sort_keys=True).encode()
+    with tarfile.open(fileobj=fileobj, mode="w|", format=tarfile.PAX_FORMAT) as tar:
+        info = _root_owned(tarfile.TarInfo(MANIFEST_NAME))
+        info.size, info.mtime, info.mode = len(data), int(time.time()), 0o644
+        tar.addfile(info, io.BytesIO(data))
+        for rel in manifest["dirs"] + manifest["symlinks"]:
+            tar.add(payload_dir / rel, arcname=rel, recursive=False, filter=_root_owned)
+        for entry in manifest["files"]:
+            tar.add(payload_dir / entry["path"], arcname=entry["path"], filter=_root_owned)
+
+
+def pack_session(session_path: Path, compression: str = "auto", level: Optional[int] = None) -> dict:
+    """Pack session_path/payload into session_path/payload.tar[.zst|.gz].
+
+    Returns:
+        dict: {"archive", "files", "bytes", "archive_bytes", "seconds"}
+
+    Raises:
+        FileNotFoundError: If the session has no payload
+        subprocess.CalledProcessError: If zstd fails
+    """
+    start = time.perf_counter()
+    session_path = Path(session_path)
+    payload_dir = session_path / "payload"
+    if not payload_dir.is_dir():
+        raise FileNotFoundError(f"No payload directory at {payload_dir}")
+    compression = resolve_compression(compression)
+    archive = session_path / (ARCHIVE_STEM + SUFFIXES[compression])
+    manifest = scan_payload(payload_dir, digest=file_digest)
+    manifest["created"] = time.strftime("%Y-%m-%dT%H:%M:%S%z")
+
+    fd, tmp = tempfile.mkstemp(dir=session_path, prefix=f".{archive.name}.")
+    try:
+        with os.fdopen(fd, "wb") as out:
+            if compression == "zstd":
+                cmd = ["zstd", "-q", "-T0", f"-{level or 3}"]
+                proc = subprocess.Popen(cmd, stdin=subprocess.PIPE, stdout=out)
+                try:
+                    _write_tar(proc.stdin, payload_dir, manifest)
+                finally:
+                    proc.stdin.close()
+                    if proc.wait() != 0:
+                        raise subprocess.CalledProcessError(proc.returncode, cmd)
+            elif compression == "gzip":
+                import gzip
+
+                with gzip.GzipFile(fileobj=out, mode="wb", compresslevel=level or 6, mtime=0) as gz:
+                    _write_tar(gz, payload_dir, manifest)
+            else:
+                _write_tar(out, payload_dir, manifest)
+        os.chmod(tmp, 0o644)
+        # Drop archives in other formats so restore_payload.sh finds only this one
+        remove_archives(session_path)
+        os.replace(tmp, archive)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.unlink(tmp)
+        raise
+    return {
+        "archive": archive,
+        "files": len(manifest["files"]),
+        "bytes": manifest["bytes"],
+        "archive_bytes": archive.stat().st_size,
+        "seconds": time.perf_counter() - start,
+    }
+
+
+def write_manifest(session_path: Path, stats=None) -> dict:
+    """Write session_path/payload/.payload-manifest.json for payload_restore.py sync.
+
+    Returns:
+        dict: The manifest
+    """
+    payload_dir = Path(session_path) / "payload"
+    manifest = scan_payload(payload_dir, digest=file_digest)
+    write_if_changed(payload_dir / MANIFEST_NAME, json.dumps(manifest, indent=1, sort_keys=True), stats)
+    return manifest
+
+
+def install_restore_script(session_path: Path, stats=None) -> Path:
+    """Install payload_restore.py in the session's .devcontainer/scripts."""
+    dst = Path(session_path) / RESTORE_SCRIPT_DEST
+    sync_file(RESTORE_SCRIPT, dst, stats)
+    return dst
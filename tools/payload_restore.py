@@ -0,0 +1,421 @@
+#!/usr/bin/env python3
+"""
+payload_restore.py - Restore a session payload inside its container
+
+Runs inside the session container (standard library only; .tar.zst needs the
+zstd binary). Sessions get a copy in .devcontainer/scripts, and
+restore_payload.sh calls it on every container start:
+
+    python3 payload_restore.py unpack /workspaces/project/payload.tar.zst /tmp/payload
+    python3 payload_restore.py sync /tmp/payload     # or /workspaces/project/payload
+    python3 payload_restore.py verify payload.tar.zst
+
+unpack reads a packed payload (`team_cli.py pack`) in one streaming pass.
+Its first member is the manifest; every file is checked against the
+manifest's size and sha256 as it is extracted into a staging directory that
+replaces DEST only once the whole archive has been verified. If DEST already
+holds the same manifest, only the manifest is read.
+
+sync copies the payload to where the container expects it (RESTORE_MAP:
+SSH keys, .env, MCP config, docs, Cline docs, ...). It compares the payload's
+manifest (.payload-manifest.json, written by every build, with each file's
+size, mtime and sha256) with the stamp file of the last restore
+(~/.payload-restore.json, the sha256, size and mtime of each file it
+copied). A file is copied only if its hash changed or its destination was
+modified or deleted since, and files a previous restore created that are no
+longer in the payload are removed. Payload files are only read when their
+size or mtime differs from the manifest, so a restart with an unchanged
+payload does no more than stat both sides.
+"""
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tarfile
+import tempfile
+import time
+from contextlib import contextmanager
+from pathlib import Path, PurePosixPath
+
+MANIFEST_NAME = ".payload-manifest.json"
+MANIFEST_VERSION = 1
+STAMP_NAME = ".payload-restore.json"
+
+# Payload path prefix -> destination, relative to the project root ("{project}")
+# or the user's home ("{home}"); the first matching prefix wins.
+RESTORE_MAP = (
+    (".ssh/", "{home}/.ssh/"),
+    (".env", "{project}/.env"),
+    ("mcp_config.json", "{home}/.codeium/windsurf/mcp_config.json"),
+    ("docs/", "{project}/docs/"),
+    ("global_rules.md", "{project}/docs/global_rules.md"),
+    (".windsurfrules", "{project}/.windsurfrules"),
+    ("cline_docs/", "{project}/cline_docs/"),
+    ("cline_docs_shared/", "{project}/cline_docs_shared/"),
+)
+# Destinations that must stay private whatever mode the payload has
+PRIVATE = ("{home}/.ssh/id_rsa",)
+
+
+class PayloadError(Exception):
+    """The archive is unreadable or does not match its manifest."""
+
+
+def sha256_file(path: Path) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def build_manifest(payload_dir: Path, digest=sha256_file) -> dict:
+    """List the payload's directories, symlinks and files (with sha256) in path order.
+
+    Args:
+        payload_dir: Payload directory (its own manifest file is left out)
+        digest: Function returning a file's sha256 hex digest
+    """
+    payload_dir = Path(payload_dir)
+    dirs, files, links = [], [], []
+    for dirpath, dirnames, filenames in os.walk(payload_dir):
+        dirnames.sort()
+        rel_dir = Path(dirpath).relative_to(payload_dir)
+        for name in dirnames:
+            path = Path(dirpath) / name
+            (links if path.is_symlink() else dirs).append((rel_dir / name).as_posix())
+        for name in sorted(filenames):
+            path = Path(dirpath) / name
+            rel = (rel_dir / name).as_posix()
+            if rel == MANIFEST_NAME:
+                continue
+            if path.is_symlink():
+                links.append(rel)
+                continue
+            st = path.stat()
+            files.append(
+                {
+                    "path": rel,
+                    "size": st.st_size,
+                    "mtime_ns": st.st_mtime_ns,
+                    "mode": st.st_mode & 0o7777,
+                    "sha256": digest(path),
+                }
+            )
+    return {
+        "version": MANIFEST_VERSION,
+        "dirs": dirs,
+        "symlinks": sorted(links),
+        "files": files,
+        "bytes": sum(f["size"] for f in files),
+    }
+
+
+def scan_payload(payload_dir: Path, digest=sha256_file) -> dict:
+    """Build payload_dir's manifest, reusing the hashes of its saved manifest.
+
+    A file whose size and mtime still match its saved entry is not read, so
+    a manifest that went stale (say, after .env was edited by hand) is only
+    rehashed where it changed.
+    """
+    payload_dir = Path(payload_dir)
+    try:
+        with open(payload_dir / MANIFEST_NAME) as f:
+            saved = json.load(f)
+        cached = {f["path"]: f for f in saved["files"]} if saved.get("version") == MANIFEST_VERSION else {}
+    except (OSError, ValueError, KeyError, TypeError):
+        cached = {}
+
+    def cached_digest(path: Path) -> str:
+        entry = cached.get(path.relative_to(payload_dir).as_posix())
+        st = path.stat()
+        if entry and entry["size"] == st.st_size and entry.get("mtime_ns") == st.st_mtime_ns:
+            return entry["sha256"]
+        return digest(path)
+
+    return build_manifest(payload_dir, cached_digest)
+
+
+def _write_json(path: Path, data: dict):
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.")
+    with os.fdopen(fd, "w") as f:
+        json.dump(data, f, indent=1, sort_keys=True)
+    os.replace(tmp, path)
+
+
+# --- unpack / verify ---
+
+
+@contextmanager
+def open_stream(archive: Path, partial: bool = False):
+    """Open archive as a streaming tarfile, decompressing by suffix.
+
+    With partial, the caller may stop reading early (zstd then exits on a
+    broken pipe, which is not an error).
+    """
+    archive = Path(archive)
+    if archive.suffix == ".zst":
+        if shutil.which("zstd") is None:
+            raise PayloadError("zstd is not installed; cannot read " + str(archive))
+        proc = subprocess.Popen(["zstd", "-dcq", str(archive)], stdout=subprocess.PIPE)
+        try:
+            with tarfile.open(fileobj=proc.stdout, mode="r|") as tar:
+                yield tar
+        except BaseException:
+            proc.stdout.close()
+            proc.wait()
+            raise
+        proc.stdout.close()
+        if partial:
+            proc.kill()
+        if proc.wait() != 0 and not partial:
+            raise PayloadError(f"zstd failed to decompress {archive}")
+    else:
+        mode = "r|gz" if archive.suffix == ".gz" else "r|"
+        with tarfile.open(archive, mode=mode) as tar:
+            yield tar
+
+
+def _read_manifest(tar, archive) -> dict:
+    first = tar.next()
+    if first is None or first.name != MANIFEST_NAME:
+        raise PayloadError(f"{archive} does not start with {MANIFEST_NAME}")
+    manifest = json.load(tar.extractfile(first))
+    if manifest.get("version") != MANIFEST_VERSION:
+        raise PayloadError(f"Unsupported manifest version {manifest.get('version')}")
+    return manifest
+
+
+def archive_manifest(archive: Path) -> dict:
+    """Read only the manifest of an archive."""
+    try:
+        with open_stream(archive, partial=True) as tar:
+            return _read_manifest(tar, archive)
+    except (tarfile.TarError, OSError, ValueError) as e:
+        raise PayloadError(f"Cannot read {archive}: {e}") from e
+
+
+def _safe_path(name: str) -> PurePosixPath:
+    path = PurePosixPath(name)
+    if path.is_absolute() or ".." in path.parts:
+        raise PayloadError(f"Unsafe path in archive: {name}")
+    return path
+
+
+def _copy_member(tar, member, dst, h):
+    """Stream a regular file member to dst (if not None), hashing it."""
+    src = tar.extractfile(member)
+    out = open(dst, "wb") if dst is not None else None
+    try:
+        for chunk in iter(lambda: src.read(1 << 20), b""):
+            h.update(chunk)
+            if out is not None:
+                out.write(chunk)
+    finally:
+        if out is not None:
+            out.close()
+
+
+def restore(archive: Path, dest: Path = None) -> dict:
+    """Extract archive to dest after verifying it against its manifest.
+
+    The manifest is written to dest as well, for sync.
+
+    Args:
+        archive: payload.tar[.zst|.gz] written by `team_cli.py pack`
+        dest: Directory to (re)create; None only verifies
+
+    Returns:
+        dict: The manifest
+
+    Raises:
+        PayloadError: If the archive does not match its manifest
+    """
+    staging = None
+    if dest is not None:
+        dest = Path(dest)
+        dest.parent.mkdir(parents=True, exist_ok=True)
+        staging = Path(tempfile.mkdtemp(dir=dest.parent, prefix=f".{dest.name}.unpack-"))
+    try:
+        with open_stream(archive) as tar:
+            manifest = _read_manifest(tar, archive)
+            expected = {f["path"]: f for f in manifest["files"]}
+            seen = set()
+            # tar.next(), not iteration: iterating a stream restarts with the manifest
+            for member in iter(tar.next, None):
+                path = _safe_path(member.name)
+                target = staging / path if staging is not None else None
+                if member.isdir():
+                    if target is not None:
+                        target.mkdir(parents=True, exist_ok=True)
+                        os.chmod(target, member.mode)
+                elif member.issym():
+                    if target is not None:
+                        target.parent.mkdir(parents=True, exist_ok=True)
+                        os.symlink(member.linkname, target)
+                elif member.isfile():
+                    entry = expected.get(member.name)
+                    if entry is None:
+                        raise PayloadError(f"{member.name} is not in the manifest")
+                    if target is not None:
+                        target.parent.mkdir(parents=True, exist_ok=True)
+                    h = hashlib.sha256()
+                    _copy_member(tar, member, target, h)
+                    if member.size != entry["size"] or h.hexdigest() != entry["sha256"]:
+                        raise PayloadError(f"{member.name} does not match the manifest")
+                    if target is not None:
+                        os.chmod(target, member.mode)
+                        # Keep the manifest's mtimes so sync can trust its hashes
+                        mtime_ns = entry.get("mtime_ns", int(member.mtime * 1e9))
+                        os.utime(target, ns=(mtime_ns, mtime_ns))
+                    seen.add(member.name)
+                else:
+                    raise PayloadError(f"Unsupported member type: {member.name}")
+        missing = sorted(set(expected) - seen)
+        if missing:
+            raise PayloadError(f"{len(missing)} file(s) missing from the archive, e.g. {missing[0]}")
+        if staging is not None:
+            _write_json(staging / MANIFEST_NAME, manifest)
+            os.chmod(staging, 0o755)
+            if dest.exists():
+                shutil.rmtree(dest)
+            os.rename(staging, dest)
+            staging = None
+        return manifest
+    except (tarfile.TarError, OSError, ValueError, KeyError) as e:
+        raise PayloadError(f"Cannot read {archive}: {e}") from e
+    finally:
+        if staging is not None:
+            shutil.rmtree(staging, ignore_errors=True)
+
+
+# --- sync ---
+
+
+def destination(rel: str, project_root: str, home: str):
+    """Where payload file rel is restored to, or None if it is not restored."""
+    for prefix, target in RESTORE_MAP:
+        if prefix.endswith("/"):
+            if rel.startswith(prefix):
+                return target.format(project=project_root, home=home) + rel[len(prefix) :]
+        elif rel == prefix:
+            return target.format(project=project_root, home=home)
+    return None
+
+
+def _unchanged(dest: str, stamped: dict, sha256: str) -> bool:
+    if not stamped or stamped["sha256"] != sha256:
+        return False
+    try:
+        st = os.stat(dest)
+    except FileNotFoundError:
+        return False
+    return st.st_size == stamped["size"] and st.st_mtime_ns == stamped["mtime_ns"]
+
+
+def sync(payload_dir: Path, project_root: str, home: str, stamp_path: Path) -> dict:
+    """Copy changed payload files to their destinations.
+
+    Returns:
+        dict: Counts of "copied", "unchanged" and "removed"
+    """
+    payload_dir = Path(payload_dir)
+    manifest = scan_payload(payload_dir)
+    try:
+        with open(stamp_path) as f:
+            stamp = json.load(f)
+    except (OSError, ValueError):
+        stamp = {}
+    private = {p.format(project=project_root, home=home) for p in PRIVATE}
+
+    counts = {"copied": 0, "unchanged": 0, "removed": 0}
+    new_stamp = {}
+    for entry in manifest["files"]:
+        dest = destination(entry["path"], project_root, home)
+        if dest is None:
+            continue
+        if _unchanged(dest, stamp.get(dest), entry["sha256"]):
+            new_stamp[dest] = stamp[dest]
+            counts["unchanged"] += 1
+            continue
+        os.makedirs(os.path.dirname(dest), exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(dest), prefix=f".{os.path.basename(dest)}.")
+        os.close(fd)
+        try:
+            shutil.copyfile(payload_dir / entry["path"], tmp)
+            os.chmod(tmp, 0o600 if dest in private else entry["mode"])
+            os.replace(tmp, dest)
+        except BaseException:
+            if os.path.exists(tmp):
+                os.unlink(tmp)
+            raise
+        st = os.stat(dest)
+        new_stamp[dest] = {"sha256": entry["sha256"], "size": st.st_size, "mtime_ns": st.st_mtime_ns}
+        counts["copied"] += 1
+
+    # Remove files an earlier restore created that are gone from the payload,
+    # unless they were modified in the container since
+    for dest, stamped in stamp.items():
+        if dest not in new_stamp and _unchanged(dest, stamped, stamped["sha256"]):
+            os.unlink(dest)
+            counts["removed"] += 1
+
+    if new_stamp != stamp:
+        _write_json(stamp_path, new_stamp)
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Restore a session payload in its container")
+    sub = parser.add_subparsers(dest="command", required=True)
+    unpack_parser = sub.add_parser("unpack", help="Unpack and verify a packed payload")
+    unpack_parser.add_argument("archive", help="payload.tar.zst / payload.tar.gz / payload.tar")
+    unpack_parser.add_argument("dest", help="Directory to extract to")
+    verify_parser = sub.add_parser("verify", help="Check a packed payload against its manifest")
+    verify_parser.add_argument("archive")
+    sync_parser = sub.add_parser("sync", help="Copy changed payload files into place")
+    sync_parser.add_argument("payload_dir", help="Payload directory")
+    sync_parser.add_argument(
+        "--project-root",
+        default=os.environ.get("PROJECT_ROOT", "/workspaces/project"),
+        help="Project root in the container (default: $PROJECT_ROOT or /workspaces/project)",
+    )
+    sync_parser.add_argument("--home", default=os.path.expanduser("~"), help="Home directory")
+    sync_parser.add_argument("--stamp", help=f"Stamp file (default: ~/{STAMP_NAME})")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    try:
+        if args.command == "unpack":
+            try:
+                with open(Path(args.dest) / MANIFEST_NAME) as f:
+                    current = json.load(f)
+            except (OSError, ValueError):
+                current = None
+            if current is not None and current == archive_manifest(args.archive):
+                print(f"{args.dest} is up to date with {args.archive}")
+                return
+            manifest = restore(args.archive, args.dest)
+            print(f"Restored to {args.dest}: {len(manifest['files'])} files, {manifest['bytes']} bytes")
+        elif args.command == "verify":
+            manifest = restore(args.archive)
+            print(f"Verified {len(manifest['files'])} files, {manifest['bytes']} bytes")
+        else:
+            stamp = args.stamp or os.path.join(args.home, STAMP_NAME)
+            counts = sync(args.payload_dir, args.project_root, args.home, stamp)
+            print(
+                f"Synced {args.payload_dir}: {counts['copied']} copied, {counts['unchanged']} "
+                f"unchanged, {counts['removed']} removed ({time.perf_counter() - start:.2f}s)"
+            )
+    except PayloadError as e:
+        print(f"ERROR: {e}", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,235 @@
+#!/usr/bin/env python3
+"""
+payload_sync.py - rsync-style incremental sync for session payloads
+
+Rebuilding a session used to remove and recopy whole directory trees. These
+helpers compare source and destination first and only rewrite files that
+actually changed:
+
+- files with the same size and mtime are assumed identical (quick check)
+- files with the same size but a different mtime are compared by sha256
+- changed files are written to a temp file and renamed into place, as are
+  hardlinked files whose metadata would change, so shared inodes are never
+  modified
+- orphans (files in the destination with no source) are deleted
+
+Every helper accepts an optional ``stats`` Counter that is incremented with
+"written", "unchanged" and "removed" so callers can report what was touched.
+"""
+import os
+import shutil
+import stat
+import tempfile
+from collections import Counter
+from pathlib import Path
+
+from doc_store import file_digest
+
+
+def files_match(src: Path, dst: Path) -> bool:
+    """Return True if dst exists and has the same content as src."""
+    try:
+        s, d = os.stat(src), os.stat(dst)
+    except FileNotFoundError:
+        return False
+    if s.st_size != d.st_size:
+        return False
+    if s.st_mtime_ns == d.st_mtime_ns:
+        return True
+    return file_digest(src) == file_digest(dst)
+
+
+def _umask() -> int:
+    mask = os.umask(0)
+    os.umask(mask)
+    return mask
+
+
+_UMASK = _umask()
+
+
+def _replace_with(dst: Path, write):
+    """Write a new file next to dst via ``write(tmp_path)`` and rename it into place."""
+    dst = Path(dst)
+    dst.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=dst.parent, prefix=f".{dst.name}.")
+    # mkstemp creates 0600; give the file the mode open() would have
+    os.fchmod(fd, 0o666 & ~_UMASK)
+    os.close(fd)
+    try:
+        write(tmp)
+        os.replace(tmp, dst)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.unlink(tmp)
+        raise
+
+
+def sync_file(src: Path, dst: Path, stats: Counter = None) -> bool:
+    """Copy src to dst (with metadata) unless dst already matches.
+
+    Returns:
+        bool: True if dst was written
+    """
+    stats = stats if stats is not None else Counter()
+    if files_match(src, dst):
+        s, d = os.stat(src), os.stat(dst)
+        # A hardlinked dst shares its inode with a doc store object or a live
+        # session file: copystat would change those too, so dst gets its own
+        # copy instead. A read-only shared inode is a store object, which
+        # --no-doc-store builds must not keep linking to even when it matches.
+        shared = d.st_nlink > 1 and (
+            s.st_mtime_ns != d.st_mtime_ns or not d.st_mode & stat.S_IWUSR
+        )
+        if not shared:
+            if s.st_mtime_ns != d.st_mtime_ns:
+                # Same content, different mtime: align it so the next quick check hits
+                shutil.copystat(src, dst)
+            stats["unchanged"] += 1
+            return False
+    _replace_with(dst, lambda tmp: shutil.copy2(src, tmp))
+    stats["written"] += 1
+    return True
+
+
+def write_if_changed(dst: Path, content: str, stats: Counter = None) -> bool:
+    """Write text content to dst unless it already has exactly that content.
+
+    Returns:
+        bool: True if dst was written
+    """
+    stats = stats if stats is not None else Counter()
+    data = content.encode()
+    try:
+        if os.path.getsize(dst) == len(data) and Path(dst).read_bytes() == data:
+            stats["unchanged"] += 1
+            return False
+    except FileNotFoundError:
+        pass
+    _replace_with(dst, lambda tmp: Path(tmp).write_bytes(data))
+    stats["written"] += 1
+    return True
+
+
+def remove_orphans(root: Path, keep, stats: Counter = None, ignore=()):
+    """Delete files under root whose relative posix path is not in ``keep``.
+
+    Args:
+        root: Directory to clean
+        keep: Collection of relative paths (e.g. "global/README.md") to keep
+        stats: Optional Counter incremented with "removed"
+        ignore: Top-level names under root that are never touched
+    """
+    stats = stats if stats is not None else Counter()
+    root = Path(root)
+    if not root.is_dir():
+        return
+    keep = set(keep)
+    visited = []
+    for dirpath, dirnames, filenames in os.walk(root):
+        rel_dir = Path(dirpath).relative_to(root)
+        if not rel_dir.parts:
+            dirnames[:] = [d for d in dirnames if d not in ignore]
+            filenames = [f for f in filenames if f not in ignore]
+        else:
+            visited.append(dirpath)
+        for name in filenames:
+            if (rel_dir / name).as_posix() not in keep:
+                os.unlink(os.path.join(dirpath, name))
+                stats["removed"] += 1
+    # Prune directories left empty, deepest first
+    for dirpath in reversed(visited):
+        if not os.listdir(dirpath):
+            os.rmdir(dirpath)
+
+
+def remove_files(root: Path, files, stats: Counter = None):
+    """Delete the given files under root and prune the directories they leave empty.
+
+    Unlike remove_orphans this touches nothing but ``files``, for trees that
+    also hold content the caller does not own.
+
+    Args:
+        root: Directory the paths are relative to (never removed itself)
+        files: Relative posix paths to delete; missing ones are skipped
+        stats: Optional Counter incremented with "removed"
+    """
+    stats = stats if stats is not None else Counter()
+    root = Path(root)
+    parents = set()
+    for rel in files:
+        path = root / rel
+        try:
+            os.unlink(path)
+        except FileNotFoundError:
+            continue
+        stats["removed"] += 1
+        parents.update(p for p in path.parents if root in p.parents)
+    # Prune directories left empty, deepest first
+    for path in sorted(parents, key=lambda p: len(p.parts), reverse=True):
+        try:
+            os.rmdir(path)
+        except OSError:
+            pass  # not empty
+
+
+def list_tree(src: Path, ignore=()) -> tuple:
+    """Return the sorted posix paths of all files under src, relative to src.
+
+    Args:
+        src: Directory to list (a missing directory lists as empty)
+        ignore: Top-level names to leave out
+    """
+    src = Path(src)
+    files = []
+    for dirpath, dirnames, filenames in os.walk(src):
+        rel_dir = Path(dirpath).relative_to(src)
+        if not rel_dir.parts:
+            dirnames[:] = [d for d in dirnames if d not in ignore]
+            filenames = [f for f in filenames if f not in ignore]
+        files.extend((rel_dir / name).as_posix() for name in filenames)
+    return tuple(sorted(files))
+
+
+def sync_tree(
+    src: Path,
+    dst: Path,
+    delete: bool = True,
+    ignore=(),
+    stats: Counter = None,
+    copied: set = None,
+    files=None,
+) -> Counter:
+    """Make dst mirror src, rewriting only files that changed.
+
+    Args:
+        src: Source directory
+        dst: Destination directory (created if missing)
+        delete: Remove files in dst that no longer exist in src
+        ignore: Top-level names that are neither copied from src nor deleted in dst
+        stats: Optional Counter to accumulate into
+        copied: Optional set that receives the dst-relative posix path of every
+            synced file, for callers that merge several sources into one tree
+        files: Optional precomputed ``list_tree(src, ignore)`` result, so
+            callers syncing the same source many times only walk it once
+
+    Returns:
+        Counter: The stats counter ("written", "unchanged", "removed")
+    """
+    stats = stats if stats is not None else Counter()
+    src, dst = Path(src), Path(dst)
+    dst.mkdir(parents=True, exist_ok=True)
+    copied = copied if copied is not None else set()
+    for rel in files if files is not None else list_tree(src, ignore):
+        sync_file(src / rel, dst / rel, stats)
+        copied.add(rel)
+    if delete:
+        remove_orphans(dst, copied, stats, ignore=ignore)
+    return stats
+
+
+def format_stats(stats: Counter) -> str:
+    """Format a sync stats Counter as "N written, M unchanged, K removed"."""
+    return ", ".join(
+        f"{stats.get(key, 0)} {key}" for key in ("written", "unchanged", "removed")
+    )
@@ -0,0 +1,373 @@
+#!/usr/bin/env python3
+"""
+payload_watch.py - Propagate doc and rule edits to live session payloads
+
+`team_cli.py watch --project P` watches the sources that sessions inherit
+verbatim and pushes each edit into the payloads that inherited it, so an
+existing session no longer has to be rebuilt with --overwrite:
+
+    docs/global/<path>                  -> payload/docs/global/<path>
+    docs/projects/<P>/<path>            -> payload/docs/project/<path>
+    roles/_templates/.windsurf/rules/<path> -> payload/.windsurf/rules/<path>
+
+A session inherited a source if its payload has the corresponding directory
+(e.g. sessions built with --no-global-docs have no payload/docs/global).
+Only the changed paths are reconciled: a changed file is re-synced (docs via
+the team's content-addressed store, like create-session), a deleted file or
+directory is removed from the payloads. A changed session's packed payload
+(team_cli.py pack) is deleted, as a rebuild would.
+
+Changes are detected with inotify (through ctypes, no extra dependency) and
+with mtime polling where inotify is unavailable. Bursts of events (an editor
+saving several files, a git checkout) are debounced into one propagation.
+"""
+import ctypes
+import ctypes.util
+import errno
+import os
+import select
+import struct
+import sys
+import time
+from collections import Counter
+from pathlib import Path
+from typing import Dict, List, NamedTuple, Set
+
+from doc_store import DocStore
+from payload_pack import remove_archives
+from payload_sync import format_stats, list_tree, sync_file
+
+# Editor scratch files that must never reach a payload
+IGNORED_SUFFIXES = ("~", ".swp", ".swx", ".tmp")
+
+# inotify(7) event bits
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = os.O_NONBLOCK
+IN_CLOEXEC = 0o2000000
+
+WATCH_MASK = (
+    IN_CLOSE_WRITE
+    | IN_ATTRIB
+    | IN_CREATE
+    | IN_DELETE
+    | IN_MOVED_FROM
+    | IN_MOVED_TO
+    | IN_DELETE_SELF
+    | IN_MOVE_SELF
+)
+_EVENT = struct.Struct("iIII")
+
+
+class Source(NamedTuple):
+    """A source tree and the payload directory its files are copied to."""
+
+    name: str
+    root: Path
+    payload_dir: str
+    doc: bool  # materialized through the DocStore like create-session docs
+
+
+def watch_sources(project: str) -> List[Source]:
+    """The inherited source trees of a project, in the order create-session copies them."""
+    return [
+        Source("global-docs", Path("docs/global"), "docs/global", True),
+        Source("project-docs", Path("docs/projects") / project, "docs/project", True),
+        Source(
+            "windsurf-rules",
+            Path("roles/_templates/.windsurf/rules"),
+            ".windsurf/rules",
+            False,
+        ),
+    ]
+
+
+def _ignored(rel: str) -> bool:
+    return Path(rel).name.endswith(IGNORED_SUFFIXES)
+
+
+class PayloadPropagator:
+    """Applies changed source paths to every session payload that inherited them."""
+
+    def __init__(self, project: str, sessions_dir: Path = Path("teams"), doc_store=True):
+        self.sessions_root = Path(sessions_dir) / project / "sessions"
+        self.doc_store = DocStore(Path(sessions_dir) / project / ".objects") if doc_store else None
+
+    def payloads(self, source: Source) -> List[Path]:
+        """Payload directories (payload/<source.payload_dir>) that inherited source."""
+        if not self.sessions_root.is_dir():
+            return []
+        return [
+            entry / "payload" / source.payload_dir
+            for entry in sorted(self.sessions_root.iterdir())
+            # Hidden entries are in-progress staging directories (session_stage.py)
+            if not entry.name.startswith(".")
+            and (entry / "payload" / source.payload_dir).is_dir()
+        ]
+
+    def propagate(self, source: Source, changed: Set[str], stats: Counter) -> List[Path]:
+        """Reconcile the changed source paths (files or directories) in every payload.
+
+        The payload archives of the sessions that changed are deleted
+        (counted in stats["archives"]).
+
+        Returns:
+            list: Payload files that were written or removed
+        """
+        touched = []
+        payloads = self.payloads(source)
+        for rel in sorted(changed):
+            src = source.root / rel
+            if src.is_dir():
+                present = {(Path(rel) / f).as_posix() for f in list_tree(src)}
+            elif src.is_file():
+                present = {rel}
+            else:
+                present = set()
+            present = {p for p in present if not _ignored(p)}
+            for payload in payloads:
+                before = len(touched)
+                # Remove whatever is in the payload under rel but no longer in the source
+                target = payload / rel
+                if target.is_dir():
+                    stale = [target / f for f in list_tree(target)]
+                else:
+                    stale = [target] if os.path.lexists(target) else []
+                for path in stale:
+                    if path.relative_to(payload).as_posix() not in present:
+                        path.unlink()
+                        stats["removed"] += 1
+                        touched.append(path)
+                _prune_empty_dirs(target, payload)
+                for path in sorted(present):
+                    if self._sync(source, source.root / path, payload / path, stats):
+                        touched.append(payload / path)
+                if len(touched) > before:
+                    # A packed payload (team_cli.py pack) would restore the old files
+                    session = payload.relative_to(self.sessions_root).parts[0]
+                    stats["archives"] += remove_archives(self.sessions_root / session)
+        return touched
+
+    def _sync(self, source: Source, src: Path, dst: Path, stats: Counter) -> bool:
+        dst.parent.mkdir(parents=True, exist_ok=True)
+        if source.doc and self.doc_store is not None:
+            written = self.doc_store.materialize(src, dst) != "unchanged"
+            stats["written" if written else "unchanged"] += 1
+            return written
+        return sync_file(src, dst, stats)
+
+
+def _outermost(paths: Set[str]) -> Set[str]:
+    """Drop paths inside another changed directory; "" (the whole source) subsumes all."""
+    if "" in paths:
+        return {""}
+    return {p for p in paths if not any(parent.as_posix() in paths for parent in Path(p).parents)}
+
+
+def _prune_empty_dirs(path: Path, stop: Path):
+    """Remove path and its parents while they are empty directories, up to (not including) stop."""
+    while path != stop and path.is_dir() and not any(path.iterdir()):
+        path.rmdir()
+        path = path.parent
+
+
+class InotifyWatcher:
+    """Recursive inotify watch over the source roots."""
+
+    def __init__(self, sources: List[Source]):
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or None, use_errno=True)
+        self._add_watch = libc.inotify_add_watch
+        self._add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+        self.fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self.watches = {}  # wd -> (source index, directory relative to the source root)
+        self.sources = sources
+        for index, source in enumerate(sources):
+            if source.root.is_dir():
+                self._watch_tree(index, "")
+
+    def _watch_tree(self, index: int, rel: str):
+        root = self.sources[index].root
+        for dirpath, _, _ in os.walk(root / rel):
+            wd = self._add_watch(self.fd, os.fsencode(dirpath), WATCH_MASK)
+            if wd < 0:
+                err = ctypes.get_errno()
+                if err == errno.ENOENT:  # removed while walking
+                    continue
+                raise OSError(err, f"inotify_add_watch failed for {dirpath}")
+            directory = Path(dirpath).relative_to(root).as_posix()
+            self.watches[wd] = (index, "" if directory == "." else directory)
+
+    def read(self, timeout: float = None) -> Dict[int, Set[str]]:
+        """Wait up to timeout seconds and return {source index: changed relative paths}."""
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        changed = {}
+        if not ready:
+            return changed
+        data = os.read(self.fd, 1 << 16)
+        offset = 0
+        while offset < len(data):
+            wd, mask, _, length = _EVENT.unpack_from(data, offset)
+            offset += _EVENT.size
+            name = data[offset : offset + length].rstrip(b"\0").decode()
+            offset += length
+            if mask & IN_Q_OVERFLOW:
+                # Events were lost: reconcile every source completely
+                for index, source in enumerate(self.sources):
+                    changed.setdefault(index, set()).add("")
+                continue
+            if mask & IN_IGNORED or wd not in self.watches:
+                self.watches.pop(wd, None)
+                continue
+            index, directory = self.watches[wd]
+            if not name:  # the watched directory itself was deleted or moved
+                if directory:
+                    changed.setdefault(index, set()).add(directory)
+                continue
+            rel = f"{directory}/{name}" if directory else name
+            if mask & IN_ISDIR and mask & (IN_CREATE | IN_MOVED_TO):
+                self._watch_tree(index, rel)
+            changed.setdefault(index, set()).add(rel)
+        return changed
+
+    def close(self):
+        os.close(self.fd)
+
+
+class PollingWatcher:
+    """Detects changes by comparing (mtime, size) snapshots of the source trees."""
+
+    def __init__(self, sources: List[Source], interval: float = 1.0):
+        self.sources = sources
+        self.interval = interval
+        self.snapshots = [self._snapshot(s.root) for s in sources]
+
+    @staticmethod
+    def _snapshot(root: Path) -> dict:
+        snapshot = {}
+        for rel in list_tree(root):
+            try:
+                st = os.stat(root / rel)
+            except FileNotFoundError:
+                continue
+            snapshot[rel] = (st.st_mtime_ns, st.st_size)
+        return snapshot
+
+    def read(self, timeout: float = None) -> Dict[int, Set[str]]:
+        time.sleep(self.interval if timeout is None else min(timeout, self.interval))
+        changed = {}
+        for index, source in enumerate(self.sources):
+            snapshot = self._snapshot(source.root)
+            old = self.snapshots[index]
+            paths = {rel for rel in snapshot.keys() | old.keys() if snapshot.get(rel) != old.get(rel)}
+            if paths:
+                changed[index] = paths
+            self.snapshots[index] = snapshot
+        return changed
+
+    def close(self):
+        pass
+
+
+def make_watcher(sources: List[Source], poll: bool = False, interval: float = 1.0):
+    """Return an inotify watcher, or a polling one if requested or inotify is unavailable."""
+    if not poll and sys.platform.startswith("linux"):
+        try:
+            return InotifyWatcher(sources)
+        except (OSError, AttributeError) as e:
+            print(f"[WATCH] inotify unavailable ({e}); falling back to polling every {interval}s")
+    return PollingWatcher(sources, interval)
+
+
+def watch(args):
+    """Entry point for `team_cli.py watch`."""
+    project = args.project
+    sources = watch_sources(project)
+    sessions_root = Path("teams") / project / "sessions"
+    if not sessions_root.is_dir():
+        print(f"ERROR: No sessions found for project '{project}' at {sessions_root}.")
+        sys.exit(1)
+    for source in sources:
+        if not source.root.is_dir():
+            print(f"[WATCH] {source.root} does not exist; it will not be watched.")
+
+    propagator = PayloadPropagator(project, doc_store=args.doc_store)
+    watcher = make_watcher(sources, args.poll, args.poll_interval)
+    debounce = args.debounce_ms / 1000.0
+    print(
+        f"[WATCH] Watching {', '.join(str(s.root) for s in sources if s.root.is_dir())} "
+        f"for project '{project}' ({type(watcher).__name__}, debounce {args.debounce_ms:.0f}ms). "
+        "Press Ctrl-C to stop."
+    )
+
+    pending = {}  # source index -> changed relative paths
+    first_seen = last_seen = None
+    try:
+        while True:
+            timeout = None
+            if pending:
+                # Wait for the burst to go quiet, but never longer than 10x the debounce
+                now = time.monotonic()
+                timeout = max(
+                    0.0, min(last_seen + debounce, first_seen + 10 * debounce) - now
+                )
+            changed = watcher.read(timeout)
+            if changed:
+                now = time.monotonic()
+                first_seen = first_seen or now
+                last_seen = now
+                for index, paths in changed.items():
+                    pending.setdefault(index, set()).update(
+                        p for p in paths if not _ignored(p)
+                    )
+                pending = {i: p for i, p in pending.items() if p}
+                if time.monotonic() - first_seen < 10 * debounce:
+                    continue
+            if not pending:
+                first_seen = last_seen = None
+                continue
+            propagate_batch(propagator, sources, pending, first_seen)
+            pending, first_seen, last_seen = {}, None, None
+            if args.once:
+                break
+    except KeyboardInterrupt:
+        print("\n[WATCH] Stopped.")
+    finally:
+        watcher.close()
+
+
+def propagate_batch(propagator, sources, pending, first_seen):
+    """Apply one debounced batch of changes and report what changed and how long it took."""
+    start = time.monotonic()
+    for index, paths in sorted(pending.items()):
+        source = sources[index]
+        stats = Counter()
+        paths = _outermost(paths)
+        touched = propagator.propagate(source, paths, stats)
+        shown = ", ".join(sorted(p or "." for p in paths)[:5])
+        more = f" (+{len(paths) - 5} more)" if len(paths) > 5 else ""
+        print(
+            f"[WATCH] {source.name}: {shown}{more} -> "
+            f"{len(touched)} payload file(s) in {len(propagator.payloads(source))} session(s) "
+            f"[{format_stats(stats)}]"
+        )
+        if stats["archives"]:
+            print(
+                f"[WATCH] Removed {stats['archives']} packed payload(s) that no longer match; "
+                "run `team_cli.py pack` again to recreate them"
+            )
+    end = time.monotonic()
+    print(
+        f"[WATCH] Propagated in {(end - start) * 1000:.1f}ms "
+        f"({(end - first_seen) * 1000:.1f}ms after the first change was detected)"
+    )
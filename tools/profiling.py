@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+"""
+profiling.py - Per-phase timing for session and crew builds
+
+Phases are recorded only while profiling is enabled (team_cli.py/scaffold_team.py
+--profile); otherwise every hook is a no-op. Two recording styles are
+provided:
+
+    with phase("load-context"):          # a block
+        ...
+
+    phases = Phases(session="reviewer")  # consecutive steps of one function
+    phases.start("docs")
+    ...
+    phases.start("ssh-key")              # ends "docs"
+    ...
+    phases.stop()
+
+Recorded phases are written as Chrome trace events (open the file in
+chrome://tracing or https://ui.perfetto.dev) and summarized as the top
+phases by total time.
+"""
+import os
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from pathlib import Path
+
+DEFAULT_TRACE_FILE = "profile_trace.json"
+
+_lock = threading.Lock()
+_events = None  # list of recorded events while profiling is enabled
+_origin = 0.0
+
+
+def enabled() -> bool:
+    return _events is not None
+
+
+def enable():
+    """Start recording phases (discarding anything recorded before)."""
+    global _events, _origin
+    with _lock:
+        _events = []
+        _origin = time.perf_counter()
+
+
+def disable() -> list:
+    """Stop recording and return the recorded events."""
+    global _events
+    with _lock:
+        events, _events = _events or [], None
+    return events
+
+
+def record(name: str, start: float, end: float, **args):
+    """Record a completed phase given perf_counter() start and end times."""
+    if _events is None:
+        return
+    thread = threading.current_thread()
+    event = {
+        "name": name,
+        "cat": args.get("session", "main"),
+        "ph": "X",
+        "ts": round((start - _origin) * 1e6, 1),
+        "dur": round((end - start) * 1e6, 1),
+        "pid": os.getpid(),
+        "tid": thread.ident,
+        "thread": thread.name,
+        "args": args,
+    }
+    with _lock:
+        if _events is not None:
+            _events.append(event)
+
+
+@contextmanager
+def phase(name: str, **args):
+    """Time the enclosed block as one phase."""
+    if _events is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(name, start, time.perf_counter(), **args)
+
+
+class Phases:
+    """Records consecutive phases of one function; each start() ends the previous phase."""
+
+    def __init__(self, **args):
+        self.args = args
+        self._name = None
+        self._start = 0.0
+
+    def start(self, name: str):
+        if _events is None:
+            return
+        now = time.perf_counter()
+        if self._name is not None:
+            record(self._name, self._start, now, **self.args)
+        self._name, self._start = name, now
+
+    def stop(self):
+        if self._name is not None and _events is not None:
+            record(self._name, self._start, time.perf_counter(), **self.args)
+        self._name = None
+
+
+def write_trace(events: list, path: Path):
+    """Write events in Chrome trace-event JSON format."""
+    import json
+
+    trace = []
+    threads = {}
+    for event in events:
+        event = dict(event)
+        threads[(event["pid"], event["tid"])] = event.pop("thread")
+        trace.append(event)
+    for (pid, tid), thread_name in threads.items():
+        trace.append(
+            {
+                "name": "thread_name",
+                "ph": "M",
+                "pid": pid,
+                "tid": tid,
+                "args": {"name": thread_name},
+            }
+        )
+    with open(path, "w") as f:
+        json.dump({"traceEvents": trace, "displayTimeUnit": "ms"}, f)
+
+
+def summarize(events: list, top: int = 15) -> str:
+    """Return a text table of the top phases by total time."""
+    totals = defaultdict(float)
+    counts = defaultdict(int)
+    longest = defaultdict(float)
+    for event in events:
+        seconds = event["dur"] / 1e6
+        totals[event["name"]] += seconds
+        counts[event["name"]] += 1
+        longest[event["name"]] = max(longest[event["name"]], seconds)
+    if not totals:
+        return "No phases recorded."
+    span = max(e["ts"] + e["dur"] for e in events) / 1e6
+    lines = [
+        f"{'phase':<24} {'calls':>6} {'total (s)':>10} {'mean (ms)':>10} {'max (ms)':>10}",
+    ]
+    for name, total in sorted(totals.items(), key=lambda kv: -kv[1])[:top]:
+        lines.append(
+            f"{name:<24} {counts[name]:>6} {total:>10.3f} "
+            f"{total / counts[name] * 1000:>10.1f} {longest[name] * 1000:>10.1f}"
+        )
+    note = " (phases of parallel jobs overlap)" if len({e["tid"] for e in events}) > 1 else ""
+    lines.append(f"Wall time: {span:.3f}s{note}")
+    return "\n".join(lines)
+
+
+@contextmanager
+def profiled(trace_path):
+    """Profile the enclosed block if trace_path is set, then write and summarize it."""
+    if not trace_path:
+        yield
+        return
+    enable()
+    try:
+        with phase("total"):
+            yield
+    finally:
+        events = disable()
+        write_trace(events, trace_path)
+        print("\n[PROFILE] Top phases by total time:")
+        print(summarize([e for e in events if e["name"] != "total"]))
+        print(f"[PROFILE] Chrome trace written to {trace_path}")
+
+
+def add_profile_argument(parser):
+    """Add the --profile [TRACE_FILE] option to an argparse parser."""
+    parser.add_argument(
+        "--profile",
+        nargs="?",
+        const=DEFAULT_TRACE_FILE,
+        metavar="TRACE_FILE",
+        help=f"Time each build phase and write a Chrome trace (default: {DEFAULT_TRACE_FILE})",
+    )
@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+"""
+role_index.py - Assign team env keys to roles with a prefix trie
+
+Role-specific variables in a team env file are named <ROLE>_<VAR>
+(PM_GUARDIAN_EMAIL, DB_GUARDIAN_SLACK_TOKEN, ...). RoleIndex stores the known
+role names as a trie over their "_"-separated words, so each key is assigned
+in one walk over its own words to the longest role name it starts with:
+
+    PM_GUARDIAN_EMAIL   -> pm_guardian
+    DB_GUARDIAN_EMAIL   -> db_guardian   (not pm_guardian: roles sharing a
+                                          word do not leak into each other)
+    GUARDIAN_NOTES      -> None
+
+Grouping a whole env file is O(total words in its keys), independent of the
+number of roles.
+"""
+from typing import Dict, Iterable, Mapping, Optional
+
+_ROLE = object()  # trie node key marking the end of a role name
+
+
+class RoleIndex:
+    """Prefix trie over role names.
+
+    Args:
+        roles: Role (or session) names, e.g. "pm_guardian"
+    """
+
+    def __init__(self, roles: Iterable[str]):
+        self._root = {}
+        for role in roles:
+            node = self._root
+            for word in role.upper().split("_"):
+                node = node.setdefault(word, {})
+            node[_ROLE] = role
+
+    def role_of(self, key: str) -> Optional[str]:
+        """Return the longest role whose name is a word prefix of key, or None.
+
+        The key must have at least one word after the role name.
+        """
+        words = key.upper().split("_")
+        node, match = self._root, None
+        for word in words[:-1]:
+            node = node.get(word)
+            if node is None:
+                break
+            match = node.get(_ROLE, match)
+        return match
+
+    def group(self, env: Mapping[str, str]) -> Dict[str, Dict[str, str]]:
+        """Split env into {role: {key: value}} in one pass, keeping key order.
+
+        Keys that belong to no role are left out.
+        """
+        groups = {}
+        for key, value in env.items():
+            role = self.role_of(key)
+            if role is not None:
+                groups.setdefault(role, {})[key] = value
+        return groups
@@ -41,10 +41,9 @@ import argparse
 import os
 import sys
 from pathlib import Path
-import yaml
-import datetime
 import json
-import shutil
+from payload_sync import sync_file, sync_tree
+from profiling import Phases, add_profile_argument, profiled
 
 # Constants
 DEFAULT_ROLES = ["pm_guardian", "python_coder", "reviewer"]
@@ -86,6 +85,7 @@ def parse_args():
         "--add-role",
         help="Append a new role's config block to the env file (does not overwrite others)",
     )
+    add_profile_argument(parser)
     return parser.parse_args()
 
 
@@ -490,44 +490,53 @@ def generate_slackbot_manifest(display_name):
     }
 
 
-def copy_cline_templates_and_rules(project, roles, dry_run=False):
+def copy_cline_shared_templates(project):
     """
-    For each role, copy Cline Memory Bank templates and .windsurfrules into the session payload directory.
-    Also, copy the shared cline docs template to the team root (not into each session payload).
+    Copy the shared cline docs template to the team root (not into each session payload).
     """
-    base_templates = Path("roles/_templates/cline_docs")
     shared_templates = Path("roles/_templates/cline_docs_shared")
-    windsurfrules = Path("roles/_templates/.windsurfrules")
-    restore_script = Path("roles/_templates/restore_payload.sh")
-    windsurf_rules_src = Path("roles/_templates/.windsurf/rules")
 
     # Copy shared cline docs to team root if not already present
     team_shared_dir = Path(f"teams/{project}/cline_docs_shared")
-    if team_shared_dir.exists():
-        shutil.rmtree(team_shared_dir)
-    shutil.copytree(shared_templates, team_shared_dir)
+    sync_tree(shared_templates, team_shared_dir)
     print(
         f"[INFO] Copied shared Cline docs template to {team_shared_dir}. Fill these out before running crew creation."
     )
 
+
+def copy_cline_role_templates(project, role):
+    """
+    Copy Cline Memory Bank templates, .windsurfrules, the restore script and
+    .windsurf/rules into a single role's session payload directory.
+    """
+    base_templates = Path("roles/_templates/cline_docs")
+    windsurfrules = Path("roles/_templates/.windsurfrules")
+    restore_script = Path("roles/_templates/restore_payload.sh")
+    windsurf_rules_src = Path("roles/_templates/.windsurf/rules")
+
+    payload_dir = Path(f"teams/{project}/sessions/{role}/payload")
+    # Copy per-role cline_docs
+    role_cline_dir = payload_dir / "cline_docs"
+    sync_tree(base_templates, role_cline_dir)
+    # Copy .windsurfrules and restore script
+    sync_file(windsurfrules, payload_dir / ".windsurfrules")
+    sync_file(restore_script, payload_dir / "restore_payload.sh")
+    # Copy .windsurf/rules
+    windsurf_rules_dst = payload_dir / ".windsurf/rules"
+    sync_tree(windsurf_rules_src, windsurf_rules_dst)
+    print(
+        f"Populated {payload_dir} with Cline Memory Bank templates, .windsurfrules, restore_payload.sh, and .windsurf/rules"
+    )
+
+
+def copy_cline_templates_and_rules(project, roles, dry_run=False):
+    """
+    For each role, copy Cline Memory Bank templates and .windsurfrules into the session payload directory.
+    Also, copy the shared cline docs template to the team root (not into each session payload).
+    """
+    copy_cline_shared_templates(project)
     for role in roles:
-        payload_dir = Path(f"teams/{project}/sessions/{role}/payload")
-        # Copy per-role cline_docs
-        role_cline_dir = payload_dir / "cline_docs"
-        if role_cline_dir.exists():
-            shutil.rmtree(role_cline_dir)
-        shutil.copytree(base_templates, role_cline_dir)
-        # Copy .windsurfrules and restore script
-        shutil.copy2(windsurfrules, payload_dir / ".windsurfrules")
-        shutil.copy2(restore_script, payload_dir / "restore_payload.sh")
-        # Copy .windsurf/rules
-        windsurf_rules_dst = payload_dir / ".windsurf/rules"
-        if windsurf_rules_dst.exists():
-            shutil.rmtree(windsurf_rules_dst)
-        shutil.copytree(windsurf_rules_src, windsurf_rules_dst)
-        print(
-            f"Populated {payload_dir} with Cline Memory Bank templates, .windsurfrules, restore_payload.sh, and .windsurf/rules"
-        )
+        copy_cline_role_templates(project, role)
 
 
 def main():
@@ -540,7 +549,12 @@ def main():
     3. Generate env file, template, and checklist
     """
     args = parse_args()
+    with profiled(args.profile):
+        scaffold(args)
+
 
+def scaffold(args):
+    """Generate the team configuration described by the parsed arguments."""
     # Add support for --add-role flag
     add_role = None
     for i, arg in enumerate(sys.argv):
@@ -550,6 +564,8 @@ def main():
 
     # Load from YAML file if provided
     if args.file:
+        import yaml
+
         try:
             with open(args.file) as f:
                 config = yaml.safe_load(f)
@@ -630,13 +646,19 @@ def main():
             sys.exit(1)
 
     # Generate files
+    phases = Phases(session=project)
     try:
+        phases.start("env-file")
         env_file = generate_env_file(project, prefix, domain, roles, args.dry_run)
+        phases.start("env-template")
         env_template = generate_env_template(project, roles, args.dry_run)
+        phases.start("checklist")
         checklist = generate_checklist(project, roles, args.dry_run)
 
         # --- Cline Memory Bank and Windsurfrules propagation ---
+        phases.start("cline-templates")
         copy_cline_templates_and_rules(project, roles, args.dry_run)
+        phases.stop()
 
         print("\nTeam configuration generated successfully!")
         print(f"Next steps:")
@@ -657,11 +679,13 @@ def main():
         )
 
         # For each role, generate the Slackbot manifest in the config directory
+        phases.start("slackbot-manifests")
         for role in roles:
             display_name = capitalize_first_letters(role)
             slackbot_manifest = generate_slackbot_manifest(display_name)
             with open(config_dir / f"slackbot_manifest_{role}.json", "w") as f:
                 json.dump(slackbot_manifest, f, indent=2)
+        phases.stop()
 
     except Exception as e:
         print(f"Error creating files: {e}")
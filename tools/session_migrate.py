@@ -0,0 +1,227 @@
+#!/usr/bin/env python3
+"""
+session_migrate.py - Move sessions to the teams/ layout with a reversible journal
+
+`team_cli.py migrate-sessions` moves sessions/<project>/<agent> to
+teams/<project>/sessions/<agent> and the items of sessions/_shared to
+teams/_shared, replacing scripts/deprecated/move_sessions.py and
+organize_repo.py, which copied every session with copytree and took a full
+.bak copytree of any existing destination first.
+
+Each move is an os.rename, which is O(1) however large the payload. Only
+when source and destination are on different filesystems (EXDEV) is the
+source copied to a hidden temporary sibling of the destination, renamed into
+place, and then deleted. An existing destination is not copied either: it
+is renamed aside to a hidden sibling (.<name>.displaced-<run>).
+
+Every operation is appended to teams/.migrations/<run>.jsonl before it is
+performed. `--rollback` replays the journal backwards; each undo step checks
+the filesystem first, so a run that died mid-way rolls back cleanly and an
+interrupted rollback can simply be run again. `--finalize` deletes the
+displaced destinations of a run, after which it can no longer be rolled back.
+"""
+import errno
+import json
+import os
+import shutil
+import time
+import uuid
+from pathlib import Path
+from typing import List, Tuple
+
+MIGRATIONS_DIR = Path("teams/.migrations")
+
+
+def plan_moves(
+    old_root: Path = Path("sessions"), new_root: Path = Path("teams")
+) -> List[Tuple[Path, Path]]:
+    """Return the (src, dst) moves from the old sessions/ layout to teams/."""
+    old_root, new_root = Path(old_root), Path(new_root)
+    if not old_root.is_dir():
+        return []
+    moves = []
+    for project_dir in sorted(old_root.iterdir()):
+        if not project_dir.is_dir():
+            continue
+        if project_dir.name == "_shared":
+            moves += [
+                (item, new_root / "_shared" / item.name) for item in sorted(project_dir.iterdir())
+            ]
+        elif not project_dir.name.startswith((".", "_")):
+            moves += [
+                (agent_dir, new_root / project_dir.name / "sessions" / agent_dir.name)
+                for agent_dir in sorted(project_dir.iterdir())
+                if agent_dir.is_dir()
+            ]
+    return moves
+
+
+def _remove(path: Path):
+    if path.is_dir() and not path.is_symlink():
+        shutil.rmtree(path)
+    else:
+        path.unlink()
+
+
+def move(src: Path, dst: Path, tmp_suffix: str) -> str:
+    """Move src to dst (which must not exist).
+
+    Returns:
+        str: "rename", or "copy" if src was on another filesystem
+    """
+    try:
+        os.rename(src, dst)
+        return "rename"
+    except OSError as e:
+        if e.errno != errno.EXDEV:
+            raise
+    tmp = dst.parent / f".{dst.name}.{tmp_suffix}"
+    if src.is_dir() and not src.is_symlink():
+        shutil.copytree(src, tmp, symlinks=True)
+    else:
+        shutil.copy2(src, tmp, follow_symlinks=False)
+    os.rename(tmp, dst)
+    _remove(src)
+    return "copy"
+
+
+class Migration:
+    """One migration run and its operation journal.
+
+    Args:
+        path: Journal file (teams/.migrations/<run>.jsonl)
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.run_id = self.path.stem
+
+    @classmethod
+    def create(cls, journal_dir: Path = MIGRATIONS_DIR) -> "Migration":
+        run_id = f"{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:6]}"
+        return cls(Path(journal_dir) / f"{run_id}.jsonl")
+
+    @classmethod
+    def latest(cls, journal_dir: Path = MIGRATIONS_DIR) -> "Migration":
+        runs = sorted(Path(journal_dir).glob("*.jsonl")) if Path(journal_dir).is_dir() else []
+        return cls(runs[-1]) if runs else None
+
+    def append(self, op: str, **fields):
+        record = {"op": op, "time": time.strftime("%Y-%m-%dT%H:%M:%S%z")}
+        record.update({k: str(v) if isinstance(v, Path) else v for k, v in fields.items()})
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        fd = os.open(self.path, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o644)
+        try:
+            os.write(fd, (json.dumps(record, sort_keys=True) + "\n").encode())
+        finally:
+            os.close(fd)
+
+    def records(self) -> List[dict]:
+        records = []
+        with open(self.path) as f:
+            for line in f:
+                try:
+                    records.append(json.loads(line))
+                except ValueError:
+                    continue  # a line torn by a crash mid-write
+        return records
+
+    def status(self) -> str:
+        """"complete", "rolled-back", "finalized" or "incomplete"."""
+        ops = {r["op"] for r in self.records()}
+        for state in ("finalized", "rolled-back", "complete"):
+            if state in ops:
+                return state
+        return "incomplete"
+
+    def _makedirs(self, path: Path):
+        missing = []
+        while not path.exists():
+            missing.append(path)
+            path = path.parent
+        for d in reversed(missing):
+            self.append("mkdir", path=d)
+            d.mkdir()
+
+    def run(self, moves: List[Tuple[Path, Path]]) -> dict:
+        """Perform moves, journaling each operation before it happens.
+
+        Returns:
+            dict: Counts of "rename", "copy" and "displaced"
+        """
+        counts = {"rename": 0, "copy": 0, "displaced": 0}
+        self.append("start", moves=len(moves))
+        sources = set()
+        for src, dst in moves:
+            self._makedirs(dst.parent)
+            if dst.exists() or dst.is_symlink():
+                aside = dst.parent / f".{dst.name}.displaced-{self.run_id}"
+                self.append("displace", path=dst, aside=aside)
+                os.rename(dst, aside)
+                print(f"[DISPLACED] {dst} -> {aside}")
+                counts["displaced"] += 1
+            self.append("move", src=src, dst=dst)
+            method = move(src, dst, f"migrating-{self.run_id}")
+            print(f"[{method.upper()}] {src} -> {dst}")
+            counts[method] += 1
+            sources.add(src.parent)
+        # Remove the old project directories the moves emptied
+        for d in sorted(sources):
+            if d.is_dir() and not any(d.iterdir()):
+                self.append("rmdir", path=d)
+                d.rmdir()
+        self.append("complete")
+        return counts
+
+    def rollback(self):
+        """Undo every operation of this run, newest first."""
+        records = self.records()
+        # Moves an earlier, interrupted rollback already started to undo
+        undoing = {r["src"] for r in records if r["op"] == "unmove"}
+        for record in reversed(records):
+            op = record["op"]
+            if op == "move":
+                src, dst = Path(record["src"]), Path(record["dst"])
+                for tmp in (
+                    dst.parent / f".{dst.name}.migrating-{self.run_id}",
+                    src.parent / f".{src.name}.migrating-{self.run_id}",
+                ):
+                    if tmp.exists() or tmp.is_symlink():
+                        _remove(tmp)  # copy interrupted before the rename
+                if (dst.exists() or dst.is_symlink()) and (src.exists() or src.is_symlink()):
+                    # A cross-filesystem copy renames its target into place only when
+                    # complete, so the copy is whole and the side whose deletion was
+                    # interrupted may be partial: src for the migration, dst for an
+                    # earlier rollback of it
+                    partial = dst if record["src"] in undoing else src
+                    _remove(partial)
+                    print(f"[REMOVED] partially deleted {partial}")
+                if dst.exists() or dst.is_symlink():
+                    self.append("unmove", src=src, dst=dst)
+                    src.parent.mkdir(parents=True, exist_ok=True)
+                    method = move(dst, src, f"migrating-{self.run_id}")
+                    print(f"[{method.upper()}] {dst} -> {src}")
+            elif op == "displace":
+                path, aside = Path(record["path"]), Path(record["aside"])
+                if aside.exists() and not path.exists():
+                    os.rename(aside, path)
+                    print(f"[RESTORED] {path}")
+            elif op == "mkdir":
+                path = Path(record["path"])
+                if path.is_dir() and not any(path.iterdir()):
+                    path.rmdir()
+            elif op == "rmdir":
+                Path(record["path"]).mkdir(parents=True, exist_ok=True)
+        self.append("rolled-back")
+
+    def finalize(self) -> int:
+        """Delete the destinations this run displaced. Returns how many were deleted."""
+        deleted = 0
+        for record in self.records():
+            if record["op"] == "displace":
+                aside = Path(record["aside"])
+                if aside.exists() or aside.is_symlink():
+                    _remove(aside)
+                    deleted += 1
+        self.append("finalized")
+        return deleted
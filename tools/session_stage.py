@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""
+session_stage.py - Build sessions in a staging directory and commit them in place
+
+A session is built in a hidden sibling of its final directory
+(teams/<project>/sessions/.<name>.staging-XXXX) and only applied to the live
+session once the build has succeeded, so a failed build (a bad template, an
+ssh-keygen error, Ctrl-C) never leaves a running container pointing at a
+half-written payload.
+
+A new session is renamed into place. An existing one is never replaced as a
+whole: it is bind-mounted into its container (the session at
+/workspaces/project, payload/ and payload/docs on their own), and a mount
+keeps referring to the directory inode it was created with. Swapping in a new
+directory and deleting the old one would leave a running container on a
+deleted tree. Instead the staged files are renamed over the live ones one by
+one, inside the directories that already exist, and generated files the
+build no longer produced are deleted. Each file is replaced atomically; the
+session as a whole is updated in one pass once the build has succeeded.
+
+Only the session's generated content is staged: payload/, .build-state.json
+and the files earlier builds wrote (build_graph.load_managed). Everything
+else in the session directory is the container's workspace (repository
+clones, .venv, ...) and is neither copied nor touched.
+
+For in-place rebuilds (--overwrite) the staging directory is seeded with
+hardlinks to the generated content. The payload writers never modify a file
+in place (payload_sync renames temp files over the target, the doc store and
+key writer unlink first), so the live version is never changed through a
+shared inode and unchanged files cost nothing.
+"""
+import errno
+import os
+import shutil
+import tempfile
+from collections import Counter
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterable, List
+
+from payload_sync import remove_files
+
+
+def _umask() -> int:
+    mask = os.umask(0)
+    os.umask(mask)
+    return mask
+
+
+_UMASK = _umask()
+
+
+def expand(root: Path, paths: Iterable[str]) -> List[str]:
+    """The files (and symlinks) under root that paths name, directories expanded."""
+    root = Path(root)
+    files = []
+    for rel in paths:
+        path = root / rel
+        if path.is_dir() and not path.is_symlink():
+            for dirpath, dirnames, filenames in os.walk(path):
+                base = Path(dirpath).relative_to(root)
+                # Symlinks to directories are entries of their own, not trees to walk
+                links = [d for d in dirnames if os.path.islink(os.path.join(dirpath, d))]
+                files.extend((base / name).as_posix() for name in filenames + links)
+        elif os.path.lexists(path):
+            files.append(Path(rel).as_posix())
+    return sorted(set(files))
+
+
+def _mkdirs(staging: Path, target: Path, rel_dir: Path):
+    """Create target/rel_dir like its staged counterpart; existing directories are kept."""
+    for part in reversed((rel_dir / "_").parents[:-1]):
+        path = target / part
+        mode = os.stat(staging / part).st_mode & 0o7777
+        if not path.is_dir():
+            path.mkdir()
+            os.chmod(path, mode)
+        elif os.stat(path).st_mode & 0o7777 != mode:
+            os.chmod(path, mode)  # e.g. a private payload/.ssh
+
+
+def seed_with_hardlinks(src: Path, dst: Path, files: Iterable[str]):
+    """Recreate files of the tree at src under dst with hardlinks (copies across devices)."""
+    src, dst = Path(src), Path(dst)
+    for rel in files:
+        source, target = src / rel, dst / rel
+        rel_dir = Path(rel).parent
+        _mkdirs(src, dst, rel_dir)
+        if source.is_symlink():
+            os.symlink(os.readlink(source), target)
+            continue
+        try:
+            os.link(source, target)
+        except OSError as e:
+            if e.errno not in (errno.EXDEV, errno.EPERM, errno.EMLINK, errno.ENOTSUP):
+                raise
+            shutil.copy2(source, target)
+
+
+def commit(staging: Path, target: Path, generated: Iterable[str]) -> Counter:
+    """Apply a staged build to the live session directory target, keeping its directories.
+
+    Args:
+        staging: The staged session
+        target: Existing session directory
+        generated: Session-relative files and directories target's previous
+            build owns; those of them missing from staging are deleted
+
+    Returns:
+        Counter: "replaced" and "removed" file counts
+    """
+    staging, target = Path(staging), Path(target)
+    stats = Counter()
+    staged = expand(staging, ["."])
+    for rel in staged:
+        source, dest = staging / rel, target / rel
+        try:
+            if os.path.samestat(os.lstat(source), os.lstat(dest)):
+                continue  # an unchanged, seeded hardlink
+        except FileNotFoundError:
+            pass
+        _mkdirs(staging, target, Path(rel).parent)
+        if dest.is_dir() and not dest.is_symlink():
+            shutil.rmtree(dest)  # a generated directory that is now a file
+        os.replace(source, dest)
+        stats["replaced"] += 1
+    remove_files(target, set(expand(target, generated)) - set(staged), stats)
+    return stats
+
+
+@contextmanager
+def staged_session(target: Path, seed: bool = False, generated: Iterable[str] = ()):
+    """Yield a staging directory for target and commit it if the block succeeds.
+
+    Args:
+        target: Final session directory
+        seed: Start from hardlinks to the current target's generated content
+            (for in-place rebuilds) instead of an empty directory
+        generated: Session-relative files and directories of an existing
+            target that its builds own (see commit)
+    """
+    target = Path(target)
+    target.parent.mkdir(parents=True, exist_ok=True)
+    generated = list(generated)
+    staging = Path(tempfile.mkdtemp(dir=target.parent, prefix=f".{target.name}.staging-"))
+    try:
+        if target.is_dir():
+            os.chmod(staging, os.stat(target).st_mode & 0o7777)
+            if seed:
+                seed_with_hardlinks(target, staging, expand(target, generated))
+        else:
+            # mkdtemp creates 0700; give the session the mode mkdir() would have
+            os.chmod(staging, 0o777 & ~_UMASK)
+        yield staging
+        if target.is_dir():
+            commit(staging, target, generated)
+        else:
+            os.rename(staging, target)
+            staging = None
+    finally:
+        if staging is not None:
+            shutil.rmtree(staging, ignore_errors=True)
@@ -6,6 +6,13 @@ Quickstart:
   python tools/team_cli.py create-session --name agent-name --role python_coder --generate-ssh-key --prompt-all
   python tools/team_cli.py create-session --name agent-name --role python_coder --ssh-key ~/.ssh/existing_key
   python tools/team_cli.py create-crew --env-file teams/myproject/config/env
+  python tools/team_cli.py create-crew --env-file teams/myproject/config/env --jobs 8
+  python tools/team_cli.py build --env-file teams/myproject/config/env --plan
+  python tools/team_cli.py list-roles
+  python tools/team_cli.py watch --project myproject
+  python tools/team_cli.py pack --project myproject
+  python tools/team_cli.py reconcile-env --project myproject
+  python tools/team_cli.py migrate-paths scripts/ --execute
 
 Key Features:
 - Creates isolated agent sessions from role templates
@@ -48,20 +55,55 @@ Directory Structure:
 See README.md for full documentation and setup instructions.
 """
 import argparse
+import io
 import os
-import shutil
 import sys
+import threading
+import time
+from contextlib import contextmanager
 from pathlib import Path
-import yaml
-import json
-from typing import Dict, Any
-from scaffold_team import copy_cline_templates_and_rules
+from typing import TYPE_CHECKING, Dict, Any
+from profiling import Phases, add_profile_argument, phase, profiled
+
+# Everything else (yaml, json, scaffold_team and the session build modules) is
+# imported by the commands that use it, so --help and list-roles stay cheap.
+if TYPE_CHECKING:
+    from crew_context import CrewContext
+
+SSH_KEY_BACKENDS = ("python", "ssh-keygen")  # see ssh_keys.BACKENDS
+PACK_COMPRESSIONS = ("auto", "zstd", "gzip", "none")  # see payload_pack.COMPRESSIONS
 
 SESSIONS_DIR = Path("teams")
 ROLES_DIR = Path("roles")
 TEAM_CONFIG = Path("team/crew.yaml")
 TEAM_ENV = Path("teams/default/config/env")
 DEVCONTAINER_DIR = Path("templates/devcontainer")
+DAEMON_SOCKET = SESSIONS_DIR / ".team_cli.sock"
+
+# Top-level session entries that are generated rather than copied from the role
+# template; orphan cleanup at the session root never descends into these.
+SESSION_GENERATED = {"payload", ".build-state.json"}
+
+# Team-level keys copied verbatim into every session .env
+GENERIC_ENV_KEYS = [
+    "ANTHROPIC_API_KEY",
+    "PERPLEXITY_API_KEY",
+    "MODEL",
+    "PERPLEXITY_MODEL",
+    "MAX_TOKENS",
+    "TEMPERATURE",
+    "DEFAULT_SUBTASKS",
+    "DEFAULT_PRIORITY",
+    "DEBUG",
+    "LOG_LEVEL",
+    "SLACK_TEAM_ID",
+    "TEAM_NAME",
+    "TEAM_DESCRIPTION",
+    "PROJECT_NAME",
+    "PROJECT_REPO_URL",
+    "MCP_DISCORD_REPO_URL",
+    "MCP_DISCORD_REPO_BRANCH",
+]
 
 
 # --- Utility Functions ---
@@ -81,35 +123,227 @@ def print_reminders():
     )
 
 
-def list_roles():
-    if not ROLES_DIR.exists():
-        print("No roles directory found.")
-        return
+class _ThreadOutput:
+    """Route print() output to a per-thread buffer while a crew job is running.
+
+    Threads without an active capture write straight through to the wrapped
+    stream, so installing this as sys.stdout is harmless outside the pool.
+    """
+
+    def __init__(self, stream):
+        self._stream = stream
+        self._local = threading.local()
+
+    @contextmanager
+    def capture(self, buffer=None):
+        buffer = buffer if buffer is not None else io.StringIO()
+        self._local.buffer = buffer
+        try:
+            yield buffer
+        finally:
+            self._local.buffer = None
+
+    def write(self, text):
+        buffer = getattr(self._local, "buffer", None)
+        return (buffer or self._stream).write(text)
+
+    def flush(self):
+        buffer = getattr(self._local, "buffer", None)
+        if buffer is None:
+            self._stream.flush()
+
+    def __getattr__(self, name):
+        return getattr(self._stream, name)
+
+
+def run_crew_jobs(tasks, jobs=1):
+    """Run crew tasks, optionally on a bounded thread pool.
+
+    Args:
+        tasks: List of (label, callable) pairs
+        jobs: Number of worker threads. 1 runs the tasks inline, streaming output.
+
+    Returns:
+        list: (label, ok, error, seconds, output) tuples in task order. With more
+        than one job, each task's output is buffered so it can be printed as a
+        contiguous block instead of interleaving with other sessions.
+    """
+
+    def run(label, fn, router=None):
+        start = time.perf_counter()
+        ok, error = True, ""
+        capture = router.capture() if router else _no_capture()
+        with capture as buffer:
+            try:
+                fn()
+            except SystemExit as e:
+                ok, error = False, f"exited with status {e.code}"
+            except Exception as e:
+                ok, error = False, str(e)
+        output = buffer.getvalue() if buffer is not None else ""
+        return label, ok, error, time.perf_counter() - start, output
+
+    if jobs <= 1:
+        return [run(label, fn) for label, fn in tasks]
+
+    from concurrent.futures import ThreadPoolExecutor
+
+    router = _ThreadOutput(sys.stdout)
+    sys.stdout = router
+    try:
+        with ThreadPoolExecutor(max_workers=jobs) as pool:
+            futures = [pool.submit(run, label, fn, router) for label, fn in tasks]
+            return [f.result() for f in futures]
+    finally:
+        sys.stdout = router._stream
+
+
+@contextmanager
+def _no_capture():
+    yield None
+
+
+def report_mcp_template_vars(ctx: "CrewContext", session_tasks):
+    """Check the MCP templates used by a crew before any session is built.
+
+    Exits if a template used by the crew is invalid, and prints one report of
+    placeholders that will render empty, grouped by variable.
+
+    Args:
+        ctx: Crew context with the compiled templates
+        session_tasks: List of (session_name, session_args) pairs
+    """
+    broken = sorted(
+        {a.role for _, a in session_tasks if a.role in ctx.mcp_template_errors}
+    )
+    if broken:
+        for role in broken:
+            print(f"Error parsing MCP config template: {ctx.mcp_template_errors[role]}")
+        sys.exit(1)
+
+    missing = {}
+    for session_name, session_args in session_tasks:
+        template = ctx.mcp_templates.get(session_args.role)
+        if template is None:
+            continue
+        _, env_vars = build_session_env(session_args, session_args.role, ctx)
+        for var in template.missing(env_vars):
+            missing.setdefault(var, []).append(session_name)
+    if missing:
+        print("\n[MCP] Template variables without a value (rendered as empty strings):")
+        for var, names in sorted(missing.items()):
+            who = "all sessions" if len(names) == len(session_tasks) else ", ".join(names)
+            print(f"  - {var}: {who}")
+
+
+def print_crew_summary(title, results, jobs, elapsed):
+    """Print buffered task output in order, followed by a status table."""
+    for label, ok, error, seconds, output in results:
+        if output:
+            print(output, end="" if output.endswith("\n") else "\n")
+    width = max((len(r[0]) for r in results), default=0)
+    failed = sum(1 for r in results if not r[1])
+    print(
+        f"\n{title}: {len(results) - failed} ok, {failed} failed "
+        f"({jobs} worker{'s' if jobs != 1 else ''}, {elapsed:.2f}s)"
+    )
+    for label, ok, error, seconds, _ in results:
+        status = " OK " if ok else "FAIL"
+        line = f"  [{status}] {label.ljust(width)}  {seconds:6.2f}s"
+        print(f"{line}  {error}" if error else line)
+
+
+def list_roles(roles=None):
+    """Print the role catalog (from a CrewContext if given, else roles/)."""
+    if roles is None:
+        if not ROLES_DIR.exists():
+            print("No roles directory found.")
+            return
+        roles = sorted(role.name for role in ROLES_DIR.iterdir() if role.is_dir())
     print("Available roles/templates:")
-    for role in ROLES_DIR.iterdir():
-        if role.is_dir():
-            print(f"- {role.name}")
+    for role in roles:
+        print(f"- {role}")
+
+
+def load_context(env_file, project, team_env=None) -> "CrewContext":
+    """Load the shared crew inputs for a project using this module's paths."""
+    from crew_context import load_crew_context
+
+    return load_crew_context(
+        env_file,
+        project,
+        team_env=team_env,
+        sessions_dir=SESSIONS_DIR,
+        roles_dir=ROLES_DIR,
+        devcontainer_dir=DEVCONTAINER_DIR,
+        role_ignore=SESSION_GENERATED,
+    )
+
 
+def setup_devcontainer(
+    session_path: Path,
+    project: str,
+    name: str,
+    stats=None,
+    ctx: "CrewContext" = None,
+    base_image: bool = True,
+):
+    """Set up devcontainer configuration for a session.
 
-def setup_devcontainer(session_path: Path, project: str, name: str):
-    """Set up devcontainer configuration for a session."""
-    if not DEVCONTAINER_DIR.exists():
+    Only files that differ from the template are rewritten; stats (a Counter)
+    collects what was written or left unchanged. Orphans are not removed here
+    because the role template may contribute files to .devcontainer too.
+
+    With base_image, devcontainer.json uses the team's shared image (see
+    base_image.py) and the image's build context is not copied into the session.
+
+    Returns:
+        set: Session-relative paths of the files written from the template
+    """
+    import json
+    from base_image import image_files, use_image, write_image_context
+    from git_cache import GIT_CACHE_DIR, GIT_CACHE_MOUNT
+    from payload_pack import RESTORE_SCRIPT_DEST, install_restore_script
+    from payload_sync import sync_tree, write_if_changed
+    from wheelhouse import WHEELHOUSE_DIR, WHEELHOUSE_MOUNT
+
+    ctx = ctx or load_context(TEAM_ENV, project)
+    managed = set()
+    if not ctx.devcontainer_dir.exists():
         print("[WARNING] No .devcontainer directory found in project root.")
-        return
+        return managed
+
+    files = ctx.devcontainer_files
+    if base_image:
+        shared = image_files(files)
+        _, image_tag = write_image_context(project, ctx.devcontainer_dir, shared, SESSIONS_DIR)
+        files = [rel for rel in files if rel not in shared]
 
-    # Copy devcontainer files
+    # Sync devcontainer files (devcontainer.json is rendered below)
     session_devcontainer = session_path / ".devcontainer"
-    shutil.copytree(DEVCONTAINER_DIR, session_devcontainer, dirs_exist_ok=True)
+    sync_tree(
+        ctx.devcontainer_dir,
+        session_devcontainer,
+        delete=False,
+        ignore={"devcontainer.json"},
+        stats=stats,
+        copied=managed,
+        files=files,
+    )
+    managed = {f".devcontainer/{rel}" for rel in managed}
 
     # Update devcontainer.json with session-specific name
     devcontainer_json = session_devcontainer / "devcontainer.json"
-    if devcontainer_json.exists():
-        with open(devcontainer_json, "r") as f:
-            config = json.load(f)
+    if ctx.devcontainer_json is not None:
+        config = json.loads(ctx.devcontainer_json)
 
         # Update container name
         config["name"] = f"{project}-{name}"
 
+        # Run the team's shared image instead of building one per session
+        if base_image:
+            use_image(config, image_tag)
+
         # Update runArgs to use unique container name
         if "runArgs" in config:
             for i, arg in enumerate(config["runArgs"]):
@@ -126,191 +360,77 @@ def setup_devcontainer(session_path: Path, project: str, name: str):
                         "source=${localWorkspaceFolder}/payload",
                     )
 
-        with open(devcontainer_json, "w") as f:
-            json.dump(config, f, indent=4)
+        # Mount the team wheelhouse (team_cli.py wheelhouse) and git mirrors
+        # (team_cli.py git-cache) read-only; they must exist for the container
+        # to start, even while still empty
+        config.setdefault("mounts", [])
+        for team_dir, target in (
+            (WHEELHOUSE_DIR, WHEELHOUSE_MOUNT),
+            (GIT_CACHE_DIR, GIT_CACHE_MOUNT),
+        ):
+            (SESSIONS_DIR / project / team_dir).mkdir(parents=True, exist_ok=True)
+            mount = (
+                f"source=${{localWorkspaceFolder}}/../../{team_dir},"
+                f"target={target},type=bind,readonly"
+            )
+            if mount not in config["mounts"]:
+                config["mounts"].append(mount)
+        # Payload docs may be hardlinks to the team's doc store objects, which
+        # root in the container could otherwise write through despite mode 0444
+        (session_path / "payload/docs").mkdir(parents=True, exist_ok=True)
+        mount = (
+            "source=${localWorkspaceFolder}/payload/docs,"
+            "target=/workspaces/project/payload/docs,type=bind,readonly"
+        )
+        if mount not in config["mounts"]:
+            config["mounts"].append(mount)
+
+        write_if_changed(devcontainer_json, json.dumps(config, indent=4), stats)
+        managed.add(".devcontainer/devcontainer.json")
 
         print(f"Set up devcontainer configuration in {session_devcontainer}")
+        if base_image:
+            print(
+                f"Using team base image {image_tag} (built when the first session "
+                f"starts, or now with `team_cli.py base-image --project {project} --build`)"
+            )
 
-    # Ensure scripts directory exists and copy all scripts from project root
+    # Ensure scripts directory exists (scripts were synced with the tree above)
     scripts_dir = session_devcontainer / "scripts"
     scripts_dir.mkdir(exist_ok=True)
-    root_scripts_dir = DEVCONTAINER_DIR / "scripts"
-    if root_scripts_dir.exists():
-        for script_file in root_scripts_dir.iterdir():
-            if script_file.is_file():
-                shutil.copy2(script_file, scripts_dir / script_file.name)
+    root_scripts_dir = ctx.devcontainer_dir / "scripts"
+    if any(rel.startswith("scripts/") for rel in ctx.devcontainer_files):
         print(f"Copied devcontainer scripts from {root_scripts_dir} to {scripts_dir}")
     else:
         print(f"[WARNING] No scripts found in {root_scripts_dir}")
 
+    # restore_payload.sh runs payload_restore.py to copy only the changed payload files
+    install_restore_script(session_path, stats)
+    managed.add(RESTORE_SCRIPT_DEST.as_posix())
+    return managed
 
-def create_session(args):
-    name = args.name or input("Session name (e.g. pm-guardian): ").strip()
-    list_roles()
-    role = args.role or input("Role/template to use: ").strip()
-    project = args.project or "default"
-
-    role_path = ROLES_DIR / role
-    if not role_path.exists():
-        print(f"Role '{role}' not found in {ROLES_DIR}.")
-        sys.exit(1)
-
-    # Create project-based session directory using the new structure
-    project_sessions_dir = SESSIONS_DIR / project / "sessions"
-    project_sessions_dir.mkdir(parents=True, exist_ok=True)
-
-    session_path = project_sessions_dir / name
-    if session_path.exists():
-        if getattr(args, "overwrite", False):
-            print(f"[OVERWRITE] Removing existing session directory: {session_path}")
-            shutil.rmtree(session_path)
-        else:
-            print(f"Session '{name}' already exists at {session_path}.")
-            sys.exit(1)
-
-    # Copy role template to new session
-    shutil.copytree(role_path, session_path)
-    print(f"Created session '{name}' from role '{role}' in project '{project}'.")
-
-    # Set up devcontainer configuration
-    setup_devcontainer(session_path, project, name)
-
-    # --- Project and Docs Handling ---
-    docs_included = []
-    payload_docs = session_path / "payload/docs"
-    payload_docs.mkdir(parents=True, exist_ok=True)
-
-    # Copy global docs if enabled
-    include_global = getattr(
-        args, "include_global_docs", True
-    )  # Default to True for backward compatibility
-    if include_global:
-        global_docs_dir = Path("docs/global")
-        if global_docs_dir.exists():
-            for f in global_docs_dir.glob("**/*"):
-                if f.is_file():
-                    relative_path = f.relative_to(global_docs_dir)
-                    target_path = payload_docs / "global" / relative_path
-                    target_path.parent.mkdir(parents=True, exist_ok=True)
-                    shutil.copy(f, target_path)
-                    docs_included.append(f"global/{relative_path}")
-
-    # Copy project docs if --project is set and enabled
-    if hasattr(args, "project") and args.project:
-        project_docs_dir = Path(f"docs/projects/{args.project}")
-        if project_docs_dir.exists():
-            for f in project_docs_dir.glob("**/*"):
-                if f.is_file():
-                    relative_path = f.relative_to(project_docs_dir)
-                    target_path = payload_docs / "project" / relative_path
-                    target_path.parent.mkdir(parents=True, exist_ok=True)
-                    shutil.copy(f, target_path)
-                    docs_included.append(f"project/{relative_path}")
-        else:
-            print(f"[WARNING] Project docs not found: {project_docs_dir}")
-
-    # Copy role docs if enabled
-    include_role = getattr(
-        args, "include_role_docs", True
-    )  # Default to True for backward compatibility
-    if include_role:
-        role_docs_dir = role_path / "docs"
-        if role_docs_dir.exists():
-            for f in role_docs_dir.glob("**/*"):
-                if f.is_file():
-                    relative_path = f.relative_to(role_docs_dir)
-                    target_path = payload_docs / "role" / relative_path
-                    target_path.parent.mkdir(parents=True, exist_ok=True)
-                    shutil.copy(f, target_path)
-                    docs_included.append(f"role/{relative_path}")
 
-    print(
-        f"Included docs in session payload: {', '.join(docs_included) if docs_included else 'none'}"
-    )
+def build_session_env(args, role: str, ctx: "CrewContext"):
+    """Assemble the variables for one session's .env and MCP config.
 
-    # --- SSH Key Handling ---
-    payload_ssh_dir = session_path / "payload/.ssh"
-    payload_ssh_dir.mkdir(parents=True, exist_ok=True)
-    ssh_key_path = payload_ssh_dir / "id_rsa"
-    ssh_pub_path = payload_ssh_dir / "id_rsa.pub"
-    updated_env = False
-    if args.ssh_key and args.generate_ssh_key:
-        print("ERROR: --ssh-key and --generate-ssh-key are mutually exclusive.")
-        sys.exit(1)
-    if args.ssh_key:
-        src_key = Path(args.ssh_key).expanduser()
-        if not src_key.exists():
-            print(f"ERROR: Provided SSH key {src_key} does not exist.")
-            sys.exit(1)
-        shutil.copyfile(src_key, ssh_key_path)
-        os.chmod(ssh_key_path, 0o600)
-        pub_key = src_key.with_suffix(".pub")
-        if pub_key.exists():
-            shutil.copyfile(pub_key, ssh_pub_path)
-        print(f"Copied SSH key to {ssh_key_path}.")
-        updated_env = True
-    elif args.generate_ssh_key:
-        import subprocess
-
-        subprocess.run(
-            ["ssh-keygen", "-t", "ed25519", "-N", "", "-f", str(ssh_key_path)],
-            check=True,
-        )
-        print(
-            f"Generated new ed25519 SSH keypair at {ssh_key_path} and {ssh_pub_path}."
-        )
-        updated_env = True
-    else:
-        print(
-            "[REMINDER] No SSH key provided or generated. You must add one to payload/.ssh/id_rsa before launching the container."
-        )
+    Layers the env template, --all-env values and the team env file (last
+    wins), then maps the role's own fields to their standard names.
 
-    # --- .env Handling: Look for config in the new directory structure ---
-    env_sample_path = SESSIONS_DIR / project / "config" / "env.template"
-    env_path = session_path / "payload/.env"  # Write directly to payload
+    Returns:
+        tuple: (template_vars, env_vars) - the merged raw variables and the
+        session variables that are written out
+    """
+    from env_file import parse_assignments
 
     # First load template values
-    template_vars = {}
-    if env_sample_path.exists():
-        with open(env_sample_path, "r") as f:
-            for line in f:
-                if line.strip() and not line.strip().startswith("#") and "=" in line:
-                    k, v = line.strip().split("=", 1)
-                    template_vars[k] = v.strip()
-    else:
-        print(f"[WARNING] Environment template not found at {env_sample_path}")
+    template_vars = dict(ctx.env_template_vars or {})
 
     # Overlay any values from --all-env
     if hasattr(args, "all_env") and args.all_env:
-        for kv in args.all_env:
-            if "=" in kv:
-                k, v = kv.split("=", 1)
-                template_vars[k] = v.strip()
+        template_vars.update(parse_assignments(args.all_env))
 
     # Overlay actual env file values (filled values) into template_vars LAST
-    env_file_path = getattr(args, "env_file", None) or TEAM_ENV
-    print(f"[DEBUG] Reading actual env file: {env_file_path}")
-    if Path(env_file_path).exists():
-        with open(env_file_path, "r") as f:
-            for line in f:
-                if line.strip() and not line.strip().startswith("#") and "=" in line:
-                    k, v = line.strip().split("=", 1)
-                    if k == "SLACK_TEAM_ID":
-                        print(f"[DEBUG] Raw SLACK_TEAM_ID line: {line.rstrip()}")
-                        print(f"[DEBUG] SLACK_TEAM_ID value before strip: '{v}'")
-                        print(f"[DEBUG] SLACK_TEAM_ID value after strip: '{v.strip()}'")
-                    template_vars[k] = v.strip()
-    else:
-        print(f"[WARNING] Actual env file not found at {env_file_path}")
-
-    # Debug print for SLACK_TEAM_ID and all keys
-    if "SLACK_TEAM_ID" in template_vars:
-        print(
-            f"[DEBUG] SLACK_TEAM_ID in template_vars before mapping: '{template_vars['SLACK_TEAM_ID']}'"
-        )
-    else:
-        print("[DEBUG] SLACK_TEAM_ID not found in template_vars before mapping")
-    print(f"[DEBUG] All keys in template_vars: {list(template_vars.keys())}")
+    template_vars.update(ctx.team_env)
 
     # Initialize with default values for Task Master
     env_vars = {
@@ -342,175 +462,416 @@ def create_session(args):
             env_vars[dest] = template_vars[src]
 
     # Add any generic fields from template_vars (e.g., ANTHROPIC_API_KEY, etc.)
-    generic_keys = [
-        "ANTHROPIC_API_KEY",
-        "PERPLEXITY_API_KEY",
-        "MODEL",
-        "PERPLEXITY_MODEL",
-        "MAX_TOKENS",
-        "TEMPERATURE",
-        "DEFAULT_SUBTASKS",
-        "DEFAULT_PRIORITY",
-        "DEBUG",
-        "LOG_LEVEL",
-        "SLACK_TEAM_ID",
-        "TEAM_NAME",
-        "TEAM_DESCRIPTION",
-        "PROJECT_NAME",
-        "PROJECT_REPO_URL",
-        "MCP_DISCORD_REPO_URL",
-        "MCP_DISCORD_REPO_BRANCH",
-    ]
-    for k in generic_keys:
+    for k in GENERIC_ENV_KEYS:
         if k in template_vars:
             env_vars[k] = template_vars[k]
+    return template_vars, env_vars
 
-    # Helper to quote values with spaces
-    def quote_if_needed(val):
-        if (
-            isinstance(val, str)
-            and " " in val
-            and not (val.startswith('"') and val.endswith('"'))
-        ):
-            return f'"{val}"'
-        return val
-
-    # Write the .env file with consistent formatting
-    os.makedirs(os.path.dirname(env_path), exist_ok=True)
-    with open(env_path, "w") as f:
-        # Write Task Master variables first
-        task_master_vars = [
-            "ANTHROPIC_API_KEY",
-            "MODEL",
-            "PERPLEXITY_API_KEY",
-            "PERPLEXITY_MODEL",
-            "MAX_TOKENS",
-            "TEMPERATURE",
-            "DEFAULT_SUBTASKS",
-            "DEFAULT_PRIORITY",
-            "DEBUG",
-            "LOG_LEVEL",
-        ]
-        for k in task_master_vars:
-            if k in env_vars:
-                f.write(f"{k}={quote_if_needed(env_vars[k])}\n")
-        # Write mapped role-specific fields
-        for k in [
-            "GIT_USER_EMAIL",
-            "SLACK_BOT_TOKEN",
-            "GITHUB_PERSONAL_ACCESS_TOKEN",
-            "DISCORD_TOKEN",
-            "DISCORD_CLIENT_ID",
-            "DISCORD_GUILD_ID",
-        ]:
-            if k in env_vars:
-                f.write(f"{k}={quote_if_needed(env_vars[k])}\n")
-        # Write any other generic fields (excluding those already written)
-        already_written = set(
-            task_master_vars
-            + [
-                "GIT_USER_EMAIL",
-                "SLACK_BOT_TOKEN",
-                "GITHUB_PERSONAL_ACCESS_TOKEN",
-                "DISCORD_TOKEN",
-                "DISCORD_CLIENT_ID",
-                "DISCORD_GUILD_ID",
-            ]
-        )
-        for k in generic_keys:
-            if k not in already_written and k in env_vars:
-                f.write(f"{k}={quote_if_needed(env_vars[k])}\n")
 
-    # --- Generate MCP config ---
+def create_session(args, ctx: "CrewContext" = None):
+    """Create (or sync) a single session.
+
+    Args:
+        args: Parsed create-session arguments (or the Namespace built by create_crew)
+        ctx: Shared crew inputs. create_crew loads this once for all sessions;
+            when omitted it is loaded for this session alone.
+    """
     import json
-    import re
+    import shutil
+    from collections import Counter
+    from doc_store import DocStore
+    from key_registry import KeyRegistry
+    from payload_pack import archive_paths, remove_archives, write_manifest
+    from build_graph import load_managed, save_managed
+    from payload_sync import (
+        format_stats,
+        remove_files,
+        remove_orphans,
+        sync_file,
+        sync_tree,
+        write_if_changed,
+    )
+    from session_stage import staged_session
+    from ssh_keys import fingerprint, install_keypair
+
+    if ctx is None:
+        project = args.project or "default"
+        env_file_path = getattr(args, "env_file", None) or TEAM_ENV
+        with phase("load-context"):
+            ctx = load_context(env_file_path, project)
+    else:
+        project = ctx.project
+        if args.project and args.project != project:
+            raise ValueError(
+                f"Session project '{args.project}' does not match crew project '{project}'"
+            )
 
-    # Use role's mcp_config.template.json if it exists
-    template_path = role_path / "mcp_config.template.json"
-    if template_path.exists():
-        print(f"Using custom MCP config template for role: {role_path}")
-        with open(template_path) as f:
-            template = f.read()
+    name = args.name or input("Session name (e.g. pm-guardian): ").strip()
+    list_roles(ctx.roles)
+    role = args.role or input("Role/template to use: ").strip()
+    phases = Phases(session=name)
+    # `team_cli build` only regenerates the targets whose inputs changed
+    targets = getattr(args, "targets", None)
 
-        # Replace all ${VAR} with values from env_vars, preserving structure
-        def replace_var(match):
-            var_name = match.group(1)
-            value = env_vars.get(var_name, "")  # Return empty string for missing vars
+    def wanted(target):
+        return targets is None or target in targets
 
-            # Strip comments from value if it's a string
-            if isinstance(value, str) and "#" in value:
-                value = value.split("#")[0].strip()
+    role_path = ROLES_DIR / role
+    if role not in ctx.roles:
+        print(f"Role '{role}' not found in {ROLES_DIR}.")
+        sys.exit(1)
 
-            return value
+    # Create project-based session directory using the new structure
+    project_sessions_dir = SESSIONS_DIR / project / "sessions"
+    project_sessions_dir.mkdir(parents=True, exist_ok=True)
 
-        config_str = re.sub(r"\${([^}]+)}", replace_var, template)
+    session_path = project_sessions_dir / name
+    registry = KeyRegistry(SESSIONS_DIR / project / ".keys")
+    seed = False
+    if session_path.exists():
+        if getattr(args, "clean", False):
+            if args.generate_ssh_key:
+                # Keep the session's identity across the rebuild
+                registry.adopt(
+                    name,
+                    session_path / "payload/.ssh/id_rsa",
+                    session_path / "payload/.ssh/id_rsa.pub",
+                )
+            # The old files are kept until the new build is committed
+            print(f"[CLEAN] Rebuilding session directory from scratch: {session_path}")
+        elif getattr(args, "overwrite", False):
+            print(f"[OVERWRITE] Syncing existing session directory: {session_path}")
+            seed = True
+        else:
+            print(f"Session '{name}' already exists at {session_path}.")
+            sys.exit(1)
 
-        try:
-            mcp_config = json.loads(config_str)
-        except json.JSONDecodeError as e:
-            print(f"Error parsing MCP config template: {e}")
-            mcp_config = {}
-    else:
-        # Generate default MCP config
-        mcp_config = {
-            "mcpServers": {
-                "puppeteer": {
-                    "command": "npx",
-                    "args": ["-y", "@modelcontextprotocol/server-puppeteer"],
-                    "env": {},
-                },
-                "github": {
-                    "command": "npx",
-                    "args": ["-y", "@modelcontextprotocol/server-github"],
-                    "env": {
-                        "GITHUB_PERSONAL_ACCESS_TOKEN": env_vars.get(
-                            "GITHUB_PERSONAL_ACCESS_TOKEN", ""
-                        )
-                    },
-                },
-                "slack": {
-                    "command": "npx",
-                    "args": ["-y", "@modelcontextprotocol/server-slack"],
-                    "env": {
-                        "SLACK_BOT_TOKEN": env_vars.get("SLACK_BOT_TOKEN", ""),
-                        "SLACK_TEAM_ID": env_vars.get("SLACK_TEAM_ID", ""),
-                    },
-                },
-                "context7": {
-                    "command": "npx",
-                    "args": ["-y", "@upstash/context7-mcp@latest"],
-                },
-                "taskmaster-ai": {
-                    "command": "npx",
-                    "args": ["-y", "@modelcontextprotocol/server-taskmaster"],
-                    "env": {
-                        "ANTHROPIC_API_KEY": env_vars.get("ANTHROPIC_API_KEY", ""),
-                        "PERPLEXITY_API_KEY": env_vars.get("PERPLEXITY_API_KEY", ""),
-                        "MODEL": env_vars.get("MODEL", ""),
-                        "PERPLEXITY_MODEL": env_vars.get("PERPLEXITY_MODEL", ""),
-                        "MAX_TOKENS": env_vars.get("MAX_TOKENS", ""),
-                        "TEMPERATURE": env_vars.get("TEMPERATURE", ""),
-                        "DEFAULT_SUBTASKS": env_vars.get("DEFAULT_SUBTASKS", ""),
-                        "DEFAULT_PRIORITY": env_vars.get("DEFAULT_PRIORITY", ""),
-                        "DEBUG": env_vars.get("DEBUG", ""),
-                        "LOG_LEVEL": env_vars.get("LOG_LEVEL", ""),
-                    },
-                },
-            }
-        }
+    # Build into a staging directory that is committed only if the build succeeds.
+    # The live directory is updated file by file: containers have it bind-mounted
+    final_path = session_path
+    generated = (
+        SESSION_GENERATED
+        | {path.name for path in archive_paths(final_path)}
+        | load_managed(final_path)
+    )
+    with staged_session(final_path, seed=seed, generated=generated) as session_path:
+
+        def shown(path):
+            """Where path will be once the staged session is committed."""
+            return final_path / Path(path).relative_to(session_path)
+
+        # A packed payload (team_cli.py pack) would not match the rebuilt one
+        if remove_archives(session_path):
+            print(f"Removed the packed payload of {final_path}; run `pack` again to recreate it")
+
+        # Sync role template into the session; only changed files are rewritten
+        sync_stats = Counter()
+        if wanted("session-files"):
+            phases.start("role-sync")
+            session_files = set()
+            sync_tree(
+                role_path,
+                session_path,
+                delete=False,
+                ignore=SESSION_GENERATED,
+                stats=sync_stats,
+                copied=session_files,
+                files=ctx.role_files[role],
+            )
+            print(f"Created session '{name}' from role '{role}' in project '{project}'.")
+
+            # Set up devcontainer configuration
+            phases.start("devcontainer")
+            session_files |= setup_devcontainer(
+                session_path,
+                project,
+                name,
+                sync_stats,
+                ctx,
+                base_image=getattr(args, "base_image", True),
+            )
+            # Remove files an earlier build wrote that neither the role template nor
+            # the devcontainer provide any more. Only those: the session directory is
+            # the container's workspace, with repository clones, .venv, restored docs...
+            phases.start("orphans")
+            remove_files(session_path, load_managed(session_path) - session_files, sync_stats)
+            save_managed(session_path, session_files)
+
+        # --- Project and Docs Handling ---
+        phases.start("docs")
+        if wanted("docs"):
+            docs_included = []
+            payload_docs = session_path / "payload/docs"
+            payload_docs.mkdir(parents=True, exist_ok=True)
+
+            # Docs are materialized from the team's content-addressed store so that
+            # identical files are stored once per team rather than once per session
+            doc_store = None
+            if getattr(args, "doc_store", True):
+                doc_store = DocStore(SESSIONS_DIR / project / ".objects")
+                copy_doc = doc_store.materialize
+            else:
+                copy_doc = lambda src, dst: sync_file(src, dst, sync_stats)
+
+            # Copy global docs if enabled
+            include_global = getattr(
+                args, "include_global_docs", True
+            )  # Default to True for backward compatibility
+            if include_global:
+                for relative_path in ctx.global_docs:
+                    target_path = payload_docs / "global" / relative_path
+                    target_path.parent.mkdir(parents=True, exist_ok=True)
+                    copy_doc(ctx.global_docs_dir / relative_path, target_path)
+                    docs_included.append(f"global/{relative_path}")
 
-    # Write the MCP config
-    mcp_config_path = session_path / "payload/mcp_config.json"
-    os.makedirs(os.path.dirname(mcp_config_path), exist_ok=True)
-    with open(mcp_config_path, "w") as f:
-        json.dump(mcp_config, f, indent=4)
-    print(f"Generated {mcp_config_path}")
+            # Copy project docs if --project is set and enabled
+            include_project = getattr(args, "include_project_docs", True)
+            if include_project and args.project:
+                if ctx.project_docs is not None:
+                    for relative_path in ctx.project_docs:
+                        target_path = payload_docs / "project" / relative_path
+                        target_path.parent.mkdir(parents=True, exist_ok=True)
+                        copy_doc(ctx.project_docs_dir / relative_path, target_path)
+                        docs_included.append(f"project/{relative_path}")
+                else:
+                    print(f"[WARNING] Project docs not found: {ctx.project_docs_dir}")
+
+            # Copy role docs if enabled
+            include_role = getattr(
+                args, "include_role_docs", True
+            )  # Default to True for backward compatibility
+            if include_role:
+                role_docs_dir = role_path / "docs"
+                for relative_path in ctx.role_docs(role):
+                    target_path = payload_docs / "role" / relative_path
+                    target_path.parent.mkdir(parents=True, exist_ok=True)
+                    copy_doc(role_docs_dir / relative_path, target_path)
+                    docs_included.append(f"role/{relative_path}")
 
-    # --- Copy restore script ---
-    restore_script = session_path / "payload/restore_payload.sh"
-    shutil.copy(SESSIONS_DIR / "_shared/restore_payload.sh", restore_script)
-    os.chmod(restore_script, 0o755)
-    print(f"Added restore script at {restore_script}")
+            print(
+                f"Included docs in session payload: {', '.join(docs_included) if docs_included else 'none'}"
+            )
+            if doc_store is not None:
+                print(f"Materialized docs from {doc_store.root}: {doc_store.summary()}")
+            # Drop docs that were removed upstream since the last build
+            remove_orphans(payload_docs, docs_included, sync_stats)
+
+        # --- SSH Key Handling ---
+        phases.start("ssh-key")
+        payload_ssh_dir = session_path / "payload/.ssh"
+        payload_ssh_dir.mkdir(parents=True, exist_ok=True)
+        ssh_key_path = payload_ssh_dir / "id_rsa"
+        ssh_pub_path = payload_ssh_dir / "id_rsa.pub"
+        updated_env = False
+        if args.ssh_key and args.generate_ssh_key:
+            print("ERROR: --ssh-key and --generate-ssh-key are mutually exclusive.")
+            sys.exit(1)
+        if wanted("ssh-key"):
+            if args.ssh_key:
+                src_key = Path(args.ssh_key).expanduser()
+                if not src_key.exists():
+                    print(f"ERROR: Provided SSH key {src_key} does not exist.")
+                    sys.exit(1)
+                # Staged files may be hardlinks to the live session: replace, never overwrite
+                for path in (ssh_key_path, ssh_pub_path):
+                    if os.path.lexists(path):
+                        os.unlink(path)
+                shutil.copyfile(src_key, ssh_key_path)
+                os.chmod(ssh_key_path, 0o600)
+                pub_key = src_key.with_suffix(".pub")
+                if pub_key.exists():
+                    shutil.copyfile(pub_key, ssh_pub_path)
+                print(f"Copied SSH key to {shown(ssh_key_path)}.")
+                updated_env = True
+            elif args.generate_ssh_key:
+                # Reuse the session's registered identity so deploy keys stay valid
+                keypair, status = registry.resolve(
+                    name,
+                    comment=f"{name}@{project}",
+                    rotate=getattr(args, "rotate_keys", False),
+                    keypair=getattr(args, "ssh_keypair", None),
+                    backend=getattr(args, "ssh_key_backend", "python"),
+                    adopt_from=(ssh_key_path, ssh_pub_path),
+                )
+                install_keypair(keypair, ssh_key_path, ssh_pub_path)
+                key_fingerprint = fingerprint(keypair.public_key)
+                if status == "reused":
+                    print(f"Reusing registered SSH identity {key_fingerprint} for '{name}'.")
+                elif status == "adopted":
+                    print(f"Registered existing SSH key {key_fingerprint} for '{name}' in {registry.root}.")
+                else:
+                    print(
+                        f"{'Rotated' if status == 'rotated' else 'Generated new'} ed25519 SSH keypair "
+                        f"{key_fingerprint} at {shown(ssh_key_path)} and {shown(ssh_pub_path)}."
+                    )
+                updated_env = True
+            else:
+                print(
+                    "[REMINDER] No SSH key provided or generated. You must add one to payload/.ssh/id_rsa before launching the container."
+                )
+
+        # --- .env Handling: Look for config in the new directory structure ---
+        phases.start("env")
+        env_path = session_path / "payload/.env"  # Write directly to payload
+
+        if ctx.env_template_vars is None:
+            print(f"[WARNING] Environment template not found at {ctx.env_template_path}")
+        print(f"[DEBUG] Using actual env file: {ctx.env_file}")
+        if not ctx.env_file_exists:
+            print(f"[WARNING] Actual env file not found at {ctx.env_file}")
+
+        template_vars, env_vars = build_session_env(args, role, ctx)
+
+        # Debug print for SLACK_TEAM_ID and all keys
+        if "SLACK_TEAM_ID" in template_vars:
+            print(
+                f"[DEBUG] SLACK_TEAM_ID in template_vars before mapping: '{template_vars['SLACK_TEAM_ID']}'"
+            )
+        else:
+            print("[DEBUG] SLACK_TEAM_ID not found in template_vars before mapping")
+        print(f"[DEBUG] All keys in template_vars: {list(template_vars.keys())}")
+        generic_keys = GENERIC_ENV_KEYS
+
+        # Helper to quote values with spaces
+        def quote_if_needed(val):
+            if (
+                isinstance(val, str)
+                and " " in val
+                and not (val.startswith('"') and val.endswith('"'))
+            ):
+                return f'"{val}"'
+            return val
+
+        if wanted("env"):
+            # Render the .env file with consistent formatting
+            with io.StringIO() as f:
+                # Write Task Master variables first
+                task_master_vars = [
+                    "ANTHROPIC_API_KEY",
+                    "MODEL",
+                    "PERPLEXITY_API_KEY",
+                    "PERPLEXITY_MODEL",
+                    "MAX_TOKENS",
+                    "TEMPERATURE",
+                    "DEFAULT_SUBTASKS",
+                    "DEFAULT_PRIORITY",
+                    "DEBUG",
+                    "LOG_LEVEL",
+                ]
+                for k in task_master_vars:
+                    if k in env_vars:
+                        f.write(f"{k}={quote_if_needed(env_vars[k])}\n")
+                # Write mapped role-specific fields
+                for k in [
+                    "GIT_USER_EMAIL",
+                    "SLACK_BOT_TOKEN",
+                    "GITHUB_PERSONAL_ACCESS_TOKEN",
+                    "DISCORD_TOKEN",
+                    "DISCORD_CLIENT_ID",
+                    "DISCORD_GUILD_ID",
+                ]:
+                    if k in env_vars:
+                        f.write(f"{k}={quote_if_needed(env_vars[k])}\n")
+                # Write any other generic fields (excluding those already written)
+                already_written = set(
+                    task_master_vars
+                    + [
+                        "GIT_USER_EMAIL",
+                        "SLACK_BOT_TOKEN",
+                        "GITHUB_PERSONAL_ACCESS_TOKEN",
+                        "DISCORD_TOKEN",
+                        "DISCORD_CLIENT_ID",
+                        "DISCORD_GUILD_ID",
+                    ]
+                )
+                for k in generic_keys:
+                    if k not in already_written and k in env_vars:
+                        f.write(f"{k}={quote_if_needed(env_vars[k])}\n")
+                write_if_changed(env_path, f.getvalue(), sync_stats)
+
+        # --- Generate MCP config ---
+        phases.start("mcp")
+        if wanted("mcp"):
+            # Use role's mcp_config.template.json if it exists (compiled once per crew)
+            if role in ctx.mcp_template_errors:
+                print(f"Error parsing MCP config template: {ctx.mcp_template_errors[role]}")
+                sys.exit(1)
+            template = ctx.mcp_templates.get(role)
+            if template is not None:
+                print(f"Using custom MCP config template for role: {role_path}")
+                mcp_config = template.render(env_vars)
+            else:
+                # Generate default MCP config
+                mcp_config = {
+                    "mcpServers": {
+                        "puppeteer": {
+                            "command": "npx",
+                            "args": ["-y", "@modelcontextprotocol/server-puppeteer"],
+                            "env": {},
+                        },
+                        "github": {
+                            "command": "npx",
+                            "args": ["-y", "@modelcontextprotocol/server-github"],
+                            "env": {
+                                "GITHUB_PERSONAL_ACCESS_TOKEN": env_vars.get(
+                                    "GITHUB_PERSONAL_ACCESS_TOKEN", ""
+                                )
+                            },
+                        },
+                        "slack": {
+                            "command": "npx",
+                            "args": ["-y", "@modelcontextprotocol/server-slack"],
+                            "env": {
+                                "SLACK_BOT_TOKEN": env_vars.get("SLACK_BOT_TOKEN", ""),
+                                "SLACK_TEAM_ID": env_vars.get("SLACK_TEAM_ID", ""),
+                            },
+                        },
+                        "context7": {
+                            "command": "npx",
+                            "args": ["-y", "@upstash/context7-mcp@latest"],
+                        },
+                        "taskmaster-ai": {
+                            "command": "npx",
+                            "args": ["-y", "@modelcontextprotocol/server-taskmaster"],
+                            "env": {
+                                "ANTHROPIC_API_KEY": env_vars.get("ANTHROPIC_API_KEY", ""),
+                                "PERPLEXITY_API_KEY": env_vars.get("PERPLEXITY_API_KEY", ""),
+                                "MODEL": env_vars.get("MODEL", ""),
+                                "PERPLEXITY_MODEL": env_vars.get("PERPLEXITY_MODEL", ""),
+                                "MAX_TOKENS": env_vars.get("MAX_TOKENS", ""),
+                                "TEMPERATURE": env_vars.get("TEMPERATURE", ""),
+                                "DEFAULT_SUBTASKS": env_vars.get("DEFAULT_SUBTASKS", ""),
+                                "DEFAULT_PRIORITY": env_vars.get("DEFAULT_PRIORITY", ""),
+                                "DEBUG": env_vars.get("DEBUG", ""),
+                                "LOG_LEVEL": env_vars.get("LOG_LEVEL", ""),
+                            },
+                        },
+                    }
+                }
+
+            # Write the MCP config
+            mcp_config_path = session_path / "payload/mcp_config.json"
+            write_if_changed(mcp_config_path, json.dumps(mcp_config, indent=4), sync_stats)
+            print(f"Generated {shown(mcp_config_path)}")
+
+        # --- Copy restore script ---
+        phases.start("restore-script")
+        # Crew builds skip this: the Cline template fan-out installs its own copy
+        if getattr(args, "copy_restore_script", True):
+            restore_script = session_path / "payload/restore_payload.sh"
+            sync_file(SESSIONS_DIR / "_shared/restore_payload.sh", restore_script, sync_stats)
+            os.chmod(restore_script, 0o755)
+            print(f"Added restore script at {shown(restore_script)}")
+
+        phases.stop()
+        print(f"[SYNC] {final_path}: {format_stats(sync_stats)}")
+
+    # The build succeeded and the staged session has been committed
+    session_path = final_path
+    # Hashes of the payload, so that restarts only copy changed files
+    write_manifest(session_path)
+    env_path = session_path / "payload/.env"
+    ssh_key_path = session_path / "payload/.ssh/id_rsa"
 
     # --- Check for missing env keys ---
     required_keys = [
@@ -541,17 +902,12 @@ def create_session(args):
         )
 
     # --- Warn if .ssh is not in .gitignore ---
-    gitignore_paths = [session_path / ".gitignore", Path(".gitignore")]
-    ssh_ignored = False
-    for gi_path in gitignore_paths:
-        if gi_path.exists():
-            with open(gi_path, "r") as f:
-                for line in f:
-                    if ".ssh" in line:
-                        ssh_ignored = True
-                        break
-        if ssh_ignored:
-            break
+    # The repository .gitignore was scanned once when the context was loaded
+    ssh_ignored = ctx.root_gitignore_has_ssh
+    session_gitignore = session_path / ".gitignore"
+    if not ssh_ignored and session_gitignore.exists():
+        with open(session_gitignore, "r") as f:
+            ssh_ignored = any(".ssh" in line for line in f)
     if not ssh_ignored:
         print(
             "[SECURITY WARNING] .ssh directory is not in .gitignore! Add 'payload/.ssh/' to your .gitignore to prevent accidental commits of private keys."
@@ -583,6 +939,376 @@ def add_role(args):
     )
 
 
+def rotate_keys(args):
+    """Replace the SSH identities of the given sessions, leaving all others alone."""
+    from key_registry import KeyRegistry
+    from payload_pack import remove_archives
+    from ssh_keys import fingerprint, generate_keypairs, install_keypair
+
+    registry = KeyRegistry(SESSIONS_DIR / args.project / ".keys")
+    sessions_dir = SESSIONS_DIR / args.project / "sessions"
+    if args.all:
+        sessions = set(registry.entries())
+        if sessions_dir.exists():
+            # Hidden entries are in-progress staging directories, not sessions
+            sessions |= {
+                d.name
+                for d in sessions_dir.iterdir()
+                if d.is_dir() and not d.name.startswith(".")
+            }
+        sessions = sorted(sessions)
+    else:
+        sessions = args.sessions or []
+    if not sessions:
+        print("ERROR: Specify --sessions NAME [NAME ...] or --all.")
+        sys.exit(1)
+    unknown = [
+        s for s in sessions if s not in registry.entries() and not (sessions_dir / s).is_dir()
+    ]
+    if unknown:
+        print(f"ERROR: Unknown session(s) in project '{args.project}': {', '.join(unknown)}")
+        sys.exit(1)
+
+    keypairs = {}
+    if args.ssh_key_backend == "python":
+        keypairs = dict(
+            zip(sessions, generate_keypairs([f"{s}@{args.project}" for s in sessions]))
+        )
+    for session in sessions:
+        keypair, status = registry.resolve(
+            session,
+            comment=f"{session}@{args.project}",
+            rotate=True,
+            keypair=keypairs.get(session),
+            backend=args.ssh_key_backend,
+        )
+        payload_ssh_dir = sessions_dir / session / "payload/.ssh"
+        archives = 0
+        if payload_ssh_dir.parent.exists():
+            payload_ssh_dir.mkdir(exist_ok=True)
+            install_keypair(
+                keypair, payload_ssh_dir / "id_rsa", payload_ssh_dir / "id_rsa.pub"
+            )
+            # A packed payload would restore the old key
+            archives = remove_archives(sessions_dir / session)
+        print(f"[{status.upper()}] {session}: {fingerprint(keypair.public_key)}")
+        print(f"  {keypair.public_key.strip()}")
+        if archives:
+            print("  Removed the packed payload; run `pack` again to recreate it")
+    print(
+        f"\nRotated {len(sessions)} session key(s). Update the matching deploy keys on GitHub."
+    )
+
+
+def pack_payloads(args):
+    """Pack each session payload of a project into one verified archive."""
+    from payload_pack import install_restore_script, pack_session, resolve_compression
+    from payload_restore import restore
+
+    sessions_dir = SESSIONS_DIR / args.project / "sessions"
+    if args.sessions:
+        sessions = args.sessions
+    elif sessions_dir.is_dir():
+        sessions = sorted(
+            d.name for d in sessions_dir.iterdir() if d.is_dir() and not d.name.startswith(".")
+        )
+    else:
+        sessions = []
+    if not sessions:
+        print(f"ERROR: No sessions found for project '{args.project}' at {sessions_dir}.")
+        sys.exit(1)
+    missing = [s for s in sessions if not (sessions_dir / s / "payload").is_dir()]
+    if missing:
+        print(f"ERROR: No payload for session(s) {', '.join(missing)} in project '{args.project}'.")
+        sys.exit(1)
+    compression = resolve_compression(args.compression)
+    if args.compression == "auto" and compression != "zstd":
+        print("[PACK] zstd is not installed; compressing with gzip")
+
+    def pack(session):
+        session_path = sessions_dir / session
+        result = pack_session(session_path, compression, args.level)
+        install_restore_script(session_path)
+        if args.verify:
+            restore(result["archive"])
+        print(
+            f"[PACK] {result['archive']}: {result['files']} files, "
+            f"{result['bytes'] / 1e6:.1f} MB -> {result['archive_bytes'] / 1e6:.1f} MB"
+            f"{' (verified)' if args.verify else ''}"
+        )
+
+    jobs = max(1, args.jobs)
+    start = time.perf_counter()
+    results = run_crew_jobs([(s, lambda s=s: pack(s)) for s in sessions], jobs=jobs)
+    print_crew_summary("Packed", results, jobs, time.perf_counter() - start)
+    if not all(ok for _, ok, _, _, _ in results):
+        sys.exit(1)
+
+
+def reconcile_env(args):
+    """Resolve placeholders and drop other roles' values in existing session payloads."""
+    from env_file import read_env_file
+    from env_reconcile import placeholder_values, project_sessions, reconcile_session, role_index
+
+    if args.project:
+        projects = [args.project]
+    elif SESSIONS_DIR.exists():
+        projects = sorted(
+            d.name for d in SESSIONS_DIR.iterdir() if d.is_dir() and not d.name.startswith((".", "_"))
+        )
+    else:
+        projects = []
+    # The role catalog tells other roles' variables apart from this session's
+    if not ROLES_DIR.is_dir():
+        print(f"ERROR: Roles directory not found: {ROLES_DIR} (run from the repository root)")
+        sys.exit(1)
+    roles = [d.name for d in ROLES_DIR.iterdir() if d.is_dir() and not d.name.startswith((".", "_"))]
+
+    tasks = []
+    for project in projects:
+        env_file = SESSIONS_DIR / project / "config" / "env"
+        sessions = project_sessions(SESSIONS_DIR, project)
+        if not env_file.exists():
+            print(f"[SKIP] {project}: no env file at {env_file}")
+            continue
+        if not sessions:
+            print(f"[SKIP] {project}: no sessions")
+            continue
+        values = placeholder_values(read_env_file(env_file))
+        index = role_index(roles, sessions)
+        for session in sessions:
+
+            def reconcile(session=session, values=values, index=index):
+                stats = reconcile_session(session, values, index)
+                if stats["missing"]:
+                    print(f"[WARN] {session}: no payload/.env")
+                status = "FIXED" if stats["written"] else "OK"
+                print(f"[{status}] {session}: {stats['written']} file(s) rewritten")
+                if stats["archives"]:
+                    print("  Removed the packed payload; run `pack` again to recreate it")
+
+            tasks.append((f"{project}/{session.name}", reconcile))
+
+    if not tasks:
+        print("ERROR: No sessions to reconcile.")
+        sys.exit(1)
+    jobs = max(1, args.jobs)
+    start = time.perf_counter()
+    results = run_crew_jobs(tasks, jobs=jobs)
+    print_crew_summary("Reconciled", results, jobs, time.perf_counter() - start)
+    if not all(ok for _, ok, _, _, _ in results):
+        sys.exit(1)
+
+
+def migrate_paths(args):
+    """Rewrite path references in scripts with a compiled codemod rule set."""
+    from path_migrate import DEFAULT_GLOBS, find_files, load_rules, migrate
+
+    try:
+        rules = load_rules(args.rules)
+    except (OSError, ValueError, KeyError) as e:
+        print(f"ERROR: Cannot load rule set '{args.rules}': {e}")
+        sys.exit(1)
+    roots = args.paths or ["."]
+    files = find_files(roots, args.glob or DEFAULT_GLOBS)
+    start = time.perf_counter()
+    changed = replacements = errors = 0
+    for path, count, diff, error in migrate(files, rules, args.execute, args.jobs, roots):
+        if error:
+            print(f"[ERROR] {path}: {error}")
+            errors += 1
+        elif count:
+            changed += 1
+            replacements += count
+            if diff:
+                sys.stdout.write(diff)
+            else:
+                print(f"[UPDATED] {path} ({count} replacement{'s' if count != 1 else ''})")
+    verb = "updated" if args.execute else "would change"
+    print(
+        f"\n{changed} of {len(files)} files {verb} ({replacements} replacements, "
+        f"{errors} errors, {time.perf_counter() - start:.2f}s)"
+    )
+    if changed and not args.execute:
+        print("Dry run: re-run with --execute to write these changes.")
+    if errors:
+        sys.exit(1)
+
+
+def migrate_sessions(args):
+    """Move sessions from the old sessions/ layout to teams/, or undo such a move."""
+    from session_migrate import MIGRATIONS_DIR, Migration, plan_moves
+
+    if args.rollback or args.finalize:
+        run_id = args.rollback or args.finalize
+        if run_id == "latest":
+            migration = Migration.latest()
+        else:
+            migration = Migration(MIGRATIONS_DIR / f"{run_id}.jsonl")
+        if migration is None or not migration.path.exists():
+            print(f"ERROR: No migration journal found for '{run_id}' in {MIGRATIONS_DIR}")
+            sys.exit(1)
+        status = migration.status()
+        if status in ("rolled-back", "finalized"):
+            print(f"ERROR: Migration {migration.run_id} is already {status}.")
+            sys.exit(1)
+        if args.rollback:
+            migration.rollback()
+            print(f"\nRolled back migration {migration.run_id}.")
+        else:
+            deleted = migration.finalize()
+            print(f"\nFinalized migration {migration.run_id}: deleted {deleted} displaced path(s).")
+        return
+
+    moves = plan_moves(Path(args.source), SESSIONS_DIR)
+    if not moves:
+        print(f"Nothing to migrate from {args.source}/.")
+        return
+    if not args.execute:
+        for src, dst in moves:
+            note = " (existing destination will be displaced)" if dst.exists() else ""
+            print(f"Would move {src} -> {dst}{note}")
+        print(f"\n{len(moves)} move(s) planned. Re-run with --execute to perform them.")
+        return
+
+    migration = Migration.create()
+    print(f"[JOURNAL] {migration.path}")
+    counts = migration.run(moves)
+    print(
+        f"\nMigrated {len(moves)} path(s): {counts['rename']} renamed, {counts['copy']} copied "
+        f"across filesystems, {counts['displaced']} existing destination(s) displaced."
+    )
+    print(
+        f"Undo with: python tools/team_cli.py migrate-sessions --rollback {migration.run_id}\n"
+        f"Delete displaced destinations with: "
+        f"python tools/team_cli.py migrate-sessions --finalize {migration.run_id}"
+    )
+
+
+def build_base_image(args):
+    """Write a project's shared devcontainer image definition and optionally build it."""
+    import subprocess
+    from base_image import build_image, image_files, write_image_context
+    from payload_sync import list_tree
+
+    if not DEVCONTAINER_DIR.is_dir():
+        print(f"ERROR: No devcontainer template found at {DEVCONTAINER_DIR}")
+        sys.exit(1)
+    files = image_files(list_tree(DEVCONTAINER_DIR, ("devcontainer.json",)))
+    context, tag = write_image_context(args.project, DEVCONTAINER_DIR, files, SESSIONS_DIR)
+    print(f"[IMAGE] {context}: {tag}")
+    if not args.build:
+        return
+    try:
+        built = build_image(context, tag, force=args.force)
+    except FileNotFoundError as e:
+        print(f"ERROR: {e}")
+        sys.exit(1)
+    except subprocess.CalledProcessError as e:
+        print(f"ERROR: docker build failed with status {e.returncode}")
+        sys.exit(1)
+    if built:
+        print(f"[IMAGE] Built {tag}")
+    else:
+        print(f"[IMAGE] {tag} already exists; its inputs are unchanged, so the build was skipped")
+
+
+def build_team_wheelhouse(args):
+    """Build a project's wheelhouse of container Python tooling from local checkouts."""
+    import subprocess
+    from wheelhouse import WHEELHOUSE_DIR, build_wheelhouse
+
+    missing = [src for src in args.source if not Path(src).is_dir()]
+    if missing:
+        print(f"ERROR: Source checkout(s) not found: {', '.join(missing)}")
+        sys.exit(1)
+    wheelhouse = SESSIONS_DIR / args.project / WHEELHOUSE_DIR
+    start = time.perf_counter()
+    try:
+        requirements = build_wheelhouse(
+            [Path(src) for src in args.source],
+            wheelhouse,
+            platforms=args.platform or (),
+            python_version=args.python_version,
+            force=args.force,
+        )
+    except subprocess.CalledProcessError as e:
+        print(f"ERROR: pip failed with status {e.returncode}; {wheelhouse} was left unchanged")
+        sys.exit(1)
+    if requirements is None:
+        print(f"[WHEELHOUSE] {wheelhouse} is up to date with its checkouts; skipped the build")
+        return
+    wheels = len(list(wheelhouse.glob("*.whl")))
+    print(
+        f"[WHEELHOUSE] {wheelhouse}: {wheels} wheels for {', '.join(requirements)} "
+        f"({time.perf_counter() - start:.1f}s)"
+    )
+
+
+def update_git_cache(args):
+    """Create or refresh the project's bare mirrors of the repos sessions clone."""
+    from env_file import read_env_file
+    from git_cache import GIT_CACHE_DIR, update_mirror, write_index
+
+    env_file = Path(args.env_file) if args.env_file else SESSIONS_DIR / args.project / "config/env"
+    team_env = read_env_file(env_file) if env_file.exists() else {}
+    urls = [
+        team_env[key]
+        for key in ("PROJECT_REPO_URL", "MCP_DISCORD_REPO_URL")
+        if team_env.get(key, "").strip()
+    ]
+    urls = list(dict.fromkeys(urls + (args.url or [])))
+    if not urls:
+        print(
+            f"ERROR: No repositories to mirror: set PROJECT_REPO_URL or MCP_DISCORD_REPO_URL "
+            f"in {env_file}, or pass --url."
+        )
+        sys.exit(1)
+    cache_dir = SESSIONS_DIR / args.project / GIT_CACHE_DIR
+
+    def update(url):
+        mirror, action = update_mirror(url, cache_dir)
+        print(f"[GIT-CACHE] {action.capitalize()} {url} -> {mirror}")
+
+    jobs = max(1, args.jobs)
+    start = time.perf_counter()
+    results = run_crew_jobs([(url, lambda u=url: update(u)) for url in urls], jobs=jobs)
+    print_crew_summary("Mirrors", results, jobs, time.perf_counter() - start)
+    write_index(cache_dir, [url for url, ok, *_ in results if ok])
+    if not all(ok for _, ok, *_ in results):
+        sys.exit(1)
+
+
+def gc_doc_store(args):
+    """Delete doc store objects that no session payload uses any more."""
+    from doc_store import DocStore, file_digest
+    from payload_restore import scan_payload
+
+    project_dir = SESSIONS_DIR / args.project
+    sessions_dir = project_dir / "sessions"
+    # Hidden entries are in-progress staging directories, not sessions
+    sessions = (
+        sorted(d for d in sessions_dir.iterdir() if d.is_dir() and not d.name.startswith("."))
+        if sessions_dir.is_dir()
+        else []
+    )
+    # Each payload's manifest, refreshed where files changed since it was
+    # written (watch, reconcile-env), lists the digests still in use
+    keep = set()
+    for session in sessions:
+        manifest = scan_payload(session / "payload", digest=file_digest)
+        keep.update(entry["sha256"] for entry in manifest["files"])
+
+    store = DocStore(project_dir / ".objects")
+    stats = store.collect(keep, min_age=args.min_age, dry_run=args.dry_run)
+    action = "Would remove" if args.dry_run else "Removed"
+    print(
+        f"[GC] {action} {stats['removed']} unused object(s) ({stats['bytes'] / 1e6:.1f} MB) "
+        f"from {store.root}; kept {stats['kept']} in use by {len(sessions)} session(s) or newer "
+        f"than {args.min_age:.0f}s"
+    )
+
+
 def print_simple_help():
     print(
         """
@@ -612,6 +1338,8 @@ def load_crew_config(config_path: Path = None) -> Dict[str, Any]:
     Args:
         config_path: Optional path to crew config. Defaults to team/crew.yaml
     """
+    import yaml
+
     config_file = config_path or TEAM_CONFIG
 
     if not config_file.exists():
@@ -658,14 +1386,10 @@ def load_team_env(env_path: Path = None) -> Dict[str, str]:
         )
         sys.exit(1)
 
-    env_vars = {}
+    from env_file import read_env_file
+
     try:
-        with open(env_file) as f:
-            for line in f:
-                line = line.strip()
-                if line and not line.startswith("#") and "=" in line:
-                    k, v = line.split("=", 1)
-                    env_vars[k.strip()] = v.strip()
+        env_vars = read_env_file(env_file)
     except Exception as e:
         print(f"Error reading team environment file: {e}")
         sys.exit(1)
@@ -680,21 +1404,57 @@ def load_team_env(env_path: Path = None) -> Dict[str, str]:
     return env_vars
 
 
-def create_crew(args):
-    """Create multiple sessions based on a team environment file."""
+def pregenerate_session_keys(project, session_tasks, rotate=False):
+    """Generate, in one in-process batch, a keypair for every crew session that
+    needs a new identity, and attach it to the session's args as ssh_keypair."""
+    from key_registry import KeyRegistry
+    from ssh_keys import generate_keypairs
+
+    registry = KeyRegistry(SESSIONS_DIR / project / ".keys")
+    new_key_tasks = [
+        (name, session_args)
+        for name, session_args in session_tasks
+        if rotate
+        or registry.needs_key(
+            name,
+            adopt_from=(
+                SESSIONS_DIR / project / "sessions" / name / "payload/.ssh/id_rsa",
+                SESSIONS_DIR / project / "sessions" / name / "payload/.ssh/id_rsa.pub",
+            ),
+        )
+    ]
+    keypairs = generate_keypairs([f"{name}@{project}" for name, _ in new_key_tasks])
+    for (_, session_args), keypair in zip(new_key_tasks, keypairs):
+        session_args.ssh_keypair = keypair
+
+
+def create_crew(args, cache=None):
+    """Create multiple sessions based on a team environment file.
+
+    Args:
+        args: Parsed create-crew arguments
+        cache: Optional team_daemon.ContextCache supplying the parsed team env
+            and CrewContext; without it both are loaded from disk
+    """
+    from env_file import read_env_file
+    from payload_pack import remove_archives, write_manifest
+    from role_index import RoleIndex
+    from scaffold_team import (
+        copy_cline_templates_and_rules,
+        copy_cline_shared_templates,
+        copy_cline_role_templates,
+    )
+
     env_file = Path(args.env_file) if args.env_file else TEAM_ENV
     if not env_file.exists():
         print(f"Error: Team environment file not found at {env_file}")
         sys.exit(1)
 
-    # Load team environment
-    team_env = {}
-    with open(env_file) as f:
-        for line in f:
-            line = line.strip()
-            if line and not line.startswith("#") and "=" in line:
-                key, value = line.split("=", 1)
-                team_env[key.strip()] = value.strip()
+    # Load team environment (parsed once; shared with every session via the context)
+    with phase("read-env"):
+        team_env = (
+            cache.team_env(env_file) if cache is not None else read_env_file(env_file)
+        )
 
     # Extract project info and docs config
     project_name = team_env.get("PROJECT_NAME", "default")
@@ -706,14 +1466,23 @@ def create_crew(args):
     include_role_docs = team_env.get("INCLUDE_ROLE_DOCS", "true").lower() == "true"
 
     # Create project directory with the new structure
+    plan_only = getattr(args, "plan", False)
     project_dir = SESSIONS_DIR / project_name / "sessions"
-    project_dir.mkdir(parents=True, exist_ok=True)
+    if not plan_only:
+        project_dir.mkdir(parents=True, exist_ok=True)
     print(f"\nCreating sessions for project: {project_name}")
     print(f"Documentation settings:")
     print(f"- Include global docs: {include_global_docs}")
     print(f"- Include project docs: {include_project_docs}")
     print(f"- Include role docs: {include_role_docs}")
 
+    # Load everything the sessions share exactly once for the whole crew
+    with phase("load-context"):
+        if cache is not None:
+            ctx = cache.context(env_file, project_name)
+        else:
+            ctx = load_context(env_file, project_name, team_env)
+
     # Shared tokens
     shared_tokens = {
         "SLACK_WORKSPACE_ID": team_env.get("SLACK_WORKSPACE_ID", ""),
@@ -752,10 +1521,15 @@ def create_crew(args):
         )
         sys.exit(1)
 
-    # Create each session
-    for session_name, config in sessions.items():
-        print(f"\nCreating session: {session_name}")
+    # Assign each team env key to at most one session (the longest matching
+    # session or role name), in a single pass over the keys
+    with phase("role-index"):
+        role_vars = RoleIndex(set(sessions) | set(ctx.roles)).group(team_env)
 
+    # Prepare each session
+    jobs = max(1, getattr(args, "jobs", 1) or 1)
+    session_tasks = []
+    for session_name, config in sessions.items():
         # Check if all required keys are present
         required_keys = ["email", "slack_token", "github_token"]
         missing_keys = [k for k in required_keys if k not in config]
@@ -768,8 +1542,7 @@ def create_crew(args):
             continue
 
         # Use session name as role, fallback to python_coder with warning
-        role_dir = ROLES_DIR / session_name
-        if role_dir.exists():
+        if session_name in ctx.roles:
             role = session_name
         else:
             print(
@@ -783,8 +1556,9 @@ def create_crew(args):
             role=role,
             generate_ssh_key=True,
             ssh_key=None,
-            project=project_name if include_project_docs else None,
+            project=project_name,
             include_global_docs=include_global_docs,
+            include_project_docs=include_project_docs,
             include_role_docs=include_role_docs,
             prompt_all=False,
             all_env=[
@@ -813,35 +1587,197 @@ def create_crew(args):
                 f"DEFAULT_PRIORITY={team_env.get('DEFAULT_PRIORITY', 'medium')}",
                 f"DEBUG={team_env.get('DEBUG', 'false')}",
                 f"LOG_LEVEL={team_env.get('LOG_LEVEL', 'info')}",
-                # Include any role-specific variables that are in the team env
-                *[
-                    f"{k}={v}"
-                    for k, v in team_env.items()
-                    if k.startswith(session_name.upper())
-                    or any(
-                        k.startswith(part.upper() + "_")
-                        for part in session_name.upper().split("_")
-                    )
-                ],
+                # Include the role-specific variables that are in the team env
+                *[f"{k}={v}" for k, v in role_vars.get(session_name, {}).items()],
             ],
             overwrite=getattr(args, "overwrite", False),
+            doc_store=getattr(args, "doc_store", True),
+            clean=getattr(args, "clean", False),
+            copy_restore_script=False,
+            base_image=getattr(args, "base_image", True),
+            ssh_key_backend=getattr(args, "ssh_key_backend", "python"),
+            rotate_keys=getattr(args, "rotate_keys", False),
         )
         # Ensure the correct env file is always used
         session_args.env_file = str(env_file)
+        # The variables the session's .env and MCP config are rendered from;
+        # `build` fingerprints these rather than the whole team env file
+        _, session_args.session_env = build_session_env(session_args, role, ctx)
+        session_tasks.append((session_name, session_args))
+
+    report_mcp_template_vars(ctx, session_tasks)
+
+    # `team_cli build`: only rebuild the targets whose inputs changed
+    all_session_tasks = session_tasks
+    incremental = getattr(args, "incremental", False)
+    if incremental:
+        from build_graph import plan_crew, print_plan
+
+        with phase("plan"):
+            plans, _ = plan_crew(
+                session_tasks,
+                ctx,
+                SESSIONS_DIR,
+                force=getattr(args, "force", False),
+                rotate=getattr(args, "rotate_keys", False),
+            )
+        print_plan(plans, "[PLAN]" if plan_only else "[BUILD]")
+        if plan_only:
+            return
+        for session_name, session_args in session_tasks:
+            session_args.targets = set(plans[session_name]) - {"cline-templates"}
+        session_tasks = [(n, a) for n, a in session_tasks if a.targets]
+
+    # Journal each session as it completes so an interrupted run can --resume
+    from build_graph import session_fingerprint
+    from crew_journal import JOURNAL_FILE, CrewJournal
+
+    journal = CrewJournal(SESSIONS_DIR / project_name / JOURNAL_FILE)
+    if getattr(args, "resume", False):
+        completed = journal.completed()
+        skipped, remaining = [], []
+        for session_name, session_args in session_tasks:
+            if (
+                (project_dir / session_name).is_dir()
+                and completed.get(session_name)
+                == session_fingerprint(session_args, ctx, SESSIONS_DIR)
+            ):
+                skipped.append(session_name)
+            else:
+                # Stale or unfinished: the previous version (if any) is replaced
+                session_args.overwrite = True
+                remaining.append((session_name, session_args))
+        print(
+            f"[RESUME] Skipping {len(skipped)} session(s) completed with unchanged inputs"
+            + (f": {', '.join(skipped)}" if skipped else "")
+        )
+        session_tasks = remaining
+    journal.append(
+        "run",
+        sessions=[n for n, _ in session_tasks],
+        resume=getattr(args, "resume", False),
+    )
 
+    # Generate the SSH keys that are actually needed in one in-process batch
+    # up front; sessions with a registered identity keep it
+    if getattr(args, "ssh_key_backend", "python") == "python":
+        with phase("keygen-batch"):
+            pregenerate_session_keys(
+                project_name,
+                [
+                    (n, a)
+                    for n, a in session_tasks
+                    if "ssh-key" in getattr(a, "targets", ("ssh-key",))
+                ],
+                getattr(args, "rotate_keys", False),
+            )
+
+    def build(session_name, session_args, attempt=1):
+        print(f"\nCreating session: {session_name}")
+        start = time.perf_counter()
         try:
-            create_session(session_args)
-            print(f"Successfully created session: {session_name}")
-        except Exception as e:
-            print(f"Error creating session {session_name}: {str(e)}")
-            continue
+            create_session(session_args, ctx)
+        except BaseException as e:
+            error = f"exited with status {e.code}" if isinstance(e, SystemExit) else str(e)
+            journal.append("failed", session=session_name, error=error, attempt=attempt)
+            raise
+        journal.append(
+            "done",
+            session=session_name,
+            fingerprint=session_fingerprint(session_args, ctx, SESSIONS_DIR),
+            seconds=round(time.perf_counter() - start, 3),
+            attempt=attempt,
+        )
+        print(f"Successfully created session: {session_name}")
+
+    def build_all(tasks, attempt, title):
+        start = time.perf_counter()
+        results = run_crew_jobs(
+            [(n, lambda n=n, a=a: build(n, a, attempt)) for n, a in tasks], jobs
+        )
+        if jobs > 1:
+            print_crew_summary(title, results, jobs, time.perf_counter() - start)
+        else:
+            for session_name, ok, error, _, _ in results:
+                if not ok:
+                    print(f"Error creating session {session_name}: {error}")
+        return {session_name for session_name, ok, *_ in results if not ok}
+
+    # Create each session (concurrently when --jobs > 1), then retry the
+    # failed ones on their own
+    failed = build_all(session_tasks, 1, "Session builds")
+    for attempt in range(2, max(0, getattr(args, "retries", 0) or 0) + 2):
+        if not failed:
+            break
+        print(f"\n[RETRY] Attempt {attempt} for: {', '.join(sorted(failed))}")
+        failed = build_all(
+            [(n, a) for n, a in session_tasks if n in failed],
+            attempt,
+            f"Session builds (attempt {attempt})",
+        )
 
     # After all session payloads are created
     # Restore Cline Memory Bank templates and .windsurfrules to each session payload
-    copy_cline_templates_and_rules(project_name, [role for role in sessions.keys()])
-    propagate_cline_docs_shared(project_name, [role for role in sessions.keys()])
+    # Sessions that failed to build are left as they were
+    roles = [role for role in sessions.keys() if role not in failed]
+    if incremental:
+        roles = [role for role in roles if "cline-templates" in plans.get(role, ())]
+    def remove_packed_payload(role):
+        # A packed payload (team_cli.py pack) would restore the old templates
+        if remove_archives(project_dir / role):
+            print(
+                f"Removed the packed payload of {project_dir / role}; "
+                "run `pack` again to recreate it"
+            )
+
+    if jobs > 1 and roles:
+        with phase("cline-shared-templates"):
+            copy_cline_shared_templates(project_name)
+
+        def fan_out(role):
+            with phase("cline-templates", session=role):
+                copy_cline_role_templates(project_name, role)
+            with phase("propagate-shared-docs", session=role):
+                propagate_cline_docs_shared(project_name, [role])
+            with phase("payload-manifest", session=role):
+                remove_packed_payload(role)
+                write_manifest(project_dir / role)
+
+        start = time.perf_counter()
+        results = run_crew_jobs(
+            [(role, lambda r=role: fan_out(r)) for role in roles], jobs
+        )
+        print_crew_summary(
+            "Cline template fan-out", results, jobs, time.perf_counter() - start
+        )
+        failed |= {role for role, ok, *_ in results if not ok}
+    elif roles:
+        with phase("cline-templates"):
+            copy_cline_templates_and_rules(project_name, roles)
+        with phase("propagate-shared-docs"):
+            propagate_cline_docs_shared(project_name, roles)
+        with phase("payload-manifest"):
+            for role in roles:
+                remove_packed_payload(role)
+                write_manifest(project_dir / role)
     print("[INFO] All session payloads have received the finalized cline_docs_shared.")
 
+    if incremental:
+        from build_graph import record_builds
+
+        # Record what was built so the next build can skip it
+        record_builds(
+            [(n, a) for n, a in all_session_tasks if plans[n] and n not in failed],
+            ctx,
+            SESSIONS_DIR,
+        )
+
+    if failed:
+        print(f"\nTeam creation failed for {len(failed)} session(s) in {project_dir}:")
+        for session_name in sorted(failed):
+            print(f"  - {session_name}")
+        sys.exit(1)
+
     print(f"\nTeam creation complete! All sessions created in {project_dir}")
     print("\nAction Required:")
     print("1. Set ANTHROPIC_API_KEY in each session's .env file")
@@ -859,29 +1795,43 @@ def create_crew(args):
     )
 
 
+def build_crew(args, cache=None):
+    """Bring every session of a crew up to date, rebuilding only the targets
+    whose inputs changed since the last build (see build_graph.py)."""
+    args.overwrite = True
+    args.clean = False
+    args.rotate_keys = False
+    args.incremental = True
+    create_crew(args, cache)
+
+
 def propagate_cline_docs_shared(project, roles):
     """
     Copy the filled cline_docs_shared from the team root into each session payload.
     """
+    from payload_sync import sync_tree
+
     team_shared_dir = Path(f"teams/{project}/cline_docs_shared")
     for role in roles:
         payload_dir = Path(f"teams/{project}/sessions/{role}/payload")
         target_shared_dir = payload_dir / "cline_docs_shared"
-        if target_shared_dir.exists():
-            shutil.rmtree(target_shared_dir)
-        shutil.copytree(team_shared_dir, target_shared_dir)
+        sync_tree(team_shared_dir, target_shared_dir)
         print(f"[INFO] Propagated cline_docs_shared to {target_shared_dir}")
 
 
-def main():
+def build_parser() -> argparse.ArgumentParser:
+    """Build the team_cli argument parser (shared by main() and the daemon)."""
     parser = argparse.ArgumentParser(
         description="LedgerFlow AI Team CLI", usage="%(prog)s <command> [options]"
     )
     subparsers = parser.add_subparsers(dest="command")
+    # Options shared by every build command
+    profile_parent = argparse.ArgumentParser(add_help=False)
+    add_profile_argument(profile_parent)
 
     # Create Session Command
     create_parser = subparsers.add_parser(
-        "create-session", help="Create a new agent session"
+        "create-session", help="Create a new agent session", parents=[profile_parent]
     )
     create_parser.add_argument("--name", help="Session name")
     create_parser.add_argument("--role", help="Role/template to use")
@@ -890,6 +1840,17 @@ def main():
     create_parser.add_argument(
         "--generate-ssh-key", action="store_true", help="Generate new SSH key"
     )
+    create_parser.add_argument(
+        "--rotate-keys",
+        action="store_true",
+        help="Replace the session's registered SSH identity instead of reusing it",
+    )
+    create_parser.add_argument(
+        "--ssh-key-backend",
+        choices=SSH_KEY_BACKENDS,
+        default="python",
+        help="How --generate-ssh-key creates keys: in-process (python) or by running ssh-keygen",
+    )
     create_parser.add_argument(
         "--prompt-all", action="store_true", help="Prompt for all env values"
     )
@@ -911,42 +1872,522 @@ def main():
     create_parser.add_argument(
         "--overwrite",
         action="store_true",
-        help="Overwrite existing session directory and regenerate all payload files",
+        help="Update an existing session directory in place, rewriting only changed files",
+    )
+    create_parser.add_argument(
+        "--clean",
+        action="store_true",
+        help="Rebuild the generated files of existing sessions from scratch",
+    )
+    create_parser.add_argument(
+        "--no-doc-store",
+        action="store_false",
+        dest="doc_store",
+        help="Copy docs into the payload instead of linking them from teams/<project>/.objects",
+    )
+    create_parser.add_argument(
+        "--no-base-image",
+        action="store_false",
+        dest="base_image",
+        help="Build the session's own image from a Dockerfile instead of using the team base image",
     )
 
     # Create Crew Command
     crew_parser = subparsers.add_parser(
-        "create-crew", help="Create multiple sessions from team config"
+        "create-crew",
+        help="Create multiple sessions from team config",
+        parents=[profile_parent],
     )
     crew_parser.add_argument("--env-file", help="Path to team environment file")
     crew_parser.add_argument("--template", help="Path to team template YAML file")
     crew_parser.add_argument(
         "--overwrite",
         action="store_true",
-        help="Overwrite existing session directories and regenerate all payload files",
+        help="Update existing session directories in place, rewriting only changed files",
+    )
+    crew_parser.add_argument(
+        "--jobs",
+        "-j",
+        type=int,
+        default=1,
+        help="Number of sessions to build concurrently (default: 1)",
+    )
+    crew_parser.add_argument(
+        "--clean",
+        action="store_true",
+        help="Rebuild the generated files of existing sessions from scratch",
+    )
+    crew_parser.add_argument(
+        "--no-doc-store",
+        action="store_false",
+        dest="doc_store",
+        help="Copy docs into each payload instead of linking them from teams/<project>/.objects",
+    )
+    crew_parser.add_argument(
+        "--no-base-image",
+        action="store_false",
+        dest="base_image",
+        help="Build each session's own image from a Dockerfile instead of using the team base image",
+    )
+    crew_parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="Skip sessions the crew journal records as complete with unchanged inputs",
+    )
+    crew_parser.add_argument(
+        "--retries",
+        type=int,
+        default=0,
+        help="Retry each failed session up to this many times (default: 0)",
+    )
+    crew_parser.add_argument(
+        "--rotate-keys",
+        action="store_true",
+        help="Replace every session's registered SSH identity instead of reusing it",
+    )
+    crew_parser.add_argument(
+        "--ssh-key-backend",
+        choices=SSH_KEY_BACKENDS,
+        default="python",
+        help="Generate session SSH keys in-process in one batch (python) or with one ssh-keygen run per session",
+    )
+
+    # Build Command
+    build_parser = subparsers.add_parser(
+        "build",
+        help="Rebuild only the session targets whose inputs changed",
+        parents=[profile_parent],
+    )
+    build_parser.add_argument("--env-file", help="Path to team environment file")
+    build_parser.add_argument(
+        "--plan",
+        action="store_true",
+        help="List the targets that would be rebuilt, and why, without touching disk",
+    )
+    build_parser.add_argument(
+        "--force", action="store_true", help="Rebuild every target of every session"
+    )
+    build_parser.add_argument(
+        "--jobs",
+        "-j",
+        type=int,
+        default=1,
+        help="Number of sessions to build concurrently (default: 1)",
+    )
+    build_parser.add_argument(
+        "--retries",
+        type=int,
+        default=0,
+        help="Retry each failed session up to this many times (default: 0)",
+    )
+    build_parser.add_argument(
+        "--no-doc-store",
+        action="store_false",
+        dest="doc_store",
+        help="Copy docs into each payload instead of linking them from teams/<project>/.objects",
+    )
+    build_parser.add_argument(
+        "--no-base-image",
+        action="store_false",
+        dest="base_image",
+        help="Build each session's own image from a Dockerfile instead of using the team base image",
+    )
+    build_parser.add_argument(
+        "--ssh-key-backend",
+        choices=SSH_KEY_BACKENDS,
+        default="python",
+        help="How keys for sessions without an identity are generated",
     )
 
     # Add Role Command
-    add_role_parser = subparsers.add_parser("add-role", help="Add a new role template")
+    add_role_parser = subparsers.add_parser(
+        "add-role", help="Add a new role template", parents=[profile_parent]
+    )
     add_role_parser.add_argument("name", help="Name of the new role")
     add_role_parser.add_argument("--copy-from", help="Existing role to copy from")
 
+    # Rotate Keys Command
+    rotate_parser = subparsers.add_parser(
+        "rotate-keys",
+        help="Replace the registered SSH identities of selected sessions",
+        parents=[profile_parent],
+    )
+    rotate_parser.add_argument("--project", required=True, help="Project name")
+    rotate_group = rotate_parser.add_mutually_exclusive_group()
+    rotate_group.add_argument(
+        "--sessions", nargs="+", help="Session names whose keys should be rotated"
+    )
+    rotate_group.add_argument(
+        "--all", action="store_true", help="Rotate the keys of every session in the project"
+    )
+    rotate_parser.add_argument(
+        "--ssh-key-backend",
+        choices=SSH_KEY_BACKENDS,
+        default="python",
+        help="Generate keys in-process (python) or by running ssh-keygen",
+    )
+
+    # Pack Command
+    pack_parser = subparsers.add_parser(
+        "pack",
+        help="Pack session payloads into single verified archives for fast container restore",
+        parents=[profile_parent],
+    )
+    pack_parser.add_argument("--project", required=True, help="Project name")
+    pack_parser.add_argument(
+        "--sessions", nargs="+", help="Sessions to pack (default: every session in the project)"
+    )
+    pack_parser.add_argument(
+        "--compression",
+        choices=PACK_COMPRESSIONS,
+        default="auto",
+        help="Archive compression (default: zstd if installed, else gzip)",
+    )
+    pack_parser.add_argument("--level", type=int, help="Compression level")
+    pack_parser.add_argument(
+        "--verify", action="store_true", help="Re-read each archive and check it against its manifest"
+    )
+    pack_parser.add_argument(
+        "--jobs",
+        "-j",
+        type=int,
+        default=1,
+        help="Number of sessions to pack concurrently (default: 1)",
+    )
+
+    # Base Image Command
+    image_parser = subparsers.add_parser(
+        "base-image",
+        help="Write (and with --build, build) the team's shared content-hash-tagged devcontainer image",
+        parents=[profile_parent],
+    )
+    image_parser.add_argument("--project", required=True, help="Project name")
+    image_parser.add_argument(
+        "--build",
+        action="store_true",
+        help="Build the image with docker unless an image with its tag already exists",
+    )
+    image_parser.add_argument(
+        "--force", action="store_true", help="With --build, build even if the tag exists"
+    )
+
+    # Wheelhouse Command
+    wheelhouse_parser = subparsers.add_parser(
+        "wheelhouse",
+        help="Build the team's wheelhouse that session containers install Python tooling from offline",
+        parents=[profile_parent],
+    )
+    wheelhouse_parser.add_argument("--project", required=True, help="Project name")
+    wheelhouse_parser.add_argument(
+        "--source",
+        action="append",
+        required=True,
+        help="Local checkout to build (e.g. of MCP_DISCORD_REPO_URL); repeatable",
+    )
+    wheelhouse_parser.add_argument(
+        "--platform",
+        action="append",
+        help="Download dependencies as binary wheels for this pip platform tag "
+        "(e.g. manylinux2014_x86_64) instead of building them for the host; repeatable",
+    )
+    wheelhouse_parser.add_argument(
+        "--python-version",
+        default="3.11",
+        help="Target Python version with --platform (default: 3.11, as in the base image)",
+    )
+    wheelhouse_parser.add_argument(
+        "--force", action="store_true", help="Rebuild even if the checkouts are unchanged"
+    )
+
+    # Git Cache Command
+    git_cache_parser = subparsers.add_parser(
+        "git-cache",
+        help="Create or refresh the team's bare mirrors that session clones borrow objects from",
+        parents=[profile_parent],
+    )
+    git_cache_parser.add_argument("--project", required=True, help="Project name")
+    git_cache_parser.add_argument(
+        "--env-file",
+        help="Team env file with PROJECT_REPO_URL/MCP_DISCORD_REPO_URL "
+        "(default: teams/<project>/config/env)",
+    )
+    git_cache_parser.add_argument(
+        "--url", action="append", help="Another repository URL to mirror; repeatable"
+    )
+    git_cache_parser.add_argument(
+        "--jobs",
+        "-j",
+        type=int,
+        default=4,
+        help="Number of mirrors to update concurrently (default: 4)",
+    )
+
+    # Doc Store GC Command
+    gc_docs_parser = subparsers.add_parser(
+        "gc-docs",
+        help="Delete doc store objects that no session payload uses any more",
+        parents=[profile_parent],
+    )
+    gc_docs_parser.add_argument("--project", required=True, help="Project name")
+    gc_docs_parser.add_argument(
+        "--min-age",
+        type=float,
+        default=3600.0,
+        help="Keep objects stored less than this many seconds ago (default: 3600)",
+    )
+    gc_docs_parser.add_argument(
+        "--dry-run", action="store_true", help="Report what would be removed without deleting"
+    )
+
+    # Reconcile Env Command
+    reconcile_parser = subparsers.add_parser(
+        "reconcile-env",
+        help="Resolve placeholders and drop other roles' values in existing session payloads",
+        parents=[profile_parent],
+    )
+    reconcile_parser.add_argument(
+        "--project", help="Project name (default: every project under teams/)"
+    )
+    reconcile_parser.add_argument(
+        "--jobs",
+        "-j",
+        type=int,
+        default=os.cpu_count() or 1,
+        help="Number of sessions to reconcile concurrently (default: CPU count)",
+    )
+
+    # Migrate Paths Command
+    migrate_parser = subparsers.add_parser(
+        "migrate-paths",
+        help="Rewrite path references in scripts after a layout change (dry run by default)",
+        parents=[profile_parent],
+    )
+    migrate_parser.add_argument(
+        "paths", nargs="*", help="Files or directories to process (default: .)"
+    )
+    migrate_parser.add_argument(
+        "--rules",
+        default="reorg",
+        help="Built-in rule set name or a JSON rule file (default: reorg)",
+    )
+    migrate_parser.add_argument(
+        "--glob",
+        action="append",
+        help="File name pattern to process; repeatable (default: *.sh)",
+    )
+    migrate_parser.add_argument(
+        "--execute", action="store_true", help="Write the changes instead of printing a diff"
+    )
+    migrate_parser.add_argument(
+        "--jobs",
+        "-j",
+        type=int,
+        default=os.cpu_count() or 1,
+        help="Number of worker processes (default: CPU count)",
+    )
+
+    # Migrate Sessions Command
+    migrate_sessions_parser = subparsers.add_parser(
+        "migrate-sessions",
+        help="Move sessions/<project>/<agent> to teams/<project>/sessions/<agent> (journaled)",
+        parents=[profile_parent],
+    )
+    migrate_sessions_parser.add_argument(
+        "--from",
+        dest="source",
+        default="sessions",
+        help="Old sessions root (default: sessions)",
+    )
+    migrate_sessions_action = migrate_sessions_parser.add_mutually_exclusive_group()
+    migrate_sessions_action.add_argument(
+        "--execute", action="store_true", help="Perform the moves instead of listing them"
+    )
+    migrate_sessions_action.add_argument(
+        "--rollback",
+        nargs="?",
+        const="latest",
+        metavar="RUN",
+        help="Undo a migration run (default: the latest)",
+    )
+    migrate_sessions_action.add_argument(
+        "--finalize",
+        nargs="?",
+        const="latest",
+        metavar="RUN",
+        help="Delete the destinations a run displaced; it can no longer be rolled back",
+    )
+
+    # Benchmark Command
+    benchmark_parser = subparsers.add_parser(
+        "benchmark", help="Benchmark session builds on a synthetic large team"
+    )
+    benchmark_parser.add_argument(
+        "--roles", type=int, default=8, help="Number of synthetic roles (default: 8)"
+    )
+    benchmark_parser.add_argument(
+        "--docs",
+        type=int,
+        default=20,
+        help="Docs per role and per global/project tree (default: 20)",
+    )
+    benchmark_parser.add_argument(
+        "--doc-bytes",
+        type=int,
+        default=4096,
+        help="Size of each synthetic doc (default: 4096)",
+    )
+    benchmark_parser.add_argument(
+        "--jobs",
+        "-j",
+        type=int,
+        default=1,
+        help="--jobs passed to create-crew (default: 1)",
+    )
+    benchmark_parser.add_argument(
+        "--repeat",
+        type=int,
+        default=3,
+        help="Runs per case; the median is reported (default: 3)",
+    )
+    benchmark_parser.add_argument("--output", "-o", help="Write JSON results to this file")
+    benchmark_parser.add_argument("--baseline", help="Baseline JSON file to compare against")
+    benchmark_parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.25,
+        help="Allowed regression as a fraction of the baseline (default: 0.25)",
+    )
+    benchmark_parser.add_argument(
+        "--update-baseline",
+        action="store_true",
+        help="Write this run's results to --baseline instead of comparing",
+    )
+    benchmark_parser.add_argument(
+        "--startup-budget-ms",
+        type=float,
+        default=50.0,
+        help="Fail if importing team_cli takes longer than this (default: 50)",
+    )
+    benchmark_parser.add_argument(
+        "--startup-only",
+        action="store_true",
+        help="Only run the CLI startup check, not the synthetic team build",
+    )
+    benchmark_parser.add_argument(
+        "--keep", action="store_true", help="Keep the synthetic team directories"
+    )
+
+    # List Roles Command
+    subparsers.add_parser("list-roles", help="List the available roles/templates")
+
+    # Watch Command
+    watch_parser = subparsers.add_parser(
+        "watch",
+        help="Propagate edits to docs and .windsurf/rules into existing session payloads",
+    )
+    watch_parser.add_argument("--project", required=True, help="Project name")
+    watch_parser.add_argument(
+        "--debounce-ms",
+        type=float,
+        default=200.0,
+        help="Wait for this much quiet after a change before propagating (default: 200)",
+    )
+    watch_parser.add_argument(
+        "--poll",
+        action="store_true",
+        help="Detect changes by polling mtimes instead of inotify",
+    )
+    watch_parser.add_argument(
+        "--poll-interval",
+        type=float,
+        default=1.0,
+        help="Seconds between polls with --poll or without inotify (default: 1.0)",
+    )
+    watch_parser.add_argument(
+        "--no-doc-store",
+        action="store_false",
+        dest="doc_store",
+        help="Copy docs into payloads instead of linking them from teams/<project>/.objects",
+    )
+    watch_parser.add_argument(
+        "--once", action="store_true", help="Exit after the first propagated batch"
+    )
+
+    # Daemon Commands
+    serve_parser = subparsers.add_parser(
+        "serve", help="Run a resident daemon that serves build requests over a Unix socket"
+    )
+    serve_parser.add_argument(
+        "--socket", default=str(DAEMON_SOCKET), help=f"Socket path (default: {DAEMON_SOCKET})"
+    )
+    call_parser = subparsers.add_parser(
+        "call", help="Send create-session/create-crew/build/status/shutdown to a running daemon"
+    )
+    call_parser.add_argument(
+        "--socket", default=str(DAEMON_SOCKET), help=f"Socket path (default: {DAEMON_SOCKET})"
+    )
+    call_parser.add_argument(
+        "request",
+        nargs=argparse.REMAINDER,
+        help="Command and options, e.g. create-session --name x --role reviewer (default: status)",
+    )
+
+    return parser
+
+
+def main():
+    parser = build_parser()
     args = parser.parse_args()
 
     if not args.command:
         print_simple_help()
         sys.exit(1)
 
-    if args.command == "create-session":
-        create_session(args)
-    elif args.command == "add-role":
-        add_role(args)
-    elif args.command == "create-crew":
-        create_crew(args)
-    else:
-        print(f"Unknown command: {args.command}")
-        print_simple_help()
-        sys.exit(1)
+    with profiled(getattr(args, "profile", None)):
+        if args.command == "create-session":
+            create_session(args)
+        elif args.command == "add-role":
+            add_role(args)
+        elif args.command == "create-crew":
+            create_crew(args)
+        elif args.command == "build":
+            build_crew(args)
+        elif args.command == "rotate-keys":
+            rotate_keys(args)
+        elif args.command == "pack":
+            pack_payloads(args)
+        elif args.command == "base-image":
+            build_base_image(args)
+        elif args.command == "wheelhouse":
+            build_team_wheelhouse(args)
+        elif args.command == "git-cache":
+            update_git_cache(args)
+        elif args.command == "gc-docs":
+            gc_doc_store(args)
+        elif args.command == "reconcile-env":
+            reconcile_env(args)
+        elif args.command == "migrate-paths":
+            migrate_paths(args)
+        elif args.command == "migrate-sessions":
+            migrate_sessions(args)
+        elif args.command == "list-roles":
+            list_roles()
+        elif args.command == "watch":
+            import payload_watch
+
+            payload_watch.watch(args)
+        elif args.command in ("serve", "call"):
+            import team_daemon
+
+            getattr(team_daemon, args.command)(args)
+        elif args.command == "benchmark":
+            import benchmark
+
+            benchmark.benchmark(args)
+        else:
+            print(f"Unknown command: {args.command}")
+            print_simple_help()
+            sys.exit(1)
 
 
 if __name__ == "__main__":
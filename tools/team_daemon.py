@@ -0,0 +1,293 @@
+#!/usr/bin/env python3
+"""
+team_daemon.py - Resident team_cli server with a warm CrewContext cache
+
+`team_cli.py serve` keeps parsed team env files and CrewContexts (role
+catalog, doc listings, devcontainer and MCP templates) in memory and answers
+requests over a local Unix socket, so a request only pays for the
+session-specific work.
+
+Cached entries are revalidated on every request by stat()ing what they were
+built from: the files that were read (env file, env template, devcontainer
+and MCP templates, .gitignore) and every directory that was listed (a
+directory's mtime changes when entries are added, removed or renamed).
+Nothing is re-read or re-listed unless one of those changed.
+
+Protocol: one JSON object per line and one request per connection.
+
+    request:  {"argv": ["create-session", "--name", "x", "--role", "reviewer"]}
+              {"argv": ["create-crew", "--env-file", "teams/p/config/env"]}
+              {"argv": ["build", "--env-file", "teams/p/config/env"]}
+              {"argv": ["status"]}
+              {"argv": ["shutdown"]}
+    response: {"ok": true, "output": "...", "error": null, "seconds": 0.04}
+
+Build requests are run one at a time; status is answered immediately.
+"""
+import io
+import json
+import os
+import signal
+import socket
+import socketserver
+import sys
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+
+import team_cli
+from env_file import read_env_file
+
+BUILD_COMMANDS = ("create-session", "create-crew", "build")
+
+
+def _stat_key(path: Path):
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return (st.st_mtime_ns, st.st_size)
+
+
+def _listed_dirs(root: Path):
+    """Every directory under root (including root), or root alone if missing."""
+    if not root.is_dir():
+        return [root]
+    return [Path(dirpath) for dirpath, _, _ in os.walk(root)]
+
+
+def _context_inputs(ctx) -> tuple:
+    """Paths whose stat() signature determines whether ctx is still valid."""
+    files = [
+        ctx.env_file,
+        ctx.env_template_path,
+        ctx.devcontainer_dir / "devcontainer.json",
+        Path(".gitignore"),
+    ]
+    files += [ctx.roles_dir / role / "mcp_config.template.json" for role in ctx.roles]
+    dirs = []
+    for root in (ctx.roles_dir, ctx.devcontainer_dir, ctx.global_docs_dir):
+        dirs += _listed_dirs(root)
+    # A project docs directory that does not exist yet shows up in its parent
+    dirs += _listed_dirs(ctx.project_docs_dir) + [ctx.project_docs_dir.parent]
+    return tuple(files + dirs)
+
+
+class ContextCache:
+    """Parsed team envs and CrewContexts, invalidated by file mtimes."""
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._envs = {}  # env file -> (stat key, parsed dict)
+        self._contexts = {}  # (env file, project) -> (ctx, inputs, signature, loaded_at)
+        self.stats = Counter()
+
+    def team_env(self, env_file) -> dict:
+        """Return the parsed env file (a fresh dict the caller may modify)."""
+        path = str(env_file)
+        key = _stat_key(path)
+        with self._lock:
+            cached = self._envs.get(path)
+            if cached is not None and cached[0] == key:
+                self.stats["env_hits"] += 1
+                return dict(cached[1])
+            env = read_env_file(path) if key is not None else {}
+            self._envs[path] = (key, env)
+            self.stats["env_loads"] += 1
+            return dict(env)
+
+    def context(self, env_file, project: str):
+        """Return the CrewContext for (env_file, project), reloading it if any input changed."""
+        cache_key = (str(env_file), project)
+        with self._lock:
+            entry = self._contexts.get(cache_key)
+            if entry is not None:
+                ctx, inputs, signature, _ = entry
+                if tuple(_stat_key(p) for p in inputs) == signature:
+                    self.stats["context_hits"] += 1
+                    return ctx
+                self.stats["context_reloads"] += 1
+            else:
+                self.stats["context_loads"] += 1
+            ctx = team_cli.load_context(env_file, project, self.team_env(env_file))
+            inputs = _context_inputs(ctx)
+            signature = tuple(_stat_key(p) for p in inputs)
+            self._contexts[cache_key] = (ctx, inputs, signature, time.time())
+            return ctx
+
+    def describe(self) -> dict:
+        with self._lock:
+            return {
+                "stats": dict(self.stats),
+                "contexts": [
+                    {
+                        "env_file": env_file,
+                        "project": project,
+                        "inputs": len(inputs),
+                        "loaded_at": loaded_at,
+                    }
+                    for (env_file, project), (_, inputs, _, loaded_at) in self._contexts.items()
+                ],
+            }
+
+
+class TeamDaemon:
+    """Dispatches JSON requests to team_cli with a shared ContextCache."""
+
+    def __init__(self, socket_path: Path):
+        self.socket_path = Path(socket_path)
+        self.cache = ContextCache()
+        self.parser = team_cli.build_parser()
+        self.requests = Counter()
+        self.started = time.time()
+        self._build_lock = threading.Lock()
+        self._stdout = team_cli._ThreadOutput(sys.stdout)
+        self._stderr = team_cli._ThreadOutput(sys.stderr)
+        self.server = None
+
+    def status(self) -> dict:
+        return {
+            "pid": os.getpid(),
+            "cwd": os.getcwd(),
+            "socket": str(self.socket_path),
+            "uptime_seconds": round(time.time() - self.started, 3),
+            "requests": dict(self.requests),
+            "cache": self.cache.describe(),
+        }
+
+    def _run(self, args):
+        if args.command == "create-session":
+            project = args.project or "default"
+            env_file = getattr(args, "env_file", None) or team_cli.TEAM_ENV
+            team_cli.create_session(args, self.cache.context(env_file, project))
+        elif args.command == "build":
+            team_cli.build_crew(args, cache=self.cache)
+        else:
+            team_cli.create_crew(args, cache=self.cache)
+
+    def handle(self, request: dict) -> dict:
+        """Run one request and return its response."""
+        argv = request.get("argv") if isinstance(request, dict) else None
+        if not argv or not isinstance(argv, list):
+            return {"ok": False, "output": "", "error": "request needs a non-empty 'argv' list"}
+        command = argv[0]
+        self.requests[command] += 1
+        if command == "status":
+            return {"ok": True, "output": "", "error": None, "status": self.status()}
+        if command == "shutdown":
+            threading.Thread(target=self.server.shutdown, daemon=True).start()
+            return {"ok": True, "output": "Shutting down.\n", "error": None}
+        if command not in BUILD_COMMANDS:
+            return {
+                "ok": False,
+                "output": "",
+                "error": f"unsupported command '{command}' (expected one of: "
+                f"{', '.join(BUILD_COMMANDS + ('status', 'shutdown'))})",
+            }
+
+        buffer = io.StringIO()
+        ok, error = True, None
+        start = time.perf_counter()
+        with self._build_lock:
+            with self._stdout.capture(buffer), self._stderr.capture(buffer):
+                try:
+                    args = self.parser.parse_args([str(a) for a in argv])
+                    with team_cli.profiled(getattr(args, "profile", None)):
+                        self._run(args)
+                except SystemExit as e:
+                    if e.code not in (None, 0):
+                        ok, error = False, f"exited with status {e.code}"
+                except EOFError:
+                    ok, error = False, "interactive input is not available; pass --name and --role"
+                except Exception as e:
+                    ok, error = False, f"{type(e).__name__}: {e}"
+        return {
+            "ok": ok,
+            "output": buffer.getvalue(),
+            "error": error,
+            "seconds": round(time.perf_counter() - start, 6),
+        }
+
+    def serve_forever(self):
+        daemon = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            def handle(self):
+                line = self.rfile.readline()
+                try:
+                    request = json.loads(line)
+                except ValueError as e:
+                    response = {"ok": False, "output": "", "error": f"invalid JSON request: {e}"}
+                else:
+                    response = daemon.handle(request)
+                self.wfile.write((json.dumps(response) + "\n").encode())
+
+        _remove_stale_socket(self.socket_path)
+        self.socket_path.parent.mkdir(parents=True, exist_ok=True)
+        self.server = socketserver.ThreadingUnixStreamServer(str(self.socket_path), Handler)
+        self.server.daemon_threads = True
+        os.chmod(self.socket_path, 0o600)
+
+        # Requests must never block on a prompt, and their output goes to the caller
+        sys.stdin = io.StringIO()
+        sys.stdout, sys.stderr = self._stdout, self._stderr
+        signal.signal(signal.SIGTERM, lambda *_: threading.Thread(target=self.server.shutdown).start())
+        print(f"[SERVE] team_cli daemon (pid {os.getpid()}) listening on {self.socket_path}")
+        try:
+            self.server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.server.server_close()
+            if self.socket_path.exists():
+                self.socket_path.unlink()
+            sys.stdout, sys.stderr = self._stdout._stream, self._stderr._stream
+            print("[SERVE] Stopped.")
+
+
+def _remove_stale_socket(path: Path):
+    """Unlink a socket left behind by a daemon that is no longer running."""
+    if not path.exists():
+        return
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as s:
+        try:
+            s.connect(str(path))
+        except OSError:
+            path.unlink()
+            return
+    print(f"ERROR: A team_cli daemon is already listening on {path}.")
+    sys.exit(1)
+
+
+def send_request(socket_path: Path, argv, timeout: float = None) -> dict:
+    """Send one request to a running daemon and return its response."""
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as s:
+        s.settimeout(timeout)
+        s.connect(str(socket_path))
+        s.sendall((json.dumps({"argv": list(argv)}) + "\n").encode())
+        with s.makefile("rb") as f:
+            return json.loads(f.readline())
+
+
+def serve(args):
+    """Entry point for `team_cli.py serve`."""
+    TeamDaemon(Path(args.socket)).serve_forever()
+
+
+def call(args):
+    """Entry point for `team_cli.py call`: forward a command to the daemon."""
+    argv = [a for a in args.request if a != "--"] or ["status"]
+    try:
+        response = send_request(Path(args.socket), argv)
+    except (FileNotFoundError, ConnectionRefusedError):
+        print(
+            f"ERROR: No team_cli daemon on {args.socket}. Start one with: python tools/team_cli.py serve"
+        )
+        sys.exit(1)
+    if "status" in response:
+        print(json.dumps(response["status"], indent=2))
+    print(response.get("output", ""), end="")
+    if not response.get("ok"):
+        print(f"ERROR: {response.get('error')}")
+        sys.exit(1)
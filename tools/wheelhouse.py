@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+"""
+wheelhouse.py - Prebuilt wheels for a team's container Python tooling
+
+setup_workspace.sh cloned MCP_DISCORD_REPO_URL and ran `pip install -e .`
+in every session container, so a team of N agents resolved and built the
+same package N times, online. `team_cli.py wheelhouse` builds it once per
+team instead, from local checkouts, into teams/<project>/wheelhouse:
+
+    <name>-<version>-*.whl    the checkouts and every dependency
+    requirements.txt          name==version of each checkout, what to install
+    wheelhouse.json           what it was built from, to skip unchanged rebuilds
+
+Every session mounts the directory read-only at /opt/wheelhouse and
+setup_workspace.sh installs with `pip install --no-index --find-links`, so
+container installs are offline and reproducible.
+
+The checkouts are built with `pip wheel --no-deps`, then their dependencies
+are resolved against them. Dependencies are built for the host's Python
+unless a target is given (platforms and python_version, default 3.11 as in
+the base image). In that case they are downloaded as binary wheels for that
+target, which is how a macOS host fills a wheelhouse for the Linux
+containers.
+
+The wheelhouse is built in a temporary sibling directory and swapped in, so
+sessions never see a half-built wheelhouse. If every checkout is a git work
+tree whose commit and uncommitted changes match the last build, and the
+target is the same, the build is skipped.
+"""
+import hashlib
+import json
+import os
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+from typing import List, Optional, Sequence
+
+WHEELHOUSE_DIR = "wheelhouse"
+# Where sessions mount the wheelhouse (see setup_workspace.sh)
+WHEELHOUSE_MOUNT = "/opt/wheelhouse"
+REQUIREMENTS = "requirements.txt"
+BUILD_RECORD = "wheelhouse.json"
+
+
+def git_state(path: Path) -> Optional[str]:
+    """Identify a checkout's tracked contents: HEAD plus a hash of any
+    uncommitted changes, or None if it is not a git work tree.
+
+    Untracked files are ignored; building leaves build/ and *.egg-info behind.
+    """
+
+    def git(*args):
+        result = subprocess.run(
+            ["git", "-C", str(path), *args],
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+        )
+        return result.stdout if result.returncode == 0 else None
+
+    if shutil.which("git") is None:
+        return None
+    head = git("rev-parse", "HEAD")
+    diff = git("diff", "--no-ext-diff", "--binary", "HEAD")
+    if head is None or diff is None:
+        return None
+    state = head.decode().strip()
+    return f"{state}+{hashlib.sha256(diff).hexdigest()[:12]}" if diff else state
+
+
+def build_record(sources: Sequence[Path], platforms: Sequence[str], python_version: str) -> dict:
+    """Describe a build; None in "commits" marks a checkout that cannot be compared."""
+    return {
+        "sources": [str(Path(s).resolve()) for s in sources],
+        "commits": [git_state(s) for s in sources],
+        "platforms": sorted(platforms),
+        "python_version": python_version if platforms else None,
+    }
+
+
+def is_current(wheelhouse: Path, record: dict) -> bool:
+    """Whether wheelhouse was built from exactly these checkouts."""
+    if None in record["commits"]:
+        return False
+    try:
+        with open(Path(wheelhouse) / BUILD_RECORD) as f:
+            return json.load(f) == record
+    except (OSError, ValueError):
+        return False
+
+
+def _wheel_requirement(wheel: Path) -> str:
+    """name==version from a wheel file name (PEP 427)."""
+    name, version = wheel.name.split("-")[:2]
+    return f"{re.sub(r'[-_.]+', '-', name).lower()}=={version}"
+
+
+def _pip(python: str, *args):
+    subprocess.run([python, "-m", "pip", *args], check=True)
+
+
+def build_wheelhouse(
+    sources: Sequence[Path],
+    wheelhouse: Path,
+    platforms: Sequence[str] = (),
+    python_version: str = "3.11",
+    python: str = sys.executable,
+    force: bool = False,
+) -> Optional[List[str]]:
+    """Build wheels for sources and their dependencies into wheelhouse.
+
+    Args:
+        sources: Local checkouts of the packages to install in containers
+        wheelhouse: Directory to (re)create
+        platforms: pip --platform tags to download dependencies for (default: the host)
+        python_version: Target Python version when platforms are given
+        python: Interpreter whose pip builds the wheels
+        force: Rebuild even if the checkouts are unchanged
+
+    Returns:
+        list: The requirements written to requirements.txt, or None if the
+        wheelhouse was already current
+
+    Raises:
+        subprocess.CalledProcessError: If pip fails
+    """
+    wheelhouse = Path(wheelhouse)
+    record = build_record(sources, platforms, python_version)
+    if not force and is_current(wheelhouse, record):
+        return None
+
+    wheelhouse.parent.mkdir(parents=True, exist_ok=True)
+    staging = Path(tempfile.mkdtemp(dir=wheelhouse.parent, prefix=f".{wheelhouse.name}.build-"))
+    try:
+        _pip(python, "wheel", "--no-deps", "--wheel-dir", str(staging), *map(str, sources))
+        top_level = sorted(staging.glob("*.whl"))
+        if platforms:
+            target = [f"--platform={p}" for p in platforms]
+            _pip(
+                python,
+                "download",
+                "--only-binary=:all:",
+                *target,
+                f"--python-version={python_version}",
+                "--find-links",
+                str(staging),
+                "--dest",
+                str(staging),
+                *map(str, top_level),
+            )
+        else:
+            _pip(
+                python,
+                "wheel",
+                "--find-links",
+                str(staging),
+                "--wheel-dir",
+                str(staging),
+                *map(str, top_level),
+            )
+        requirements = [_wheel_requirement(w) for w in top_level]
+        (staging / REQUIREMENTS).write_text("\n".join(requirements) + "\n")
+        (staging / BUILD_RECORD).write_text(json.dumps(record, indent=2) + "\n")
+        os.chmod(staging, 0o755)
+
+        # Swap the new wheelhouse in; the old one is deleted only afterwards
+        old = None
+        if wheelhouse.exists():
+            old = wheelhouse.parent / f".{wheelhouse.name}.old-{staging.name.rsplit('-', 1)[-1]}"
+            os.rename(wheelhouse, old)
+        os.rename(staging, wheelhouse)
+        staging = None
+        if old is not None:
+            shutil.rmtree(old, ignore_errors=True)
+        return requirements
+    finally:
+        if staging is not None:
+            shutil.rmtree(staging, ignore_errors=True)